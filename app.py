@@ -1,12 +1,19 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import json
-from macros import run_macro_stats
-from squadre import run_team_stats
-from pre_match import run_pre_match
-from utils import load_data_from_supabase, load_data_from_file, label_match
-from supabase import create_client
+from utils import (
+    load_data_from_supabase,
+    load_data_from_file,
+    load_data_from_mirror,
+    clear_dataset_cache,
+    dataset_cache_info,
+    paged_grid,
+    show_perf_panel,
+)
+from core.dataset import enable_copy_on_write
+from core.perf import start_run, end_run, stage
+
+# Copy-on-Write: le pagine ricevono viste del dataset in cache, mai copie
+enable_copy_on_write()
 
 # -------------------------------------------------------
 # CONFIGURAZIONE PAGINA
@@ -28,7 +35,8 @@ menu_option = st.sidebar.radio(
     [
         "Macro Stats per Campionato",
         "Statistiche per Squadre",
-        "Confronto Pre Match"
+        "Confronto Pre Match",
+        "Batch Pre Match"
     ]
 )
 
@@ -37,137 +45,73 @@ menu_option = st.sidebar.radio(
 # -------------------------------------------------------
 origine_dati = st.sidebar.radio(
     "Seleziona origine dati:",
-    ["Supabase", "Upload Manuale"]
+    ["Supabase", "Upload Manuale", "Mirror locale"]
 )
 
-if origine_dati == "Supabase":
-    df, db_selected = load_data_from_supabase()
-else:
-    df, db_selected = load_data_from_file()
+# Invalidazione esplicita della cache dati (nuove partite su Supabase, ecc.)
+if st.sidebar.button("🔄 Ricarica dati", key="reload_dataset"):
+    clear_dataset_cache()
 
 # -------------------------------------------------------
-# MAPPING COLONNE COMPLETO
+# PROFILAZIONE (tempi sempre, memoria solo se richiesta)
 # -------------------------------------------------------
-col_map = {
-    "country": "country",
-    "sezonul": "Stagione",
-    "datameci": "Data",
-    "orameci": "Orario",
-    "etapa": "Round",
-    "txtechipa1": "Home",
-    "txtechipa2": "Away",
-    "scor1": "Home Goal FT",
-    "scor2": "Away Goal FT",
-    "scorp1": "Home Goal 1T",
-    "scorp2": "Away Goal 1T",
-    "place1": "Posizione Classifica Generale",
-    "place1a": "Posizione Classifica Home",
-    "place2": "Posizione Classifica Away Generale",
-    "place2d": "Posizione classifica away",
-    "cotaa": "Odd home",
-    "cotad": "Odd Away",
-    "cotae": "Odd Draw",
-    "cotao0": "odd over 0,5",
-    "cotao1": "odd over 1,5",
-    "cotao": "odd over 2,5",
-    "cotao3": "odd over 3,5",
-    "cotao4": "odd over 4,5",
-    "cotau0": "odds under 0,5",
-    "cotau1": "odd under 1,5",
-    "cotau": "odd under 2,5",
-    "cotau3": "odd under 3,5",
-    "cotau4": "odd under 4,5",
-    "gg": "gg",
-    "ng": "ng",
-    "elohomeo": "elohomeo",
-    "eloawayo": "eloawayo",
-    "formah": "form h",
-    "formaa": "form a",
-    "suth": "Tiri totali squadra HOME (full time)",
-    "suth1": "Tiri squadra HOME 1 tempo",
-    "suth2": "Tiri squadra HOME 2 tempo",
-    "suta": "Tiri totali squadra AWAY (full time)",
-    "suta1": "Tiri squadra AWAY 1 tempo",
-    "suta2": "Tiri squadra AWAY 2 tempo",
-    "sutht": "Tiri in porta squadra HOME (full time)",
-    "sutht1": "Tiri in porta squadra HOME 1 tempo",
-    "sutht2": "Tiri in porta squadra HOME 2 tempo",
-    "sutat": "Tiri in porta squadra AWAY (full time)",
-    "sutat1": "Tiri in porta squadra AWAY 1 tempo",
-    "sutat2": "Tiri in porta squadra AWAY 2 tempo",
-    "mgolh": "minuti goal segnato home",
-    "gh1": "home 1 goal segnato (min)",
-    "gh2": "home 2 goal segnato(min)",
-    "gh3": "home 3 goal segnato(min)",
-    "gh4": "home 4 goal segnato(min)",
-    "gh5": "home 5 goal segnato(min)",
-    "gh6": "home 6 goal segnato(min)",
-    "gh7": "home 7 goal segnato(min)",
-    "gh8": "home 8 goal segnato(min)",
-    "gh9": "home 9 goal segnato(min)",
-    "mgola": "minuti goal segnato away",
-    "ga1": "1 goal away (min)",
-    "ga2": "2 goal away (min)",
-    "ga3": "3 goal away (min)",
-    "ga4": "4 goal away (min)",
-    "ga5": "5 goal away (min)",
-    "ga6": "6 goal away (min)",
-    "ga7": "7 goal away (min)",
-    "ga8": "8 goal away (min)",
-    "ga9": "9 goal away (min)",
-    "stare": "stare",
-    "codechipa1": "codechipa1",
-    "codechipa2": "codechipa2"
-}
-
-df.rename(columns=col_map, inplace=True)
-
-# Pulizia colonne
-df.columns = (
-    df.columns
-    .astype(str)
-    .str.strip()
-    .str.replace(r"[\n\r\t]", "", regex=True)
-    .str.replace(r"\s+", " ", regex=True)
+profilazione = st.sidebar.toggle("⏱️ Profilazione tempi e memoria", key="perf_panel")
+misura_memoria = profilazione and st.sidebar.checkbox(
+    "Misura memoria (tracemalloc, più lento)", key="perf_memory"
 )
+start_run(menu_option, memory=misura_memoria)
 
-# Crea colonna Label se non presente
-if "Label" not in df.columns:
-    df["Label"] = df.apply(label_match, axis=1)
-
-# Filtro multi-stagione
-if "Stagione" in df.columns:
-    stagioni_disponibili = sorted(df["Stagione"].dropna().unique())
-    stagioni_scelte = st.sidebar.multiselect(
-        "Seleziona le stagioni da includere nell'analisi:",
-        options=stagioni_disponibili,
-        default=stagioni_disponibili
-    )
-    if stagioni_scelte:
-        df = df[df["Stagione"].isin(stagioni_scelte)]
-
-# Debug colonne
-st.write("✅ Colonne presenti nel dataset:")
-st.write(list(df.columns))
+# -------------------------------------------------------
+# CARICAMENTO E PREPARAZIONE (in cache per origine + filtri)
+# -------------------------------------------------------
+# Il loader restituisce il dataset già preparato (core.dataset.prepare_matches:
+# COL_MAP, Data, Label) e filtrato una volta sola (campionato, stagioni,
+# niente partite future: core.filters), con la sua chiave di cache: i
+# rerun dei widget riusano gli stessi oggetti senza ricalcolare nulla.
+with stage("load"):
+    if origine_dati == "Supabase":
+        df, db_selected, dataset_key = load_data_from_supabase()
+    elif origine_dati == "Upload Manuale":
+        df, db_selected, dataset_key = load_data_from_file()
+    else:
+        df, db_selected, dataset_key = load_data_from_mirror()
+
+# Debug colonne (solo se richiesto)
+paged_grid(
+    "✅ Colonne presenti nel dataset",
+    lambda: pd.DataFrame({"Colonna": df.columns, "Tipo": df.dtypes.astype(str).to_numpy()}),
+    key="debug_columns"
+)
 
 # Controllo colonna essenziale "Home"
 if "Home" not in df.columns:
     st.error("⚠️ La colonna 'Home' non esiste nel dataset selezionato.")
     st.stop()
 
-# Eventuale filtro sulla data
-if "Data" in df.columns:
-    df["Data"] = pd.to_datetime(df["Data"], format="%Y-%m-%d", errors='coerce')
-    today = pd.Timestamp.today().normalize()
-    df = df[(df["Data"].isna()) | (df["Data"] <= today)]
+st.sidebar.caption(dataset_cache_info())
 
 # -------------------------------------------------------
 # CHIAMATA MODULI
 # -------------------------------------------------------
-
-if menu_option == "Macro Stats per Campionato":
-    run_macro_stats(df, db_selected)
-elif menu_option == "Statistiche per Squadre":
-    run_team_stats(df, db_selected)
-elif menu_option == "Confronto Pre Match":
-    run_pre_match(df, db_selected)
+# Le pagine (e plotly / altair) vengono importate solo quando servono:
+# l'avvio carica solo streamlit, pandas e il loader dei dati.
+# Il report di profilazione si chiude anche se la pagina chiama st.stop().
+
+try:
+    with stage("page"):
+        if menu_option == "Macro Stats per Campionato":
+            from macros import run_macro_stats
+            run_macro_stats(df, db_selected)
+        elif menu_option == "Statistiche per Squadre":
+            from squadre import run_team_stats
+            run_team_stats(df, db_selected)
+        elif menu_option == "Confronto Pre Match":
+            from pre_match import run_pre_match
+            run_pre_match(df, db_selected, dataset_key)
+        elif menu_option == "Batch Pre Match":
+            from batch_pre_match import run_batch_pre_match
+            run_batch_pre_match(df, db_selected)
+finally:
+    report = end_run()
+    if profilazione:
+        show_perf_panel(report)
@@ -0,0 +1,114 @@
+import threading
+import time
+
+# --------------------------------------------------------
+# CARICAMENTI IN BACKGROUND (un registro per processo)
+# --------------------------------------------------------
+# Un caricamento lento (es. tutta la tabella Supabase) gira in un thread:
+# l'interfaccia resta libera, mostra l'avanzamento e può già lavorare
+# sulle righe arrivate. I job sono per chiave e condivisi tra le sessioni:
+# due utenti che aprono l'app insieme aspettano lo stesso download.
+
+def new_registry():
+    return {
+        "jobs": {},                 # chiave → job
+        "lock": threading.Lock(),
+    }
+
+def _run(job, load):
+    def progress(rows, total=None, partial=None):
+        # Job dimenticato (es. Ricarica dati): il download si interrompe qui
+        if job["cancelled"]:
+            raise InterruptedError(f"Caricamento {job['key']} annullato")
+        with job["lock"]:
+            job["rows"], job["total"], job["partial"] = rows, total, partial
+
+    try:
+        result = load(progress)
+        with job["lock"]:
+            job["result"] = result
+    except InterruptedError:
+        pass
+    except Exception as e:
+        with job["lock"]:
+            job["error"] = e
+    finally:
+        with job["lock"]:
+            job["done"] = True
+            job["partial"] = None
+            job["elapsed"] = time.perf_counter() - job["started"]
+
+def start_load(registry, key, load):
+    """
+    Job per key: se non esiste ancora, load(progress) parte in un thread
+    daemon. load chiama progress(righe, totale, parziale) a ogni passo,
+    dove parziale() restituisce i dati arrivati fin lì.
+    """
+    with registry["lock"]:
+        job = registry["jobs"].get(key)
+        if job is not None:
+            return job
+
+        job = {
+            "key": key,
+            "lock": threading.Lock(),
+            "started": time.perf_counter(),
+            "elapsed": None,
+            "rows": 0,
+            "total": None,
+            "partial": None,
+            "partial_cache": (None, None),    # (righe, DataFrame) dell'ultimo parziale letto
+            "result": None,
+            "error": None,
+            "done": False,
+            "cancelled": False,
+        }
+        job["thread"] = threading.Thread(target=_run, args=(job, load), name=f"load-{key}", daemon=True)
+        registry["jobs"][key] = job
+
+    job["thread"].start()
+    return job
+
+def job_status(job):
+    with job["lock"]:
+        elapsed = job["elapsed"] if job["done"] else time.perf_counter() - job["started"]
+        return {
+            "rows": job["rows"],
+            "total": job["total"],
+            "done": job["done"],
+            "error": job["error"],
+            "elapsed": elapsed,
+        }
+
+def partial_frame(job, transform=None):
+    """
+    Dati arrivati finora (None se non c'è ancora nulla), passati per
+    transform. Il risultato viene tenuto finché non arrivano nuove righe:
+    i rerun senza progressi non rileggono né ritrasformano niente.
+    """
+    with job["lock"]:
+        rows, partial = job["rows"], job["partial"]
+        cached_rows, cached = job["partial_cache"]
+
+    if partial is None:
+        return None
+    if cached_rows == rows:
+        return cached
+
+    df = partial()
+    if transform is not None:
+        df = transform(df)
+
+    with job["lock"]:
+        job["partial_cache"] = (rows, df)
+    return df
+
+def forget(registry, key_prefix):
+    """
+    Toglie i job le cui chiavi iniziano con key_prefix; quelli ancora in
+    corso si fermano alla prossima pagina.
+    """
+    with registry["lock"]:
+        for key in list(registry["jobs"]):
+            if key[:len(key_prefix)] == tuple(key_prefix):
+                registry["jobs"].pop(key)["cancelled"] = True
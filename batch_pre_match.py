@@ -0,0 +1,73 @@
+import csv
+import io
+
+import pandas as pd
+import streamlit as st
+from core.batch import FIXTURE_ALIASES, read_fixtures, compute_batch_pre_match
+from core.cross_league import ALL_LEAGUES
+
+# --------------------------------------------------------
+# EXPORT
+# --------------------------------------------------------
+def report_to_excel(report):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        report.to_excel(writer, index=False, sheet_name="Batch Pre Match")
+    return buffer.getvalue()
+
+# --------------------------------------------------------
+# RUN BATCH PRE MATCH PAGE
+# --------------------------------------------------------
+def run_batch_pre_match(df, db_selected):
+    st.title(f"📋 Batch Pre Match - {db_selected}")
+
+    # Le righe League / Label sono per campionato, come nel confronto pre-match
+    if db_selected == ALL_LEAGUES:
+        st.info("ℹ️ Il batch pre-match lavora su un solo campionato: selezionalo nella barra laterale.")
+        st.stop()
+
+    st.markdown(
+        "Carica un CSV con le colonne `home`, `away`, `odd_home`, `odd_draw`, `odd_away` "
+        "(una riga per partita)."
+    )
+
+    template = pd.DataFrame(columns=list(FIXTURE_ALIASES)).to_csv(index=False)
+    st.download_button("⬇️ Scarica modello CSV", template, file_name="fixtures_template.csv", mime="text/csv")
+
+    uploaded_file = st.file_uploader("Carica CSV partite:", type=["csv"], key="batch_fixtures_upload")
+    if uploaded_file is None:
+        st.info("ℹ️ Carica un file di partite per generare il report.")
+        return
+
+    try:
+        fixtures = read_fixtures(uploaded_file)
+    except (ValueError, csv.Error, pd.errors.ParserError) as e:
+        # Colonne mancanti, separatore non riconosciuto, righe malformate
+        st.error(f"⚠️ CSV partite non leggibile: {e}")
+        return
+
+    teams = set(df["Home"].astype(str).str.strip()) | set(df["Away"].astype(str).str.strip())
+    unknown = sorted((set(fixtures["home"]) | set(fixtures["away"])) - teams)
+    if unknown:
+        st.warning(f"⚠️ Squadre non presenti nel database: {unknown}")
+
+    report = compute_batch_pre_match(df, fixtures)
+
+    st.success(f"✅ Report generato per {len(report)} partite.")
+    st.dataframe(report, use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Esporta CSV",
+            report.to_csv(index=False).encode("utf-8"),
+            file_name=f"batch_pre_match_{db_selected}.csv",
+            mime="text/csv"
+        )
+    with col2:
+        st.download_button(
+            "⬇️ Esporta Excel",
+            report_to_excel(report),
+            file_name=f"batch_pre_match_{db_selected}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
@@ -0,0 +1,467 @@
+"""
+Benchmark delle funzioni più pesanti su dati sintetici, senza Streamlit.
+
+Esempi:
+    python benchmarks.py
+    python benchmarks.py --rows 10000 100000 --save benchmark_baseline.json
+    python benchmarks.py --rows 10000 100000 --compare benchmark_baseline.json
+    python benchmarks.py --only label_match calculate_back_lay --full
+    python benchmarks.py --transfer --rows 100000
+
+Il generatore produce righe con la forma della tabella Supabase "partite"
+(nomi colonna grezzi, minuti goal "12;45;", quote 1X2, Over/Under e BTTS,
+campionati, stagioni e squadre). Ogni benchmark riporta il tempo migliore
+su --repeat esecuzioni, le righe al secondo e il picco di memoria Python
+(tracemalloc, in un'esecuzione separata).
+
+Con --transfer si misura invece il download della tabella da un server
+PostgREST finto in locale (processo separato, pagine già serializzate):
+righe JSON con il client Supabase contro CSV in blocco (supabase_source),
+con tempo, CPU del client e byte trasferiti.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import time
+
+import numpy as np
+import pandas as pd
+from core.dataset import normalize_raw, prepare_matches
+from core.labels import label_match, label_series, extract_minutes, extract_minutes_array
+from core.league import (
+    calculate_goal_timeframes,
+    calculate_goal_timeframes_vectorized,
+    calculate_odds_sweep,
+    prepare_league_frame,
+    league_summary,
+    label_summary,
+)
+from core.markets import evaluate_markets, evaluate_markets_by_team
+from core.perf import start_run, end_run, stage
+from core.pre_match import calculate_back_lay, calculate_back_lay_vectorized
+from core.team import played_mask, compute_goal_patterns, compute_goal_patterns_vectorized
+from core.inplay import build_inplay_tables
+
+# --------------------------------------------------------
+# GENERATORE DATI SINTETICI (forma tabella "partite")
+# --------------------------------------------------------
+TEAMS_PER_LEAGUE = 20
+MATCHES_PER_SEASON = 380
+SEASONS_PER_LEAGUE = 5
+MAX_GOALS = 9
+MARGIN = 1.05
+
+def _odds(prob, rng, noise=0.03):
+    """
+    Quota con margine del bookmaker e un po' di rumore, arrotondata a 2 decimali.
+    """
+    prob = np.clip(prob * MARGIN * rng.normal(1, noise, len(prob)), 0.01, 0.99)
+    return np.round(1 / prob, 2)
+
+def _poisson_over(lam, line):
+    """
+    P(goal > line) con goal ~ Poisson(lam), per line = 0.5 ... 4.5.
+    """
+    k_max = int(line)
+    term = np.exp(-lam)
+    cdf = term.copy()
+    for k in range(1, k_max + 1):
+        term = term * lam / k
+        cdf += term
+    return 1 - cdf
+
+def _minutes_strings(minutes, goals):
+    """
+    "12;45;78;" per ogni riga (come mgolh / mgola), "" se nessun goal.
+    """
+    return [
+        "".join(f"{m};" for m in row[:n])
+        for row, n in zip(minutes.tolist(), goals.tolist())
+    ]
+
+def generate_matches(n_rows, seed=0, unplayed=0.02, missing_odds=0.01):
+    """
+    DataFrame di n_rows partite con le colonne grezze di Supabase
+    (country, sezonul, datameci, txtechipa1, scor1, cotaa, mgolh, gh1, ...),
+    da passare a normalize_raw / prepare_matches come i dati reali.
+
+    Le squadre hanno forza d'attacco e difesa casuali; goal, minuti e
+    quote sono coerenti tra loro. Una quota `unplayed` delle partite
+    non ha ancora risultato e `missing_odds` non ha quote 1X2.
+    """
+    rng = np.random.default_rng(seed)
+
+    per_league = MATCHES_PER_SEASON * SEASONS_PER_LEAGUE
+    n_leagues = max(1, math.ceil(n_rows / per_league))
+    idx = np.arange(n_rows)
+
+    league = idx // per_league
+    season = (idx % per_league) // MATCHES_PER_SEASON
+    match_no = idx % MATCHES_PER_SEASON
+    rnd = match_no // (TEAMS_PER_LEAGUE // 2) + 1
+
+    home = rng.integers(0, TEAMS_PER_LEAGUE, n_rows)
+    away = (home + rng.integers(1, TEAMS_PER_LEAGUE, n_rows)) % TEAMS_PER_LEAGUE
+
+    attack = rng.normal(0, 0.25, (n_leagues, TEAMS_PER_LEAGUE))
+    defence = rng.normal(0, 0.2, (n_leagues, TEAMS_PER_LEAGUE))
+    lam_h = np.exp(0.3 + attack[league, home] - defence[league, away])
+    lam_a = np.exp(0.05 + attack[league, away] - defence[league, home])
+
+    goals_h = np.minimum(rng.poisson(lam_h), MAX_GOALS)
+    goals_a = np.minimum(rng.poisson(lam_a), MAX_GOALS)
+
+    # Minuti ordinati; oltre il numero di goal la cella resta vuota
+    minutes_h = np.sort(rng.integers(1, 91, (n_rows, MAX_GOALS)), axis=1)
+    minutes_a = np.sort(rng.integers(1, 91, (n_rows, MAX_GOALS)), axis=1)
+    slot = np.arange(MAX_GOALS)
+    minutes_h = np.where(slot < goals_h[:, None], minutes_h, 0)
+    minutes_a = np.where(slot < goals_a[:, None], minutes_a, 0)
+    goals_h_1t = ((minutes_h > 0) & (minutes_h <= 45)).sum(axis=1)
+    goals_a_1t = ((minutes_a > 0) & (minutes_a <= 45)).sum(axis=1)
+
+    # Probabilità (approssimate) da cui derivano le quote
+    diff = lam_h - lam_a
+    p_draw = np.clip(0.28 - 0.06 * np.abs(diff), 0.12, 0.3)
+    p_home = (1 - p_draw) / (1 + np.exp(-1.4 * diff))
+    p_away = 1 - p_draw - p_home
+    total = lam_h + lam_a
+    p_btts = (1 - np.exp(-lam_h)) * (1 - np.exp(-lam_a))
+
+    start = pd.to_datetime([f"20{20 + s}-08-20" for s in range(SEASONS_PER_LEAGUE)])
+    dates = start[season] + pd.to_timedelta((rnd - 1) * 7 + rng.integers(0, 3, n_rows), unit="D")
+
+    df = pd.DataFrame({
+        "country": np.array([f"Lg{i + 1}" for i in range(n_leagues)])[league],
+        "sezonul": 21 + season,
+        "datameci": dates.strftime("%Y-%m-%d"),
+        "orameci": rng.choice([1400, 1700, 1945, 2045], n_rows),
+        "etapa": rnd,
+        "txtechipa1": np.char.add(np.char.add("Team ", (league + 1).astype(str)), np.char.add("-", (home + 1).astype(str))),
+        "txtechipa2": np.char.add(np.char.add("Team ", (league + 1).astype(str)), np.char.add("-", (away + 1).astype(str))),
+        "scor1": goals_h.astype(float),
+        "scor2": goals_a.astype(float),
+        "scorp1": goals_h_1t.astype(float),
+        "scorp2": goals_a_1t.astype(float),
+        "cotaa": _odds(p_home, rng),
+        "cotae": _odds(p_draw, rng),
+        "cotad": _odds(p_away, rng),
+        "gg": _odds(p_btts, rng),
+        "ng": _odds(1 - p_btts, rng),
+        "mgolh": _minutes_strings(minutes_h, goals_h),
+        "mgola": _minutes_strings(minutes_a, goals_a),
+    })
+
+    for i, line in enumerate([0.5, 1.5, 2.5, 3.5, 4.5]):
+        p_over = np.clip(_poisson_over(total, line), 0.02, 0.98)
+        suffix = "" if line == 2.5 else str(i)
+        df[f"cotao{suffix}"] = _odds(p_over, rng)
+        df[f"cotau{suffix}"] = _odds(1 - p_over, rng)
+
+    for i in range(MAX_GOALS):
+        df[f"gh{i + 1}"] = np.where(minutes_h[:, i] > 0, minutes_h[:, i], np.nan)
+        df[f"ga{i + 1}"] = np.where(minutes_a[:, i] > 0, minutes_a[:, i], np.nan)
+
+    # Partite ancora da giocare e quote mancanti
+    future = rng.random(n_rows) < unplayed
+    df.loc[future, ["scor1", "scor2", "scorp1", "scorp2"]] = np.nan
+    df.loc[future, ["mgolh", "mgola"]] = ""
+    no_odds = rng.random(n_rows) < missing_odds
+    df.loc[no_odds, ["cotaa", "cotae", "cotad"]] = np.nan
+
+    return df
+
+def prepared_matches(n_rows, seed=0):
+    """
+    generate_matches già passato per normalize_raw e prepare_matches,
+    come il dataset che ricevono le pagine.
+    """
+    return prepare_matches(normalize_raw(generate_matches(n_rows, seed=seed)))
+
+# --------------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------------
+def _goal_timeframes_by_label(df, fn=calculate_goal_timeframes):
+    # Come la pagina Macro Stats: una chiamata per Label
+    for label in df["Label"].dropna().unique():
+        fn(df[df["Label"] == label], label)
+
+def _odds_sweep_by_country(df):
+    for _, sub_df in df.groupby("country"):
+        calculate_odds_sweep(sub_df, "HOME", "<=")
+
+# nome → (funzione su {"raw", "normalized", "df", "league", "played"}, righe massime senza --full)
+# Le versioni riga per riga (iterrows / apply) oltre 100k righe richiedono minuti.
+BENCHMARKS = {
+    "normalize_raw": (lambda d: normalize_raw(d["raw"]), None),
+    "prepare_matches": (lambda d: prepare_matches(d["normalized"]), None),
+    "label_match": (lambda d: d["df"].apply(label_match, axis=1), 100_000),
+    "label_series": (lambda d: label_series(d["df"]), None),
+    "extract_minutes": (lambda d: extract_minutes(d["df"]["minuti goal segnato home"]), None),
+    "extract_minutes_array": (lambda d: extract_minutes_array(d["df"]["minuti goal segnato home"]), None),
+    "calculate_goal_timeframes": (lambda d: _goal_timeframes_by_label(d["league"]), 100_000),
+    "calculate_goal_timeframes_vectorized": (lambda d: _goal_timeframes_by_label(d["league"], calculate_goal_timeframes_vectorized), None),
+    "compute_goal_patterns": (lambda d: compute_goal_patterns(d["played"], "Home", len(d["played"])), 100_000),
+    "compute_goal_patterns_vectorized": (lambda d: compute_goal_patterns_vectorized(d["played"], "Home", len(d["played"])), None),
+    "calculate_back_lay": (lambda d: calculate_back_lay(d["df"]), 100_000),
+    "calculate_back_lay_vectorized": (lambda d: calculate_back_lay_vectorized(d["df"]), None),
+    "macro/prepare_league_frame": (lambda d: prepare_league_frame(d["df"]), None),
+    "macro/league_summary": (lambda d: league_summary(d["league"]), None),
+    "macro/label_summary": (lambda d: label_summary(d["league"]), None),
+    "macro/markets": (lambda d: (evaluate_markets(d["league"], ["country"]), evaluate_markets(d["league"], ["Label"])), None),
+    "macro/markets_by_team": (lambda d: evaluate_markets_by_team(d["league"]), None),
+    "macro/odds_sweep": (lambda d: _odds_sweep_by_country(d["league"]), None),
+    "inplay/build_tables": (lambda d: build_inplay_tables(d["df"]), None),
+}
+
+def build_inputs(n_rows, seed=0):
+    raw = generate_matches(n_rows, seed=seed)
+    normalized = normalize_raw(raw)
+    df = prepare_matches(normalized)
+    return {
+        "raw": raw,
+        "normalized": normalized,
+        "df": df,
+        "league": prepare_league_frame(df),
+        "played": df[played_mask(df)],
+    }
+
+def measure(fn, inputs, repeat=3):
+    """
+    Tempo migliore su repeat esecuzioni e picco di memoria (MB) di
+    un'esecuzione con tracemalloc attivo.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(inputs)
+        times.append(time.perf_counter() - start)
+
+    start_run("benchmark", memory=True)
+    with stage("bench"):
+        fn(inputs)
+    report = end_run(log=False)
+
+    return min(times), report["stages"][0]["peak_mb"]
+
+def run_benchmarks(sizes, names=None, repeat=3, full=False, seed=0):
+    results = []
+    for n_rows in sizes:
+        inputs = build_inputs(n_rows, seed=seed)
+        for name, (fn, max_rows) in BENCHMARKS.items():
+            if names and name not in names:
+                continue
+            if max_rows is not None and n_rows > max_rows and not full:
+                print(f"{name:<28} {n_rows:>9} righe  saltato (oltre {max_rows} righe, usa --full)")
+                continue
+
+            seconds, peak_mb = measure(fn, inputs, repeat=repeat if n_rows < 1_000_000 else 1)
+            result = {
+                "bench": name,
+                "rows": n_rows,
+                "seconds": round(seconds, 4),
+                "rows_per_s": round(n_rows / seconds) if seconds > 0 else None,
+                "peak_mb": peak_mb,
+            }
+            results.append(result)
+            print(
+                f"{name:<28} {n_rows:>9} righe  {seconds * 1000:10.1f} ms  "
+                f"{result['rows_per_s'] or 0:>12,} righe/s  picco {peak_mb:8.1f} MB"
+            )
+    return results
+
+# --------------------------------------------------------
+# TRASFERIMENTO SUPABASE (server PostgREST locale)
+# --------------------------------------------------------
+def _postgrest_pages(raw, page_size):
+    """
+    {offset: (json, csv)} come li restituirebbe PostgREST: JSON con null
+    per i valori mancanti, CSV con intestazione e campi vuoti.
+    """
+    pages = {}
+    for offset in range(0, len(raw), page_size):
+        page = raw.iloc[offset:offset + page_size]
+        records = page.astype(object).where(page.notna(), None).to_dict("records")
+        pages[offset] = (json.dumps(records).encode(), page.to_csv(index=False).encode())
+    return pages
+
+def serve_postgrest_stub(n_rows, seed, page_size, conn):
+    """
+    Processo server: GET /rest/v1/<tabella>?offset=&limit= con Accept
+    application/json o text/csv. Invia su conn (porta, byte JSON, byte CSV).
+    """
+    pages = _postgrest_pages(generate_matches(n_rows, seed=seed), page_size)
+    empty = {"json": b"[]", "csv": b""}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            params = parse_qs(urlsplit(self.path).query)
+            offset = int(params.get("offset", ["0"])[0])
+            fmt = "csv" if "text/csv" in self.headers.get("Accept", "") else "json"
+            page = pages.get(offset)
+            body = empty[fmt] if page is None else page[fmt == "csv"]
+            end = min(offset + page_size, n_rows) - 1
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv" if fmt == "csv" else "application/json")
+            self.send_header("Content-Range", f"{offset}-{end}/{n_rows}" if page is not None else f"*/{n_rows}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    conn.send((
+        server.server_address[1],
+        sum(len(page[0]) for page in pages.values()),
+        sum(len(page[1]) for page in pages.values()),
+    ))
+    server.serve_forever()
+
+def run_transfer_benchmark(sizes, repeat=3, seed=0, page_size=1000):
+    """
+    Download + normalize_raw della tabella dal server finto, JSON contro
+    CSV, con un client HTTP nuovo a ogni download o con il client
+    condiviso dell'app (+pool). Controlla anche che i percorsi diano gli
+    stessi dati.
+    """
+    from equivalence import diff_outputs
+    from supabase_source import SUPABASE_KEY, fetch_table, new_http_client
+
+    results = []
+    for n_rows in sizes:
+        parent, child = multiprocessing.Pipe()
+        server = multiprocessing.Process(
+            target=serve_postgrest_stub, args=(n_rows, seed, page_size, child), daemon=True
+        )
+        server.start()
+        try:
+            port, json_bytes, csv_bytes = parent.recv()
+            url = f"http://127.0.0.1:{port}"
+
+            frames = {}
+            for mode, n_bytes, pooled in [
+                ("json", json_bytes, False), ("json", json_bytes, True),
+                ("csv", csv_bytes, False), ("csv", csv_bytes, True),
+            ]:
+                http = new_http_client() if pooled else None
+                name = f"{mode}+pool" if pooled else mode
+
+                best, best_cpu = None, None
+                for _ in range(repeat):
+                    start, cpu = time.perf_counter(), time.process_time()
+                    df = normalize_raw(fetch_table(mode, url=url, key=SUPABASE_KEY, page_size=page_size, http=http))
+                    seconds, cpu_s = time.perf_counter() - start, time.process_time() - cpu
+                    if best is None or seconds < best:
+                        best, best_cpu = seconds, cpu_s
+                frames[mode] = df
+                if http is not None:
+                    http.close()
+
+                results.append({
+                    "bench": f"transfer/{name}",
+                    "rows": n_rows,
+                    "seconds": round(best, 4),
+                    "cpu_s": round(best_cpu, 4),
+                    "mb": round(n_bytes / (1024 * 1024), 2),
+                })
+                print(
+                    f"transfer/{name:<19} {n_rows:>9} righe  {best * 1000:10.1f} ms  "
+                    f"{round(n_rows / best):>12,} righe/s  CPU {best_cpu * 1000:10.1f} ms  {n_bytes / (1024 * 1024):8.1f} MB"
+                )
+        finally:
+            server.terminate()
+            server.join()
+
+        # Stessi dati: in CSV stringa vuota e NULL coincidono
+        cells, mismatches = diff_outputs(frames["json"].replace("", np.nan), frames["csv"].replace("", np.nan), 1e-9)
+        status = "stessi dati" if not mismatches and list(frames["json"].columns) == list(frames["csv"].columns) \
+            else f"DIFFERENZE: {mismatches[:3]}"
+        print(f"{'':<28} {n_rows:>9} righe  json vs csv: {cells} celle, {status}")
+
+    return results
+
+# --------------------------------------------------------
+# BASELINE: SALVATAGGIO E CONFRONTO
+# --------------------------------------------------------
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def save_baseline(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+
+def compare_baseline(results, path, tolerance=1.25):
+    """
+    Confronta con una baseline salvata: speedup = tempo baseline / tempo
+    attuale. Restituisce 1 se un benchmark è più lento di tolerance volte.
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = {(r["bench"], r["rows"]): r for r in json.load(f)["results"]}
+
+    print(f"\nConfronto con {path} (tolleranza {tolerance:.2f}x)")
+    slower = 0
+    for result in results:
+        old = baseline.get((result["bench"], result["rows"]))
+        if old is None or not result["seconds"]:
+            continue
+        speedup = old["seconds"] / result["seconds"]
+        status = "REGRESSIONE" if speedup < 1 / tolerance else "OK"
+        slower += status != "OK"
+        print(
+            f"{result['bench']:<28} {result['rows']:>9} righe  "
+            f"{old['seconds'] * 1000:10.1f} → {result['seconds'] * 1000:10.1f} ms  "
+            f"speedup {speedup:6.2f}x  picco {old['peak_mb']:.1f} → {result['peak_mb']:.1f} MB  {status}"
+        )
+    return 1 if slower else 0
+
+# --------------------------------------------------------
+# ENTRY POINT
+# --------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark Trading Dashboard su dati sintetici.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Dimensioni del dataset")
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="Benchmark da eseguire (default: tutti)")
+    parser.add_argument("--repeat", type=int, default=3, help="Esecuzioni per misura (tempo migliore)")
+    parser.add_argument("--full", action="store_true", help="Esegue anche le versioni riga per riga oltre il limite di righe")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Salva i risultati come baseline JSON")
+    parser.add_argument("--compare", help="Confronta con una baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Rallentamento massimo accettato nel confronto")
+    parser.add_argument("--transfer", action="store_true", help="Download JSON vs CSV da un server PostgREST locale")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.transfer:
+        run_transfer_benchmark(args.rows, args.repeat, args.seed)
+        return 0
+    results = run_benchmarks(args.rows, args.only, args.repeat, args.full, args.seed)
+
+    if args.save:
+        save_baseline(results, args.save)
+        print(args.save)
+
+    if args.compare:
+        return compare_baseline(results, args.compare, args.tolerance)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
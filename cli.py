@@ -0,0 +1,419 @@
+"""
+Report da riga di comando, senza Streamlit.
+
+Esempi:
+    python cli.py league "serie a 20-25.xlsx" "korea 1.xlsx" --out report
+    python cli.py team "serie a 20-25.xlsx" --seasons 2024 2025 --format xlsx --out report
+    python cli.py pre-match "serie a 20-25.xlsx" --fixtures partite.csv --out report
+    python cli.py import-budget
+    python cli.py snapshot "serie a 20-25.xlsx" "korea 1.xlsx" --out partite.parquet
+    python cli.py league partite.parquet --engine duckdb --threads 4 --memory-limit 2GB
+    python cli.py mirror --supabase
+    python cli.py mirror "korea 1.xlsx" --db partite_mirror.sqlite
+    python cli.py league partite_mirror.sqlite --country "serie a"
+    python cli.py inplay "serie a 20-25.xlsx" --by Label --out inplay_label.npz
+    python cli.py inplay inplay_label.npz --minute 60 --score 1-0 --group "H_SmallFav 2-3"
+
+I dati vengono divisi per campionato (country) e ogni campionato è
+elaborato in un processo separato (--workers). Con --engine duckdb o
+--engine polars (default: variabile STATS_BACKEND) le tabelle league
+(summary, labels) e team (macro) sono invece calcolate da query SQL o
+Polars lazy direttamente sui file Parquet, senza caricare le partite in
+pandas (richiede pip install duckdb / polars; i file Excel/CSV vengono
+prima convertiti in uno snapshot temporaneo).
+
+I file .sqlite/.db sono mirror locali (local_mirror): campionati,
+stagioni e data (core.filters) vengono applicati direttamente nella query.
+"""
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+from core.backend import BACKENDS, STATS_BACKEND
+from core.dataset import read_matches_file, normalize_raw, normalize_matches, prepare_matches, enable_copy_on_write
+from core.league import MACRO_REQUIRED_COLS
+from core.batch import read_fixtures
+from core.cross_league import run_partitions
+from core.filters import filter_spec, apply_filters
+
+# --------------------------------------------------------
+# CARICAMENTO DATI
+# --------------------------------------------------------
+MIRROR_EXTENSIONS = (".sqlite", ".db")
+
+def cli_filters(countries=None, seasons=None):
+    # Come la dashboard: niente partite future
+    return filter_spec(countries, seasons, until=pd.Timestamp.today().normalize())
+
+def read_source(path, spec):
+    """
+    File Excel/CSV, oppure mirror SQLite filtrato già nella query.
+    """
+    if str(path).lower().endswith(MIRROR_EXTENSIONS):
+        from local_mirror import read_mirror
+        return normalize_matches(read_mirror(path, spec["countries"], spec["seasons"], spec["until"]))
+    return read_matches_file(path)
+
+def load_matches(paths, countries=None, seasons=None):
+    """
+    Legge e concatena i file e applica una volta i filtri (campionati,
+    stagioni, niente partite future) prima di preparare le partite.
+    """
+    spec = cli_filters(countries, seasons)
+    df = pd.concat([read_source(path, spec) for path in paths], ignore_index=True)
+
+    missing = [col for col in MACRO_REQUIRED_COLS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Mancano colonne essenziali: {missing}")
+
+    df["country"] = df["country"].fillna("Unknown").astype(str).str.strip()
+    df["Stagione"] = df["Stagione"].fillna("Unknown").astype(str)
+
+    # Data è già convertita da normalize_matches: tutti i filtri prima di prepare
+    df = apply_filters(df, spec)
+
+    # Nomi squadra, colonne derivate e Label una sola volta
+    df = prepare_matches(df)
+
+    return df.reset_index(drop=True)
+
+# --------------------------------------------------------
+# MOTORI DUCKDB / POLARS (snapshot Parquet)
+# --------------------------------------------------------
+def build_snapshot(paths, out):
+    """
+    Snapshot Parquet della tabella partite con le colonne di analisi
+    (anche le partite future: il filtro per data è applicato nelle query).
+    """
+    from core.sql import write_snapshot
+
+    df = pd.concat([read_matches_file(path) for path in paths], ignore_index=True)
+    return write_snapshot(prepare_matches(df), out)
+
+def snapshot_sources(paths, tmp_dir):
+    # I Parquet vengono letti così come sono, gli altri file convertiti una volta
+    sources = [path for path in paths if path.lower().endswith(".parquet")]
+    others = [path for path in paths if not path.lower().endswith(".parquet")]
+    if others:
+        sources.append(build_snapshot(others, os.path.join(tmp_dir, "partite.parquet")))
+    return sources
+
+def run_polars_reports(command, sources, spec):
+    from core.polars_backend import to_lazy, league_summary_polars, group_stats_polars, team_macro_stats_polars
+
+    lf = to_lazy(sources)
+    countries, seasons, until = spec["countries"], spec["seasons"], spec["until"]
+    if command == "league":
+        return {
+            "summary": league_summary_polars(lf, countries, seasons, until),
+            "labels": group_stats_polars(lf, ["country", "Label"], countries, seasons, until),
+        }
+    return {"macro": team_macro_stats_polars(lf, None, countries, seasons, until, by_country=True)}
+
+def run_engine_reports(engine, command, paths, countries=None, seasons=None, threads=None, memory_limit=None):
+    """
+    Tabelle league/team calcolate da DuckDB o Polars sugli snapshot
+    Parquet, con gli stessi filtri di load_matches (campionati, stagioni,
+    niente partite future).
+    """
+    spec = cli_filters(countries, seasons)
+    countries, seasons, until = spec["countries"], spec["seasons"], spec["until"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sources = snapshot_sources(paths, tmp_dir)
+        if engine == "polars":
+            return run_polars_reports(command, sources, spec)
+
+        from core.sql import connect, league_summary_sql, group_stats_sql, team_macro_stats_sql
+
+        con = connect(sources, threads, memory_limit, tmp_dir)
+        try:
+            if command == "league":
+                return {
+                    "summary": league_summary_sql(con, countries, seasons, until),
+                    "labels": group_stats_sql(con, ["country", "Label"], countries, seasons, until),
+                }
+            return {"macro": team_macro_stats_sql(con, None, countries, seasons, until, by_country=True)}
+        finally:
+            con.close()
+
+# --------------------------------------------------------
+# SCRITTURA OUTPUT
+# --------------------------------------------------------
+def write_tables(tables, command, out, fmt):
+    if out is None:
+        for name, table in tables.items():
+            print(f"\n=== {command} - {name} ===")
+            print(table.to_string(index=False))
+        return []
+
+    os.makedirs(out, exist_ok=True)
+    written = []
+
+    if fmt == "xlsx":
+        path = os.path.join(out, f"{command}.xlsx")
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            for name, table in tables.items():
+                table.to_excel(writer, index=False, sheet_name=name[:31])
+        return [path]
+
+    for name, table in tables.items():
+        path = os.path.join(out, f"{command}_{name}.{fmt}")
+        if fmt == "json":
+            table.to_json(path, orient="records", force_ascii=False, indent=2, date_format="iso")
+        else:
+            table.to_csv(path, index=False)
+        written.append(path)
+
+    return written
+
+# --------------------------------------------------------
+# BUDGET TEMPI DI IMPORT (avvio a freddo)
+# --------------------------------------------------------
+# Millisecondi oltre a streamlit + pandas, che ogni sessione carica comunque
+IMPORT_BUDGET_MS = {
+    "avvio app": (["utils", "core.dataset", "core.labels"], 150),
+    "pagina Macro Stats": (["macros"], 300),
+    "pagina Squadre": (["squadre"], 150),
+    "pagina Pre Match": (["pre_match"], 250),
+    "pagina Batch Pre Match": (["batch_pre_match"], 150),
+}
+
+IMPORT_BASELINE = ["streamlit", "pandas"]
+
+def measure_import_ms(modules, baseline=IMPORT_BASELINE):
+    """
+    Tempo di import di modules in un interprete nuovo, dopo aver già
+    importato baseline (escluso dal conteggio).
+    """
+    code = (
+        "import importlib, time\n"
+        f"for m in {list(baseline)!r}: importlib.import_module(m)\n"
+        "t = time.perf_counter()\n"
+        f"for m in {list(modules)!r}: importlib.import_module(m)\n"
+        "print((time.perf_counter() - t) * 1000)\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+def check_import_budget(repeat=5):
+    """
+    Misura (mediana su repeat avvii) il costo di import dell'app e di ogni
+    pagina e lo confronta con IMPORT_BUDGET_MS. Restituisce 1 se un
+    budget è superato.
+    """
+    baseline = statistics.median(measure_import_ms(IMPORT_BASELINE, baseline=[]) for _ in range(repeat))
+    print(f"{'streamlit + pandas':<24} {baseline:8.1f} ms  (base)")
+
+    over = 0
+    for name, (modules, budget) in IMPORT_BUDGET_MS.items():
+        elapsed = statistics.median(measure_import_ms(modules) for _ in range(repeat))
+        status = "OK" if elapsed <= budget else "OLTRE"
+        over += elapsed > budget
+        print(f"{name:<24} {elapsed:8.1f} ms  budget {budget:5d} ms  {status}")
+
+    return 1 if over else 0
+
+# --------------------------------------------------------
+# MIRROR LOCALE
+# --------------------------------------------------------
+def update_mirror(paths, from_supabase=False, db=None):
+    """
+    Sync completo da Supabase e/o sostituzione dei campionati dei file.
+    """
+    from local_mirror import MIRROR_PATH, sync_mirror
+
+    if not paths and not from_supabase:
+        raise ValueError("Indicare dei file oppure --supabase")
+
+    db = db or MIRROR_PATH
+    info = None
+
+    if from_supabase:
+        from supabase_source import fetch_table
+        info = sync_mirror(normalize_raw(fetch_table()), db, source="supabase")
+
+    for path in paths:
+        df = pd.read_csv(path) if str(path).endswith(".csv") else pd.read_excel(path)
+        # Come read_matches_file: i file con i nomi di analisi restano come sono
+        if "Home" not in df.columns:
+            df = normalize_raw(df)
+        info = sync_mirror(df, db, source=f"file:{os.path.basename(path)}", replace_countries=True)
+
+    return info
+
+# --------------------------------------------------------
+# TABELLE IN-PLAY (core.inplay)
+# --------------------------------------------------------
+INPLAY_LABELS = {
+    "p_goal": "P altro goal",
+    "p_next_home": "P prossimo goal casa",
+    "p_next_away": "P prossimo goal ospite",
+    "p_goal_window": "P goal entro {window}'",
+    "expected_goals": "Goal attesi",
+}
+
+def run_inplay(args):
+    """
+    Costruisce (da file di partite) o carica (da .npz) le tabelle in-play
+    e, con --minute / --score, risponde per quello stato di partita.
+    """
+    from core.inplay import (
+        ALL_GROUPS, build_inplay_tables, save_inplay_tables, load_inplay_tables, inplay_probabilities
+    )
+
+    if len(args.files) == 1 and args.files[0].lower().endswith(".npz"):
+        tables = load_inplay_tables(args.files[0])
+    else:
+        df = load_matches(args.files, args.country, args.seasons)
+        tables = build_inplay_tables(df, args.by, window=args.window)
+        print(
+            f"Tabelle in-play per {tables['group_col']}: {len(tables['groups']) - 1} gruppi, "
+            f"{tables['used']} partite ({tables['skipped']} senza minuti goal coerenti col risultato)"
+        )
+        if args.out:
+            print(save_inplay_tables(tables, args.out))
+
+    if args.minute is None:
+        return 0
+
+    home, _, away = args.score.partition("-")
+    result = inplay_probabilities(tables, args.minute, int(home), int(away), args.group or ALL_GROUPS)
+    if result is None:
+        raise ValueError(f"Gruppo sconosciuto per {tables['group_col']}: {args.group!r}")
+
+    print(f"{args.group or ALL_GROUPS} · minuto {args.minute} · {args.score}: {result['matches']} partite")
+    for name, label in INPLAY_LABELS.items():
+        if name in result:
+            print(f"  {label.format(window=tables['window']):<24} {result[name]:.3f}")
+    return 0
+
+# --------------------------------------------------------
+# ENTRY POINT
+# --------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Report statistici Trading Dashboard senza interfaccia.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in [
+        ("league", "Macro stats per campionato, Label e mercati"),
+        ("team", "Statistiche macro e goal pattern per squadra"),
+        ("pre-match", "Report pre-match per una lista di partite"),
+    ]:
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("files", nargs="+", help="File Excel/CSV di partite")
+        cmd.add_argument("--country", nargs="*", help="Campionati da includere (default: tutti)")
+        cmd.add_argument("--seasons", nargs="*", help="Stagioni da includere (default: tutte)")
+        cmd.add_argument("--out", help="Cartella di output (default: stampa a video)")
+        cmd.add_argument("--format", choices=["csv", "xlsx", "json"], default="csv")
+        cmd.add_argument("--workers", type=int, default=None, help="Processi paralleli (1 = seriale)")
+        if name != "pre-match":
+            cmd.add_argument(
+                "--engine", choices=BACKENDS, default=STATS_BACKEND,
+                help="polars/duckdb: tabelle aggregate su Parquet (senza mercati e goal pattern)"
+            )
+            cmd.add_argument("--threads", type=int, default=None, help="Thread DuckDB (default: tutti i core)")
+            cmd.add_argument("--memory-limit", help="Memoria massima DuckDB, es. 2GB (oltre usa il disco)")
+        if name == "pre-match":
+            cmd.add_argument("--fixtures", required=True, help="CSV home, away, odd_home, odd_draw, odd_away")
+
+    snapshot = sub.add_parser("snapshot", help="Snapshot Parquet delle partite per --engine duckdb")
+    snapshot.add_argument("files", nargs="+", help="File Excel/CSV di partite")
+    snapshot.add_argument("--out", required=True, help="File Parquet da scrivere")
+
+    mirror = sub.add_parser("mirror", help="Aggiorna il mirror SQLite locale da Supabase o da file")
+    mirror.add_argument("files", nargs="*", help="File Excel/CSV: sostituiscono i loro campionati nel mirror")
+    mirror.add_argument("--supabase", action="store_true", help="Ricostruisce il mirror da tutta la tabella Supabase")
+    mirror.add_argument("--db", default=None, help="File SQLite (default: LOCAL_MIRROR_PATH)")
+
+    inplay = sub.add_parser("inplay", help="Tabelle in-play (minuto × punteggio × gruppo) e domande su uno stato")
+    inplay.add_argument("files", nargs="+", help="File Excel/CSV/mirror di partite, oppure un .npz già costruito")
+    inplay.add_argument("--country", nargs="*", help="Campionati da includere (default: tutti)")
+    inplay.add_argument("--seasons", nargs="*", help="Stagioni da includere (default: tutte)")
+    inplay.add_argument("--by", default="Label", help="Colonna dei gruppi, es. Label, Home, Away, country")
+    inplay.add_argument("--window", type=int, default=15, help="Minuti per P(goal entro N minuti)")
+    inplay.add_argument("--out", help="File .npz in cui salvare le tabelle")
+    inplay.add_argument("--minute", type=int, help="Minuto dello stato da interrogare")
+    inplay.add_argument("--score", default="0-0", help="Punteggio al minuto, es. 1-0")
+    inplay.add_argument("--group", help="Gruppo (es. un Label o una squadra; default: tutte le partite)")
+
+    budget = sub.add_parser("import-budget", help="Tempi di import dell'app e delle pagine rispetto al budget")
+    budget.add_argument("--repeat", type=int, default=5, help="Avvii misurati per modulo (mediana)")
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    enable_copy_on_write()
+
+    if args.command == "import-budget":
+        return check_import_budget(args.repeat)
+
+    if args.command == "snapshot":
+        try:
+            print(build_snapshot(args.files, args.out))
+        except (ValueError, OSError, ImportError) as e:
+            print(f"Errore: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == "inplay":
+        try:
+            return run_inplay(args)
+        except (ValueError, OSError) as e:
+            print(f"Errore: {e}", file=sys.stderr)
+            return 1
+
+    if args.command == "mirror":
+        try:
+            info = update_mirror(args.files, args.supabase, args.db)
+        except (ValueError, OSError) as e:
+            print(f"Errore: {e}", file=sys.stderr)
+            return 1
+        print(f"{info['path']}: {info['rows']} righe ({info['source']}, {info['synced_at']})")
+        return 0
+
+    if getattr(args, "engine", "pandas") != "pandas":
+        try:
+            tables = run_engine_reports(
+                args.engine, args.command, args.files, args.country, args.seasons, args.threads, args.memory_limit
+            )
+        except (ValueError, OSError, ImportError) as e:
+            print(f"Errore: {e}", file=sys.stderr)
+            return 1
+
+        for path in write_tables(tables, args.command, args.out, args.format):
+            print(path)
+        return 0
+
+    try:
+        df = load_matches(args.files, args.country, args.seasons)
+        fixtures = read_fixtures(args.fixtures) if args.command == "pre-match" else None
+    except (ValueError, OSError, csv.Error) as e:
+        print(f"Errore: {e}", file=sys.stderr)
+        return 1
+
+    if df.empty:
+        print("Nessuna partita dopo i filtri.", file=sys.stderr)
+        return 1
+
+    tables = run_partitions(args.command, df, fixtures, args.workers)
+    if not tables:
+        print("Nessun campionato corrisponde alle partite indicate.", file=sys.stderr)
+        return 1
+
+    for path in write_tables(tables, args.command, args.out, args.format):
+        print(path)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Calcoli statistici senza Streamlit: DataFrame in ingresso, risultati in uscita.
+
+- core.dataset    lettura file, normalizzazione e colonne derivate
+- core.filters    filtri campionato / stagioni / data / giocate (filter_spec)
+- core.labels     Label da quote, minuti goal, profitti back/lay
+- core.league     statistiche di campionato (Macro Stats)
+- core.team       statistiche e goal pattern per squadra
+- core.pre_match  campioni e back/lay per il confronto pre-match
+- core.batch      report pre-match per una lista di partite
+- core.markets    mercati Over/Under e BTTS
+- core.cross_league  report per campionato in parallelo (Tutti i campionati)
+- core.bootstrap  intervalli di confidenza sul ROI
+- core.goal_model modello Poisson / Dixon-Coles
+- core.elo        rating Elo incrementale
+- core.inplay     tabelle in-play per minuto e punteggio (.npz)
+- core.perf       tempi e memoria per fase (load, normalize, label, ...)
+- core.sql        tabelle aggregate in DuckDB su snapshot Parquet (opzionale)
+- core.polars_backend  ingest e tabelle come query Polars lazy (opzionale)
+- core.backend    scelta pandas / polars / duckdb (STATS_BACKEND)
+
+I moduli vanno importati singolarmente (es. from core.league import
+league_summary): il pacchetto non carica nulla all'import.
+"""
@@ -0,0 +1,62 @@
+import os
+
+from core.dataset import normalize_raw, prepare_matches
+from core.league import league_summary, label_summary
+
+# --------------------------------------------------------
+# SCELTA DEL BACKEND DI CALCOLO
+# --------------------------------------------------------
+# STATS_BACKEND (variabile d'ambiente) sceglie chi esegue ingest e tabelle
+# di campionato: "pandas" (default), "polars" (core.polars_backend) o
+# "duckdb" (core.sql, solo tabelle). I risultati sono sempre DataFrame
+# pandas con gli stessi valori; i backend opzionali vanno installati a
+# parte (pip install polars / duckdb).
+
+BACKENDS = ["pandas", "polars", "duckdb"]
+STATS_BACKEND = os.environ.get("STATS_BACKEND", "pandas").strip().lower()
+
+def resolve_backend(backend=None):
+    backend = (backend or STATS_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend sconosciuto: {backend!r} (validi: {', '.join(BACKENDS)})")
+    return backend
+
+def normalize(df, backend=None):
+    """
+    normalize_raw con il backend scelto (duckdb usa pandas).
+    """
+    if resolve_backend(backend) == "polars":
+        from core.polars_backend import normalize_raw_polars
+        return normalize_raw_polars(df)
+    return normalize_raw(df)
+
+def prepare(df, backend=None):
+    """
+    prepare_matches con il backend scelto (duckdb usa pandas).
+    """
+    if resolve_backend(backend) == "polars":
+        from core.polars_backend import prepare_matches_polars
+        return prepare_matches_polars(df)
+    return prepare_matches(df)
+
+def league_tables(df, backend=None):
+    """
+    (League Stats Summary, League Data by Start Price) per un DataFrame
+    già passato da prepare_league_frame.
+    """
+    backend = resolve_backend(backend)
+
+    if backend == "polars":
+        from core.polars_backend import to_lazy, league_summary_polars, label_summary_polars
+        lf = to_lazy(df)
+        return league_summary_polars(lf), label_summary_polars(lf)
+
+    if backend == "duckdb":
+        from core.sql import connect, league_summary_sql, label_summary_sql
+        con = connect(df)
+        try:
+            return league_summary_sql(con), label_summary_sql(con)
+        finally:
+            con.close()
+
+    return league_summary(df), label_summary(df)
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+from core.labels import label_series
+from core.pre_match import back_lay_profits
+from core.team import played_mask
+
+OUTCOMES = ["HOME", "DRAW", "AWAY"]
+
+# Nomi colonna accettati nel CSV delle partite
+FIXTURE_ALIASES = {
+    "home": ["home", "casa", "squadra casa"],
+    "away": ["away", "ospite", "squadra ospite"],
+    "odd_home": ["odd_home", "odd home", "quota casa", "1"],
+    "odd_draw": ["odd_draw", "odd draw", "quota pareggio", "x"],
+    "odd_away": ["odd_away", "odd away", "quota ospite", "2"],
+}
+
+# --------------------------------------------------------
+# LETTURA CSV PARTITE
+# --------------------------------------------------------
+def read_fixtures(uploaded_file):
+    """
+    Legge il CSV delle partite (home, away, odd_home, odd_draw, odd_away),
+    con separatore ',' o ';' e virgola decimale.
+    """
+    fixtures = pd.read_csv(uploaded_file, sep=None, engine="python", dtype=str)
+    fixtures.columns = fixtures.columns.str.strip().str.lower()
+
+    rename = {}
+    for target, aliases in FIXTURE_ALIASES.items():
+        for alias in aliases:
+            if alias in fixtures.columns:
+                rename[alias] = target
+                break
+
+    fixtures = fixtures.rename(columns=rename)
+    missing = [col for col in FIXTURE_ALIASES if col not in fixtures.columns]
+    if missing:
+        raise ValueError(f"Colonne mancanti nel CSV: {missing}")
+
+    fixtures = fixtures[list(FIXTURE_ALIASES)]
+    fixtures["home"] = fixtures["home"].str.strip()
+    fixtures["away"] = fixtures["away"].str.strip()
+    for col in ["odd_home", "odd_draw", "odd_away"]:
+        fixtures[col] = pd.to_numeric(fixtures[col].str.replace(",", "."), errors="coerce")
+
+    return fixtures.reset_index(drop=True)
+
+# --------------------------------------------------------
+# STORICO CON PROFITTI PER RIGA
+# --------------------------------------------------------
+def history_frame(df):
+    """
+    Una riga per partita storica con Label, squadre, esiti e profitti
+    back/lay per HOME, DRAW, AWAY: le tabelle per Label e per squadra si
+    ottengono poi con semplici somme per gruppo.
+    """
+    hist = pd.DataFrame({
+        "Label": df["Label"].to_numpy() if "Label" in df.columns else label_series(df).to_numpy(),
+        "Home": df["Home"].astype(str).str.strip().to_numpy(),
+        "Away": df["Away"].astype(str).str.strip().to_numpy(),
+        "n": 1,
+    })
+
+    for outcome, (won, back, lay) in back_lay_profits(df).items():
+        hist[f"win_{outcome}"] = won.astype(int)
+        hist[f"back_{outcome}"] = back
+        hist[f"lay_{outcome}"] = lay
+
+    return hist
+
+def _sample_columns(sums, prefix):
+    """
+    Da somme per gruppo (n, win_*, back_*, lay_*) alle colonne del report.
+    """
+    n = sums["n"].to_numpy(dtype=float)
+    out = {f"{prefix} Matches": sums["n"].to_numpy()}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for outcome in OUTCOMES:
+            out[f"{prefix} Win% {outcome}"] = np.where(n > 0, sums[f"win_{outcome}"] / n * 100, 0).round(2)
+        for outcome in OUTCOMES:
+            back = sums[f"back_{outcome}"].to_numpy(dtype=float)
+            lay = sums[f"lay_{outcome}"].to_numpy(dtype=float)
+            out[f"{prefix} Back Pts {outcome}"] = back.round(2)
+            out[f"{prefix} Back ROI% {outcome}"] = np.where(n > 0, back / n * 100, 0).round(2)
+            out[f"{prefix} Lay Pts {outcome}"] = lay.round(2)
+            out[f"{prefix} Lay ROI% {outcome}"] = np.where(n > 0, lay / n * 100, 0).round(2)
+
+    return pd.DataFrame(out)
+
+def _team_macro(played, team_col, goals_for, goals_against, teams, prefix):
+    """
+    compute_team_macro_stats per tutte le squadre con una sola groupby.
+    """
+    hg = played[goals_for]
+    ag = played[goals_against]
+    stats = pd.DataFrame({
+        "team": played[team_col].astype(str).str.strip(),
+        "win": (hg > ag) * 100.0,
+        "draw": (hg == ag) * 100.0,
+        "loss": (hg < ag) * 100.0,
+        "scored": hg,
+        "conceded": ag,
+        "btts": ((played["Home Goal FT"] > 0) & (played["Away Goal FT"] > 0)) * 100.0,
+    }).groupby("team").agg(
+        matches=("win", "size"),
+        win=("win", "mean"),
+        draw=("draw", "mean"),
+        loss=("loss", "mean"),
+        scored=("scored", "mean"),
+        conceded=("conceded", "mean"),
+        btts=("btts", "mean"),
+    ).reindex(teams)
+
+    return pd.DataFrame({
+        f"{prefix} Matches Played": stats["matches"].to_numpy(),
+        f"{prefix} Win %": stats["win"].round(2).to_numpy(),
+        f"{prefix} Draw %": stats["draw"].round(2).to_numpy(),
+        f"{prefix} Loss %": stats["loss"].round(2).to_numpy(),
+        f"{prefix} Avg Goals Scored": stats["scored"].round(2).to_numpy(),
+        f"{prefix} Avg Goals Conceded": stats["conceded"].round(2).to_numpy(),
+        f"{prefix} BTTS %": stats["btts"].round(2).to_numpy(),
+    })
+
+# --------------------------------------------------------
+# CALCOLO BATCH
+# --------------------------------------------------------
+def compute_batch_pre_match(df, fixtures):
+    """
+    Report pre-match per tutte le partite di fixtures in un solo passaggio.
+
+    Le regole sono quelle di run_pre_match: riga League sul Label (vuota se
+    Label "Others" o senza partite), squadra di casa solo per Label Home o
+    SuperCompetitive, squadra ospite solo per Label Away o SuperCompetitive,
+    con fallback su tutte le partite in casa/trasferta della squadra se il
+    Label non ne contiene. Le statistiche macro sono quelle di
+    compute_team_macro_stats.
+    """
+    hist = history_frame(df)
+    value_cols = [col for col in hist.columns if col not in ("Label", "Home", "Away")]
+
+    fixtures = fixtures.reset_index(drop=True)
+    labels = label_series(pd.DataFrame({
+        "Odd home": fixtures["odd_home"],
+        "Odd Away": fixtures["odd_away"],
+    })).to_numpy()
+
+    by_label = hist.groupby("Label")[value_cols].sum()
+    valid_label = (labels != "Others") & np.isin(labels, by_label.index)
+    use_home = valid_label & ~pd.Series(labels).str.startswith("A_").to_numpy()
+    use_away = valid_label & ~pd.Series(labels).str.startswith("H_").to_numpy()
+
+    # League
+    league = by_label.reindex(labels)
+
+    # Squadra casa: Label + squadra, fallback su tutte le partite in casa
+    home = hist.groupby(["Home", "Label"])[value_cols].sum().reindex(
+        pd.MultiIndex.from_arrays([fixtures["home"], labels])
+    ).reset_index(drop=True)
+    home_all = hist.groupby("Home")[value_cols].sum().reindex(fixtures["home"]).reset_index(drop=True)
+    home = home.where(home["n"] > 0, home_all).fillna(0)
+
+    # Squadra ospite: Label + squadra, fallback su tutte le partite in trasferta
+    away = hist.groupby(["Away", "Label"])[value_cols].sum().reindex(
+        pd.MultiIndex.from_arrays([fixtures["away"], labels])
+    ).reset_index(drop=True)
+    away_all = hist.groupby("Away")[value_cols].sum().reindex(fixtures["away"]).reset_index(drop=True)
+    away = away.where(away["n"] > 0, away_all).fillna(0)
+
+    played = df[played_mask(df)]
+
+    report = pd.concat([
+        fixtures.rename(columns={
+            "home": "Home", "away": "Away",
+            "odd_home": "Odd home", "odd_draw": "Odd Draw", "odd_away": "Odd Away",
+        }),
+        pd.DataFrame({"Label": labels}),
+        _sample_columns(league.reset_index(drop=True), "League"),
+        _sample_columns(home, "Casa"),
+        _sample_columns(away, "Ospite"),
+        _team_macro(played, "Home", "Home Goal FT", "Away Goal FT", fixtures["home"], "Macro Casa"),
+        _team_macro(played, "Away", "Away Goal FT", "Home Goal FT", fixtures["away"], "Macro Ospite"),
+    ], axis=1)
+
+    # Campioni non applicabili: come "N/A" nella pagina singola
+    for prefix, mask in [("League", valid_label), ("Casa", use_home), ("Ospite", use_away)]:
+        cols = [col for col in report.columns if col.startswith(prefix + " ")]
+        report.loc[~mask, cols] = np.nan
+
+    return report
@@ -0,0 +1,83 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from core.pre_match import back_lay_profits
+
+# --------------------------------------------------------
+# BOOTSTRAP INTERVALLI DI CONFIDENZA SU ROI BACK / LAY
+# --------------------------------------------------------
+
+OUTCOMES = ["HOME", "DRAW", "AWAY"]
+
+# Numero di ricampionamenti per blocco: ogni blocco ha il suo seed figlio,
+# quindi il risultato è identico in seriale e nel process pool.
+CHUNK_SIZE = 500
+
+# Oltre questa dimensione (ricampionamenti × partite) si usa il process pool
+PARALLEL_THRESHOLD = 20_000_000
+
+def profit_matrices(filtered_df):
+    """
+    Profitti back e lay riga per riga (matrici n × 3, colonne HOME, DRAW, AWAY)
+    con le stesse regole di calculate_back_lay.
+    """
+    rows = back_lay_profits(filtered_df)
+    back = np.column_stack([rows[outcome][1] for outcome in OUTCOMES])
+    lay = np.column_stack([rows[outcome][2] for outcome in OUTCOMES])
+    return back, lay
+
+def _bootstrap_chunk(args):
+    """
+    ROI% medi di un blocco di ricampionamenti: una matrice di indici
+    (n_resamples × n) e una media per riga.
+    """
+    back, lay, n_resamples, seed = args
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(back), size=(n_resamples, len(back)))
+    return back[idx].mean(axis=1) * 100, lay[idx].mean(axis=1) * 100
+
+def bootstrap_roi_ci(filtered_df, n_boot=2000, alpha=0.05, seed=42, max_workers=None, executor=None):
+    """
+    Intervalli di confidenza bootstrap (percentili) sul ROI% back e lay
+    di HOME, DRAW, AWAY.
+
+    Oltre PARALLEL_THRESHOLD i blocchi vanno in executor, un pool già
+    avviato da riusare (l'app passa il suo pool spawn); altrimenti se ne
+    crea uno spawn con max_workers processi (max_workers=1: in serie).
+
+    Restituisce {"back": {esito: (low, high)}, "lay": {esito: (low, high)}},
+    oppure None se non ci sono partite.
+    """
+    if len(filtered_df) == 0:
+        return None
+
+    back, lay = profit_matrices(filtered_df)
+
+    chunks = [CHUNK_SIZE] * (n_boot // CHUNK_SIZE)
+    if n_boot % CHUNK_SIZE:
+        chunks.append(n_boot % CHUNK_SIZE)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(back, lay, size, s) for size, s in zip(chunks, seeds)]
+
+    parallel = n_boot * len(back) > PARALLEL_THRESHOLD and len(tasks) > 1
+    if parallel and executor is not None:
+        parts = list(executor.map(_bootstrap_chunk, tasks))
+    elif parallel and max_workers != 1:
+        # spawn e non fork: chi chiama può avere altri thread (server Streamlit)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn")) as pool:
+            parts = list(pool.map(_bootstrap_chunk, tasks))
+    else:
+        parts = [_bootstrap_chunk(task) for task in tasks]
+
+    roi_back = np.vstack([p[0] for p in parts])
+    roi_lay = np.vstack([p[1] for p in parts])
+
+    q = [alpha / 2 * 100, (1 - alpha / 2) * 100]
+    back_low, back_high = np.percentile(roi_back, q, axis=0)
+    lay_low, lay_high = np.percentile(roi_lay, q, axis=0)
+
+    return {
+        "back": {o: (round(back_low[j], 2), round(back_high[j], 2)) for j, o in enumerate(OUTCOMES)},
+        "lay": {o: (round(lay_low[j], 2), round(lay_high[j], 2)) for j, o in enumerate(OUTCOMES)},
+    }
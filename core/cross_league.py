@@ -0,0 +1,118 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from core.league import prepare_league_frame, group_stats, add_total_row, label_summary
+from core.markets import evaluate_markets
+from core.team import played_mask, compute_goal_patterns_vectorized, compute_team_macro_stats
+from core.batch import compute_batch_pre_match
+
+# --------------------------------------------------------
+# ANALISI SU PIÙ CAMPIONATI (una partizione per country)
+# --------------------------------------------------------
+# Il dataset viene diviso per campionato, ogni partizione è calcolata in
+# un processo separato e le tabelle vengono unite con la colonna country:
+# il tempo totale scala con i core invece che con i campionati. Usato
+# dalla CLI e dalla modalità "Tutti i campionati" dell'app.
+
+ALL_LEAGUES = "Tutti i campionati"
+
+def league_report(df):
+    df = prepare_league_frame(df)
+    return {
+        "overview": group_stats(df, ["country"]),
+        "summary": group_stats(df, ["country", "Stagione"]),
+        "labels": label_summary(df),
+        "markets": evaluate_markets(df, ["Label"]),
+    }
+
+def team_report(df):
+    played = df[played_mask(df)]
+    teams = sorted(set(df["Home"].dropna()) | set(df["Away"].dropna()))
+
+    macro_rows = []
+    pattern_rows = []
+    for team in teams:
+        for venue in ["Home", "Away"]:
+            stats = compute_team_macro_stats(df, team, venue)
+            if stats:
+                macro_rows.append({"Squadra": team, "Venue": venue, **stats})
+
+            df_team = played[played[venue] == team]
+            patterns, _, _ = compute_goal_patterns_vectorized(df_team, venue, len(df_team))
+            pattern_rows.append({"Squadra": team, "Venue": venue, **patterns})
+
+    return {
+        "macro": pd.DataFrame(macro_rows),
+        "patterns": pd.DataFrame(pattern_rows),
+    }
+
+def pre_match_report(df, fixtures):
+    return {"report": compute_batch_pre_match(df, fixtures)}
+
+def run_partition(task):
+    command, country, df, fixtures = task
+    if command == "league":
+        tables = league_report(df)
+    elif command == "team":
+        tables = team_report(df)
+    else:
+        tables = pre_match_report(df, fixtures)
+
+    # La colonna country identifica il campionato nelle tabelle unite
+    return {
+        name: table if "country" in table.columns else table.assign(country=country)[["country"] + list(table.columns)]
+        for name, table in tables.items()
+    }
+
+# --------------------------------------------------------
+# PARTIZIONI E ESECUZIONE PARALLELA
+# --------------------------------------------------------
+def fixture_countries(df, fixtures):
+    """
+    Campionato di ogni partita da analizzare: quello in cui gioca in casa
+    la squadra di casa (o, in mancanza, la squadra ospite).
+    """
+    home_map = df.groupby(df["Home"].astype(str).str.strip())["country"].first()
+    away_map = df.groupby(df["Away"].astype(str).str.strip())["country"].first()
+    return fixtures["home"].map(home_map).fillna(fixtures["away"].map(away_map))
+
+def partition_tasks(command, df, fixtures=None):
+    tasks = []
+    if command == "pre-match":
+        countries = fixture_countries(df, fixtures)
+        for country, fixtures_country in fixtures.groupby(countries, sort=True):
+            tasks.append((command, country, df[df["country"] == country], fixtures_country))
+    else:
+        for country, df_country in df.groupby("country", sort=True):
+            tasks.append((command, country, df_country, None))
+    return tasks
+
+def run_partitions(command, df, fixtures=None, workers=None, executor=None):
+    """
+    Esegue il report ("league", "team" o "pre-match") per ogni campionato
+    e unisce le tabelle. executor è un pool già avviato da riusare (l'app
+    ne tiene uno per processo); altrimenti se ne crea uno con workers
+    processi (1 = seriale).
+    """
+    tasks = partition_tasks(command, df, fixtures)
+    if not tasks:
+        return {}
+
+    if len(tasks) == 1 or (executor is None and workers == 1):
+        results = [run_partition(task) for task in tasks]
+    elif executor is not None:
+        results = list(executor.map(run_partition, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_partition, tasks))
+
+    tables = {
+        name: pd.concat([result[name] for result in results], ignore_index=True)
+        for name in results[0]
+    }
+
+    if command == "league":
+        tables["overview"] = add_total_row(tables["overview"], ["country"])
+        tables["summary"] = add_total_row(tables["summary"], ["country", "Stagione"])
+
+    return tables
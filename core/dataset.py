@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from core.labels import label_series
+from core.perf import stage
+
+# --------------------------------------------------------
+# MAPPING COLONNE COMPLETO (nomi Supabase → nomi analisi)
+# --------------------------------------------------------
+COL_MAP = {
+    "country": "country",
+    "sezonul": "Stagione",
+    "datameci": "Data",
+    "orameci": "Orario",
+    "etapa": "Round",
+    "txtechipa1": "Home",
+    "txtechipa2": "Away",
+    "scor1": "Home Goal FT",
+    "scor2": "Away Goal FT",
+    "scorp1": "Home Goal 1T",
+    "scorp2": "Away Goal 1T",
+    "place1": "Posizione Classifica Generale",
+    "place1a": "Posizione Classifica Home",
+    "place2": "Posizione Classifica Away Generale",
+    "place2d": "Posizione classifica away",
+    "cotaa": "Odd home",
+    "cotad": "Odd Away",
+    "cotae": "Odd Draw",
+    "cotao0": "odd over 0,5",
+    "cotao1": "odd over 1,5",
+    "cotao": "odd over 2,5",
+    "cotao3": "odd over 3,5",
+    "cotao4": "odd over 4,5",
+    "cotau0": "odds under 0,5",
+    "cotau1": "odd under 1,5",
+    "cotau": "odd under 2,5",
+    "cotau3": "odd under 3,5",
+    "cotau4": "odd under 4,5",
+    "gg": "gg",
+    "ng": "ng",
+    "elohomeo": "elohomeo",
+    "eloawayo": "eloawayo",
+    "formah": "form h",
+    "formaa": "form a",
+    "suth": "Tiri totali squadra HOME (full time)",
+    "suth1": "Tiri squadra HOME 1 tempo",
+    "suth2": "Tiri squadra HOME 2 tempo",
+    "suta": "Tiri totali squadra AWAY (full time)",
+    "suta1": "Tiri squadra AWAY 1 tempo",
+    "suta2": "Tiri squadra AWAY 2 tempo",
+    "sutht": "Tiri in porta squadra HOME (full time)",
+    "sutht1": "Tiri in porta squadra HOME 1 tempo",
+    "sutht2": "Tiri in porta squadra HOME 2 tempo",
+    "sutat": "Tiri in porta squadra AWAY (full time)",
+    "sutat1": "Tiri in porta squadra AWAY 1 tempo",
+    "sutat2": "Tiri in porta squadra AWAY 2 tempo",
+    "mgolh": "minuti goal segnato home",
+    "gh1": "home 1 goal segnato (min)",
+    "gh2": "home 2 goal segnato(min)",
+    "gh3": "home 3 goal segnato(min)",
+    "gh4": "home 4 goal segnato(min)",
+    "gh5": "home 5 goal segnato(min)",
+    "gh6": "home 6 goal segnato(min)",
+    "gh7": "home 7 goal segnato(min)",
+    "gh8": "home 8 goal segnato(min)",
+    "gh9": "home 9 goal segnato(min)",
+    "mgola": "minuti goal segnato away",
+    "ga1": "1 goal away (min)",
+    "ga2": "2 goal away (min)",
+    "ga3": "3 goal away (min)",
+    "ga4": "4 goal away (min)",
+    "ga5": "5 goal away (min)",
+    "ga6": "6 goal away (min)",
+    "ga7": "7 goal away (min)",
+    "ga8": "8 goal away (min)",
+    "ga9": "9 goal away (min)",
+    "stare": "stare",
+    "codechipa1": "codechipa1",
+    "codechipa2": "codechipa2"
+}
+
+# --------------------------------------------------------
+# NORMALIZZAZIONE DATI GREZZI
+# --------------------------------------------------------
+def _to_numeric_or_keep(series):
+    """
+    Come pd.to_numeric(errors="ignore"): converte se possibile,
+    altrimenti lascia la colonna invariata.
+    """
+    try:
+        return pd.to_numeric(series)
+    except (ValueError, TypeError):
+        return series
+
+def normalize_raw(df):
+    """
+    Pulizia dei dati grezzi come arrivano da Supabase o da upload:
+    intestazioni minuscole senza spazi, virgole decimali → punti,
+    conversione numerica e data partita.
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+
+    # Conversione eventuali virgole in punti (solo per stringhe)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].str.replace(",", ".")
+
+    # Tentativo di conversione numerica
+    df = df.apply(_to_numeric_or_keep)
+
+    # Conversione date
+    if "datameci" in df.columns:
+        df["datameci"] = pd.to_datetime(df["datameci"], errors="coerce")
+
+    return df
+
+def rename_columns(df):
+    """
+    Applica COL_MAP e ripulisce i nomi colonna (spazi, tab, a capo).
+    """
+    df = df.rename(columns=COL_MAP)
+    df.columns = (
+        df.columns
+        .astype(str)
+        .str.strip()
+        .str.replace(r"[\n\r\t]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+    )
+    return df
+
+def read_matches_file(path):
+    """
+    Legge un file Excel o CSV di partite e restituisce il DataFrame
+    con i nomi colonna di analisi.
+    """
+    path = str(path)
+    if path.endswith(".csv"):
+        df = pd.read_csv(path)
+    else:
+        xls = pd.ExcelFile(path)
+        df = pd.read_excel(xls, sheet_name=xls.sheet_names[0])
+
+    return normalize_matches(df)
+
+def normalize_matches(df):
+    """
+    Dati di partite (da file o mirror locale) → nomi colonna di analisi,
+    con Data già convertita (i filtri per data si applicano da qui).
+    """
+    # I file già esportati con i nomi di analisi non vanno normalizzati
+    if "Home" in df.columns:
+        return parse_match_dates(rename_columns(df))
+
+    return rename_columns(normalize_raw(df))
+
+def parse_match_dates(df):
+    """
+    Data come datetime; quella già convertita (normalize_raw) non viene
+    riletta.
+    """
+    if "Data" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Data"]):
+        df = df.assign(Data=pd.to_datetime(df["Data"], format="%Y-%m-%d", errors="coerce"))
+    return df
+
+# --------------------------------------------------------
+# COPY-ON-WRITE
+# --------------------------------------------------------
+def enable_copy_on_write():
+    """
+    Copy-on-Write di pandas (già attivo da pandas 3.0): le selezioni sono
+    viste e i dati vengono copiati solo quando qualcuno li modifica.
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+# --------------------------------------------------------
+# DATASET PRONTO PER LE PAGINE
+# --------------------------------------------------------
+GOAL_COLS = ["Home Goal FT", "Away Goal FT", "Home Goal 1T", "Away Goal 1T"]
+
+def prepare_matches(df):
+    """
+    Tutto quello che le pagine danno per scontato, calcolato una volta per
+    campionato: nomi colonna di analisi, Data come datetime, nomi squadra
+    senza spazi, colonne derivate (goals_*, btts, match_result) e Label.
+    Le pagine non devono più aggiungere o modificare colonne.
+    """
+    with stage("derive"):
+        df = rename_columns(df)
+        df = parse_match_dates(df)
+
+        for col in ["Home", "Away"]:
+            if col in df.columns and pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].str.strip()
+
+        if set(GOAL_COLS) <= set(df.columns):
+            df = add_derived_columns(df)
+
+    if "Label" not in df.columns and {"Odd home", "Odd Away"} <= set(df.columns):
+        with stage("label"):
+            df["Label"] = label_series(df)
+
+    return df
+
+# --------------------------------------------------------
+# COLONNE DERIVATE
+# --------------------------------------------------------
+def add_derived_columns(df):
+    """
+    Restituisce un nuovo DataFrame con goals_total, goals_1st_half,
+    goals_2nd_half, btts e match_result (se non già presenti).
+    """
+    derived = {}
+
+    if "goals_total" not in df.columns:
+        derived["goals_total"] = df["Home Goal FT"] + df["Away Goal FT"]
+
+    if "goals_1st_half" not in df.columns:
+        derived["goals_1st_half"] = df["Home Goal 1T"] + df["Away Goal 1T"]
+
+    if "goals_2nd_half" not in df.columns:
+        goals_total = derived.get("goals_total", df.get("goals_total"))
+        goals_1st_half = derived.get("goals_1st_half", df.get("goals_1st_half"))
+        derived["goals_2nd_half"] = goals_total - goals_1st_half
+
+    if "btts" not in df.columns:
+        derived["btts"] = ((df["Home Goal FT"] > 0) & (df["Away Goal FT"] > 0)).astype(int)
+
+    if "match_result" not in df.columns:
+        derived["match_result"] = np.select(
+            [df["Home Goal FT"] > df["Away Goal FT"], df["Home Goal FT"] < df["Away Goal FT"]],
+            ["Home Win", "Away Win"],
+            default="Draw"
+        )
+
+    return df.assign(**derived) if derived else df
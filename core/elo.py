@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------
+# MOTORE ELO INCREMENTALE
+# --------------------------------------------------------
+#
+# Le partite vengono elaborate in ordine di data. Lo stato tiene i rating
+# in un array compatto (una cella per squadra) e l'impronta delle partite
+# già elaborate: a ogni nuovo caricamento si elaborano solo le righe nuove,
+# senza rigiocare tutta la storia. Se arrivano partite più vecchie
+# dell'ultima elaborata, lo stato viene ricostruito da zero.
+
+KEY_COLUMNS = ["Data", "Home", "Away"]
+
+def new_elo_state(k=20.0, home_adv=60.0, initial=1500.0, mov=True):
+    """
+    Stato vuoto del motore Elo.
+    k: K-factor · home_adv: punti Elo di vantaggio casa
+    mov: moltiplicatore per lo scarto goal (World Football Elo)
+    """
+    return {
+        "k": float(k),
+        "home_adv": float(home_adv),
+        "initial": float(initial),
+        "mov": mov,
+        "teams": {},
+        "ratings": np.empty(0),
+        "games": np.empty(0, dtype=np.int64),
+        "last_date": None,
+        "seen": np.empty(0, dtype=np.uint64),
+    }
+
+def expected_score(rating_home, rating_away, home_adv=0.0):
+    """
+    Punteggio atteso della squadra di casa (1 = vittoria, 0.5 = pareggio).
+    """
+    return 1 / (1 + 10 ** ((rating_away - rating_home - home_adv) / 400))
+
+def _match_keys(df):
+    return pd.util.hash_pandas_object(df[KEY_COLUMNS].astype(str), index=False).to_numpy()
+
+def _team_index(state, team):
+    idx = state["teams"].get(team)
+    if idx is None:
+        idx = len(state["teams"])
+        state["teams"][team] = idx
+        if idx >= len(state["ratings"]):
+            size = max(16, 2 * len(state["ratings"]))
+            ratings = np.full(size, state["initial"])
+            ratings[:len(state["ratings"])] = state["ratings"]
+            games = np.zeros(size, dtype=np.int64)
+            games[:len(state["games"])] = state["games"]
+            state["ratings"], state["games"] = ratings, games
+    return idx
+
+def _played(df):
+    data = df.dropna(subset=["Home", "Away", "Home Goal FT", "Away Goal FT"])
+    if "Data" in data.columns:
+        data = data.assign(Data=pd.to_datetime(data["Data"], errors="coerce"))
+    else:
+        data = data.assign(Data=pd.NaT)
+    return data
+
+def update_elo(state, df):
+    """
+    Elabora le partite giocate di df non ancora presenti nello stato.
+    Restituisce il numero di partite elaborate.
+    """
+    data = _played(df)
+    if data.empty:
+        return 0
+
+    keys = _match_keys(data)
+    new_mask = ~np.isin(keys, state["seen"])
+    if not new_mask.any():
+        return 0
+
+    new_data = data[new_mask]
+    last_date = state["last_date"]
+
+    if last_date is not None and (new_data["Data"] < last_date).any():
+        # Partite arretrate: la storia va rigiocata in ordine
+        fresh = new_elo_state(state["k"], state["home_adv"], state["initial"], state["mov"])
+        state.clear()
+        state.update(fresh)
+        new_data = data
+        keys = _match_keys(data)
+        new_mask = np.ones(len(data), dtype=bool)
+
+    order = np.argsort(new_data["Data"].to_numpy(), kind="mergesort")
+    new_data = new_data.iloc[order]
+    new_keys = keys[new_mask][order]
+
+    homes = [_team_index(state, t) for t in new_data["Home"].astype(str).str.strip()]
+    aways = [_team_index(state, t) for t in new_data["Away"].astype(str).str.strip()]
+    h_goals = new_data["Home Goal FT"].to_numpy(dtype=float)
+    a_goals = new_data["Away Goal FT"].to_numpy(dtype=float)
+
+    ratings, games = state["ratings"], state["games"]
+    k, home_adv, mov = state["k"], state["home_adv"], state["mov"]
+
+    for i, j, hg, ag in zip(homes, aways, h_goals, a_goals):
+        r_home, r_away = ratings[i], ratings[j]
+
+        expected = 1 / (1 + 10 ** ((r_away - r_home - home_adv) / 400))
+        result = 1.0 if hg > ag else 0.0 if hg < ag else 0.5
+
+        multiplier = 1.0
+        if mov:
+            diff = abs(hg - ag)
+            multiplier = 1.0 if diff <= 1 else 1.5 if diff == 2 else (11 + diff) / 8
+
+        delta = k * multiplier * (result - expected)
+        ratings[i] = r_home + delta
+        ratings[j] = r_away - delta
+        games[i] += 1
+        games[j] += 1
+
+    state["seen"] = np.concatenate([state["seen"], new_keys])
+    state["last_date"] = new_data["Data"].max()
+
+    return len(new_data)
+
+def team_rating(state, team):
+    idx = state["teams"].get(team)
+    return float(state["ratings"][idx]) if idx is not None else state["initial"]
+
+def current_ratings(state):
+    """
+    Classifica Elo corrente: Squadra, Elo, Partite.
+    """
+    teams = list(state["teams"].keys())
+    idx = np.array([state["teams"][t] for t in teams], dtype=np.int64)
+    return pd.DataFrame({
+        "Squadra": teams,
+        "Elo": state["ratings"][idx].round(1) if len(idx) else [],
+        "Partite": state["games"][idx] if len(idx) else [],
+    }).sort_values("Elo", ascending=False).reset_index(drop=True)
@@ -0,0 +1,77 @@
+import pandas as pd
+from core.team import played_mask
+
+# --------------------------------------------------------
+# FILTRI DEL DATASET (campionato, stagioni, data, giocate)
+# --------------------------------------------------------
+# Un solo insieme di filtri, descritto come dati: chi legge le partite
+# lo spinge fino all'origine dove può (query del mirror SQLite, DuckDB,
+# Polars, partizione per campionato in memoria) e applica il resto una
+# volta sola con apply_filters. Le pagine ricevono il frame già filtrato.
+#
+# Le regole sono quelle delle query SQL / Polars: campionati senza
+# maiuscole e spazi, stagioni confrontate come testo, partite senza data
+# sempre incluse.
+
+FILTER_NAMES = ["countries", "seasons", "until", "played"]
+
+def filter_spec(countries=None, seasons=None, until=None, played=False):
+    """
+    countries / seasons: valori da tenere (None = tutti); until: ultima
+    data inclusa (None = nessun limite); played: solo partite giocate.
+    """
+    return {
+        "countries": tuple(countries) if countries else None,
+        "seasons": tuple(seasons) if seasons else None,
+        "until": None if until is None else pd.Timestamp(until).normalize(),
+        "played": bool(played),
+    }
+
+def spec_key(spec):
+    """
+    Tupla dei filtri, da usare nelle chiavi di cache.
+    """
+    return tuple((name, spec[name]) for name in FILTER_NAMES)
+
+def without(spec, *names):
+    """
+    Copia di spec senza i filtri names (già applicati dall'origine dati).
+    """
+    empty = filter_spec()
+    return {name: empty[name] if name in names else value for name, value in spec.items()}
+
+def _matching_values(series, wanted, key):
+    # Confronto sui valori distinti: una sola isin sulla colonna
+    wanted = {key(value) for value in wanted}
+    return series.isin([value for value in series.dropna().unique() if key(value) in wanted])
+
+def filter_mask(df, spec):
+    """
+    Maschera booleana delle righe di df che rispettano spec (le colonne
+    assenti non filtrano).
+    """
+    mask = pd.Series(True, index=df.index)
+
+    if spec["countries"] and "country" in df.columns:
+        mask &= _matching_values(df["country"], spec["countries"], lambda c: str(c).strip().upper())
+
+    if spec["seasons"] and "Stagione" in df.columns:
+        mask &= _matching_values(df["Stagione"], spec["seasons"], str)
+
+    if spec["until"] is not None and "Data" in df.columns:
+        mask &= df["Data"].isna() | (df["Data"] <= spec["until"])
+
+    if spec["played"]:
+        mask &= played_mask(df)
+
+    return mask
+
+def apply_filters(df, spec):
+    """
+    df filtrato da spec, senza copia quando il filtro tiene tutte le righe.
+    """
+    if not any(spec[name] for name in FILTER_NAMES):
+        return df
+
+    mask = filter_mask(df, spec)
+    return df if mask.all() else df[mask]
@@ -0,0 +1,275 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from core.labels import dataset_version
+from core.filters import filter_spec, apply_filters
+
+# --------------------------------------------------------
+# MODELLO GOAL POISSON / DIXON-COLES
+# --------------------------------------------------------
+#
+# λ_home = γ · attacco_casa · difesa_ospite
+# λ_away =     attacco_ospite · difesa_casa
+#
+# Forze attacco/difesa e vantaggio casa γ vengono stimati con gli
+# aggiornamenti iterativi in forma chiusa della massima verosimiglianza
+# Poisson (somme per squadra con np.bincount, nessun ciclo sulle partite).
+# Il parametro ρ di Dixon-Coles (correzione dei punteggi bassi) viene poi
+# stimato con una ricerca a sezione aurea sulla log-verosimiglianza.
+
+MODEL_COLUMNS = ["country", "Stagione", "Data", "Home", "Away", "Home Goal FT", "Away Goal FT"]
+
+MAX_GOALS = 10
+
+# Condivisa dalle sessioni Streamlit (thread diversi): letture, inserimenti
+# ed eviction sotto lock; la stima vera e propria avviene fuori dal lock
+_MODEL_CACHE = OrderedDict()
+_MODEL_CACHE_SIZE = 32
+_MODEL_CACHE_LOCK = threading.Lock()
+
+# --------------------------------------------------------
+# PREPARAZIONE DATI
+# --------------------------------------------------------
+def _model_data(df, xi=0.0):
+    """
+    Estrae le partite giocate e gli indici compatti delle squadre.
+    xi > 0 applica il peso temporale exp(-xi · giorni) di Dixon-Coles.
+    """
+    data = df.dropna(subset=["Home", "Away", "Home Goal FT", "Away Goal FT"])
+
+    teams, codes = np.unique(
+        np.concatenate([data["Home"].astype(str).to_numpy(), data["Away"].astype(str).to_numpy()]),
+        return_inverse=True
+    )
+    n = len(data)
+
+    weights = np.ones(n)
+    if xi > 0 and "Data" in data.columns:
+        dates = pd.to_datetime(data["Data"], errors="coerce")
+        days = (dates.max() - dates).dt.days.fillna(0).to_numpy(dtype=float)
+        weights = np.exp(-xi * days)
+
+    return {
+        "teams": teams,
+        "home": codes[:n],
+        "away": codes[n:],
+        "hg": pd.to_numeric(data["Home Goal FT"], errors="coerce").to_numpy(dtype=float),
+        "ag": pd.to_numeric(data["Away Goal FT"], errors="coerce").to_numpy(dtype=float),
+        "w": weights,
+    }
+
+# --------------------------------------------------------
+# LOG-VEROSIMIGLIANZA (vettoriale)
+# --------------------------------------------------------
+def _tau(hg, ag, lam_h, lam_a, rho):
+    """
+    Fattore di correzione Dixon-Coles per i risultati 0-0, 1-0, 0-1, 1-1.
+    """
+    tau = np.ones_like(lam_h)
+    tau = np.where((hg == 0) & (ag == 0), 1 - lam_h * lam_a * rho, tau)
+    tau = np.where((hg == 0) & (ag == 1), 1 + lam_h * rho, tau)
+    tau = np.where((hg == 1) & (ag == 0), 1 + lam_a * rho, tau)
+    tau = np.where((hg == 1) & (ag == 1), 1 - rho, tau)
+    return tau
+
+def log_likelihood(data, attack, defence, home_adv, rho=0.0):
+    lam_h = home_adv * attack[data["home"]] * defence[data["away"]]
+    lam_a = attack[data["away"]] * defence[data["home"]]
+    hg, ag, w = data["hg"], data["ag"], data["w"]
+
+    tau = _tau(hg, ag, lam_h, lam_a, rho)
+    if np.any(tau <= 0):
+        return -np.inf
+
+    ll = (
+        np.log(tau)
+        + hg * np.log(lam_h) - lam_h
+        + ag * np.log(lam_a) - lam_a
+    )
+    return float((w * ll).sum())
+
+# --------------------------------------------------------
+# FIT
+# --------------------------------------------------------
+def _fit_strengths(data, max_iter=500, tol=1e-8):
+    """
+    Massima verosimiglianza Poisson con aggiornamenti alternati in forma chiusa.
+    """
+    n_teams = len(data["teams"])
+    home, away, hg, ag, w = data["home"], data["away"], data["hg"], data["ag"], data["w"]
+
+    scored = np.bincount(home, w * hg, n_teams) + np.bincount(away, w * ag, n_teams)
+    conceded = np.bincount(home, w * ag, n_teams) + np.bincount(away, w * hg, n_teams)
+    home_goals = (w * hg).sum()
+
+    attack = np.ones(n_teams)
+    defence = np.ones(n_teams)
+    home_adv = 1.0
+
+    for _ in range(max_iter):
+        prev = np.concatenate([attack, defence, [home_adv]])
+
+        attack = scored / np.maximum(
+            np.bincount(home, w * home_adv * defence[away], n_teams)
+            + np.bincount(away, w * defence[home], n_teams),
+            1e-12
+        )
+        attack = np.maximum(attack, 1e-6)
+        attack /= attack.mean()
+
+        defence = conceded / np.maximum(
+            np.bincount(home, w * attack[away], n_teams)
+            + np.bincount(away, w * home_adv * attack[home], n_teams),
+            1e-12
+        )
+        defence = np.maximum(defence, 1e-6)
+
+        home_adv = home_goals / max((w * attack[home] * defence[away]).sum(), 1e-12)
+
+        current = np.concatenate([attack, defence, [home_adv]])
+        if np.max(np.abs(current - prev)) < tol:
+            break
+
+    return attack, defence, home_adv
+
+def _fit_rho(data, attack, defence, home_adv, low=-0.2, high=0.2, tol=1e-4):
+    """
+    Ricerca a sezione aurea di ρ che massimizza la log-verosimiglianza.
+    """
+    ratio = (math.sqrt(5) - 1) / 2
+    a, b = low, high
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    fc = log_likelihood(data, attack, defence, home_adv, c)
+    fd = log_likelihood(data, attack, defence, home_adv, d)
+
+    while b - a > tol:
+        if fc > fd:
+            b, d, fd = d, c, fc
+            c = b - ratio * (b - a)
+            fc = log_likelihood(data, attack, defence, home_adv, c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + ratio * (b - a)
+            fd = log_likelihood(data, attack, defence, home_adv, d)
+
+    return (a + b) / 2
+
+def fit_goal_model(df, country=None, seasons=None, xi=0.0, dixon_coles=True):
+    """
+    Stima il modello per campionato (e stagioni, se indicate).
+
+    Il risultato è messo in cache con chiave (versione dataset, campionato,
+    stagioni, xi, dixon_coles): un nuovo caricamento con gli stessi dati
+    riusa i parametri già stimati.
+    """
+    data_df = apply_filters(df, filter_spec(countries=None if country is None else [country], seasons=seasons))
+
+    key = (
+        dataset_version(data_df, MODEL_COLUMNS),
+        country,
+        tuple(sorted(map(str, seasons))) if seasons else None,
+        xi,
+        dixon_coles,
+    )
+    with _MODEL_CACHE_LOCK:
+        if key in _MODEL_CACHE:
+            _MODEL_CACHE.move_to_end(key)
+            return _MODEL_CACHE[key]
+
+    data = _model_data(data_df, xi)
+    if len(data["hg"]) == 0:
+        return None
+
+    attack, defence, home_adv = _fit_strengths(data)
+    rho = _fit_rho(data, attack, defence, home_adv) if dixon_coles else 0.0
+
+    model = {
+        "teams": {team: i for i, team in enumerate(data["teams"])},
+        "attack": attack,
+        "defence": defence,
+        "home_adv": home_adv,
+        "rho": rho,
+        "matches": len(data["hg"]),
+        "log_likelihood": log_likelihood(data, attack, defence, home_adv, rho),
+    }
+
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE[key] = model
+        _MODEL_CACHE.move_to_end(key)
+        while len(_MODEL_CACHE) > _MODEL_CACHE_SIZE:
+            _MODEL_CACHE.popitem(last=False)
+
+    return model
+
+# --------------------------------------------------------
+# PREVISIONE
+# --------------------------------------------------------
+_LOG_FACTORIALS = np.array([math.lgamma(k + 1) for k in range(MAX_GOALS + 1)])
+
+def score_matrix(model, home, away):
+    """
+    Matrice (MAX_GOALS+1) × (MAX_GOALS+1) delle probabilità dei risultati
+    esatti, con la correzione Dixon-Coles sui punteggi bassi.
+    """
+    if home not in model["teams"] or away not in model["teams"]:
+        return None
+
+    i, j = model["teams"][home], model["teams"][away]
+    lam_h = model["home_adv"] * model["attack"][i] * model["defence"][j]
+    lam_a = model["attack"][j] * model["defence"][i]
+
+    goals = np.arange(MAX_GOALS + 1)
+    p_home = np.exp(goals * np.log(lam_h) - lam_h - _LOG_FACTORIALS)
+    p_away = np.exp(goals * np.log(lam_a) - lam_a - _LOG_FACTORIALS)
+
+    matrix = np.outer(p_home, p_away)
+
+    rho = model["rho"]
+    matrix[0, 0] *= 1 - lam_h * lam_a * rho
+    matrix[0, 1] *= 1 + lam_h * rho
+    matrix[1, 0] *= 1 + lam_a * rho
+    matrix[1, 1] *= 1 - rho
+
+    return matrix / matrix.sum()
+
+def predict_fixture(model, home, away, top_scores=10):
+    """
+    Probabilità 1X2, Over/Under 0.5–4.5, BTTS e risultati esatti più probabili.
+    """
+    matrix = score_matrix(model, home, away)
+    if matrix is None:
+        return None
+
+    goals = np.arange(MAX_GOALS + 1)
+    total = goals[:, None] + goals[None, :]
+
+    prediction = {
+        "1X2": {
+            "HOME": float(np.tril(matrix, -1).sum()),
+            "DRAW": float(np.trace(matrix)),
+            "AWAY": float(np.triu(matrix, 1).sum()),
+        },
+        "Over/Under": {
+            line: {
+                "Over": float(matrix[total > line].sum()),
+                "Under": float(matrix[total < line].sum()),
+            }
+            for line in [0.5, 1.5, 2.5, 3.5, 4.5]
+        },
+        "BTTS": float(matrix[1:, 1:].sum()),
+        "xG": (
+            float((matrix.sum(axis=1) * goals).sum()),
+            float((matrix.sum(axis=0) * goals).sum()),
+        ),
+    }
+
+    flat = np.argsort(matrix, axis=None)[::-1][:top_scores]
+    prediction["Correct Score"] = [
+        (f"{h}-{a}", float(matrix[h, a]))
+        for h, a in zip(*np.unravel_index(flat, matrix.shape))
+    ]
+
+    return prediction
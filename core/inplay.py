@@ -0,0 +1,239 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------
+# TABELLE IN-PLAY (probabilità per minuto e punteggio)
+# --------------------------------------------------------
+# Per ogni gruppo (Label, squadra di casa, squadra ospite, ...), minuto m
+# e punteggio h-a alla fine del minuto m: quante partite sono passate da
+# quello stato e cosa è successo dopo (altro goal, chi segna il prossimo,
+# goal entro GOAL_WINDOW minuti, goal ancora da segnare).
+#
+# I conteggi vengono costruiti una volta dai minuti dei goal con somme
+# cumulative vettoriali (partita × minuto) e tenuti in array numpy
+# compatti, salvabili in un .npz: una domanda in-play legge pochi
+# elementi degli array, senza toccare le partite.
+
+MAX_MINUTE = 90
+MAX_GOALS = 4           # punteggi più alti nell'ultima riga/colonna ("4+")
+GOAL_WINDOW = 15        # minuti per "goal nei prossimi N minuti"
+ALL_GROUPS = "Tutte"
+CHUNK_ROWS = 20_000     # partite per blocco (matrici partita × minuto)
+
+MINUTE_COLS = ["minuti goal segnato home", "minuti goal segnato away"]
+FT_COLS = ["Home Goal FT", "Away Goal FT"]
+COUNT_NAMES = ["matches", "more", "next_home", "next_away", "in_window", "remaining"]
+META_NAMES = ["group_col", "max_goals", "window", "used", "skipped"]
+
+# Un minuto valido tra due separatori (come in extract_minutes_array)
+# oppure "|", il segnaposto di fine partita
+_ROW_OR_MINUTE = re.compile(r"(?:^|;)\s*(\d+\.?\d*|\.\d+|\|)\s*(?=;|$)")
+_NO_GOAL = np.iinfo(np.int16).max
+
+def _goal_minutes(series):
+    """
+    (posizione partita, minuto) di ogni goal della colonna minuti
+    ("12;45;78;") e numero di minuti letti per partita. Le celle sono
+    unite in una sola stringa e lette con una regex, come in
+    extract_minutes_array.
+    """
+    cells = series.fillna("").astype(str).str.replace("|", ";", regex=False)
+    found = np.array(_ROW_OR_MINUTE.findall(";|;".join(cells.tolist()).replace(",", ";")))
+
+    is_row = found == "|"
+    rows = np.cumsum(is_row)[~is_row]
+    minutes = found[~is_row].astype(float).astype(int).clip(1, MAX_MINUTE)
+    return rows, minutes, np.bincount(rows, minlength=len(series))
+
+def _score_matrix(rows, minutes, n):
+    # Goal per minuto (partita × minuto 0..MAX_MINUTE+1) e primo goal da ogni minuto in poi
+    goals = np.zeros((n, MAX_MINUTE + 2), dtype=np.int16)
+    np.add.at(goals, (rows, minutes), 1)
+
+    first = np.where(goals > 0, np.arange(MAX_MINUTE + 2, dtype=np.int16), np.int16(_NO_GOAL))
+    first = np.minimum.accumulate(first[:, ::-1], axis=1)[:, ::-1]
+
+    # Punteggio alla fine di ogni minuto e minuto del prossimo goal
+    return goals.cumsum(axis=1, dtype=np.int16)[:, :MAX_MINUTE + 1], first[:, 1:]
+
+def _chunk_counts(home, away, codes, n_groups, max_goals, window):
+    """
+    Conteggi di un blocco di partite: home / away sono (righe, minuti)
+    con righe locali al blocco, codes il gruppo di ogni partita (0 ..
+    n_groups - 1 all'interno del blocco).
+    """
+    n = len(codes)
+    score_home, next_home = _score_matrix(*home, n)
+    score_away, next_away = _score_matrix(*away, n)
+
+    minute = np.arange(MAX_MINUTE + 1)
+    now = score_home + score_away
+    remaining = (score_home[:, -1:] + score_away[:, -1:]) - now
+    next_goal = np.minimum(next_home, next_away)
+
+    values = {
+        "more": remaining > 0,
+        "next_home": next_home < next_away,
+        "next_away": next_away < next_home,
+        "in_window": next_goal <= minute + window,
+        "remaining": remaining,
+    }
+
+    # Cella (gruppo, minuto, casa, ospite) di ogni partita a ogni minuto
+    size = max_goals + 1
+    state = (minute * size + np.minimum(score_home, max_goals)) * size + np.minimum(score_away, max_goals)
+    cells = (codes[:, None] * ((MAX_MINUTE + 1) * size * size) + state).ravel()
+    n_cells = n_groups * (MAX_MINUTE + 1) * size * size
+
+    # Conteggi: bincount delle celle dove la condizione è vera; goal rimanenti: somma pesata
+    counts = {
+        "matches": np.bincount(cells, minlength=n_cells),
+        "remaining": np.bincount(cells, weights=values.pop("remaining").ravel(), minlength=n_cells),
+    }
+    for name, value in values.items():
+        counts[name] = np.bincount(cells[value.ravel()], minlength=n_cells)
+    return counts
+
+def build_inplay_tables(df, group_col="Label", max_goals=MAX_GOALS, window=GOAL_WINDOW):
+    """
+    Tabelle in-play di df per i valori di group_col (più ALL_GROUPS).
+
+    Sono usate solo le partite con i minuti coerenti con il risultato
+    finale (tanti minuti quanti goal, per casa e ospite): le altre sono
+    contate in "skipped". I conteggi sono array uint32 di forma
+    (gruppi, MAX_MINUTE + 1, max_goals + 1, max_goals + 1).
+    """
+    missing = [col for col in MINUTE_COLS + FT_COLS + [group_col] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Mancano le colonne per le tabelle in-play: {missing}")
+
+    home_rows, home_minutes, home_n = _goal_minutes(df[MINUTE_COLS[0]])
+    away_rows, away_minutes, away_n = _goal_minutes(df[MINUTE_COLS[1]])
+
+    ft_home = pd.to_numeric(df[FT_COLS[0]], errors="coerce").to_numpy(dtype=float)
+    ft_away = pd.to_numeric(df[FT_COLS[1]], errors="coerce").to_numpy(dtype=float)
+    keep = (home_n == ft_home) & (away_n == ft_away)
+
+    group_values = df[group_col].fillna("").astype(str).str.strip().to_numpy()
+    names = [ALL_GROUPS] + sorted(set(group_values[keep]) - {ALL_GROUPS})
+    codes = pd.Index(names).get_indexer(group_values)
+
+    shape = (len(names), MAX_MINUTE + 1, max_goals + 1, max_goals + 1)
+    tables = {name: np.zeros(shape, dtype=np.uint32) for name in COUNT_NAMES}
+
+    # Partite ordinate per gruppo: ogni blocco aggiorna solo i suoi gruppi
+    kept = np.flatnonzero(keep)
+    kept = kept[np.argsort(codes[kept], kind="stable")]
+    local = np.full(len(df), -1)
+    for start in range(0, len(kept), CHUNK_ROWS):
+        block = kept[start:start + CHUNK_ROWS]
+        local[block] = np.arange(len(block))
+        first, last = codes[block[0]], codes[block[-1]]
+
+        home_sel = local[home_rows] >= 0
+        away_sel = local[away_rows] >= 0
+        block_counts = _chunk_counts(
+            (local[home_rows[home_sel]], home_minutes[home_sel]),
+            (local[away_rows[away_sel]], away_minutes[away_sel]),
+            codes[block] - first, last - first + 1, max_goals, window
+        )
+        for name, value in block_counts.items():
+            tables[name][first:last + 1] += value.reshape((-1,) + shape[1:]).astype(np.uint32)
+
+        local[block] = -1
+
+    # ALL_GROUPS: tutte le partite, somma dei gruppi
+    for name in COUNT_NAMES:
+        tables[name][0] = tables[name][1:].sum(axis=0)
+
+    tables.update({
+        "groups": np.array(names),
+        "group_col": group_col,
+        "max_goals": max_goals,
+        "window": window,
+        "used": len(kept),
+        "skipped": len(df) - len(kept),
+    })
+    return _with_index(tables)
+
+def _with_index(tables):
+    tables["group_index"] = {str(name): i for i, name in enumerate(tables["groups"])}
+    return tables
+
+# --------------------------------------------------------
+# SALVATAGGIO (.npz)
+# --------------------------------------------------------
+def save_inplay_tables(tables, path):
+    """
+    Salva le tabelle in un .npz compresso (solo array numpy, nessun pickle)
+    e restituisce il percorso scritto (numpy aggiunge .npz se manca).
+    """
+    path = str(path) if str(path).endswith(".npz") else f"{path}.npz"
+    np.savez_compressed(
+        path,
+        **{name: tables[name] for name in COUNT_NAMES + ["groups"]},
+        **{name: np.array(tables[name]) for name in META_NAMES}
+    )
+    return path
+
+def load_inplay_tables(path):
+    with np.load(path, allow_pickle=False) as data:
+        tables = {name: data[name] for name in COUNT_NAMES + ["groups"]}
+        tables.update({name: data[name].item() for name in META_NAMES})
+    return _with_index(tables)
+
+# --------------------------------------------------------
+# DOMANDE IN-PLAY
+# --------------------------------------------------------
+def inplay_probabilities(tables, minute, home_goals, away_goals, group=ALL_GROUPS):
+    """
+    Probabilità per una partita al minuto minute (goal fino a quel minuto
+    compreso) sul punteggio home_goals-away_goals, dalle partite del
+    gruppo nello stesso stato. None se il gruppo non esiste, solo
+    {"matches": 0} se nessuna partita è passata da quello stato.
+    """
+    g = tables["group_index"].get(group)
+    if g is None:
+        return None
+
+    cap = tables["max_goals"]
+    cell = (g, min(max(int(minute), 0), MAX_MINUTE), min(int(home_goals), cap), min(int(away_goals), cap))
+    matches = int(tables["matches"][cell])
+    if matches == 0:
+        return {"matches": 0}
+
+    return {
+        "matches": matches,
+        "p_goal": float(tables["more"][cell]) / matches,
+        "p_next_home": float(tables["next_home"][cell]) / matches,
+        "p_next_away": float(tables["next_away"][cell]) / matches,
+        "p_goal_window": float(tables["in_window"][cell]) / matches,
+        "expected_goals": float(tables["remaining"][cell]) / matches,
+    }
+
+def inplay_curve(tables, home_goals, away_goals, group=ALL_GROUPS):
+    """
+    Le stesse probabilità di inplay_probabilities per tutti i minuti, su
+    un punteggio fisso (DataFrame, una riga per minuto con partite).
+    """
+    g = tables["group_index"].get(group)
+    if g is None:
+        return pd.DataFrame()
+
+    cap = tables["max_goals"]
+    cell = (g, slice(None), min(int(home_goals), cap), min(int(away_goals), cap))
+    matches = tables["matches"][cell].astype(float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        curve = pd.DataFrame({
+            "Minuto": np.arange(MAX_MINUTE + 1),
+            "Matches": matches.astype(int),
+            "P goal": tables["more"][cell] / matches,
+            "P prossimo goal casa": tables["next_home"][cell] / matches,
+            "P prossimo goal ospite": tables["next_away"][cell] / matches,
+            f"P goal entro {tables['window']}'": tables["in_window"][cell] / matches,
+            "Goal attesi": tables["remaining"][cell] / matches,
+        })
+    return curve[curve["Matches"] > 0].reset_index(drop=True)
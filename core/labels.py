@@ -0,0 +1,162 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+def label_match(row):
+    """
+    Classifica il match in una fascia di quote
+    basata sulle quote odd home e odd away.
+
+    Regole:
+      - SuperCompetitive → sia Home che Away <= 3.0
+      - H_StrongFav → Home quota < 1.5
+      - H_MediumFav → Home quota 1.5 – 2.0
+      - H_SmallFav → Home quota 2.01 – 3.0
+      - A_StrongFav → Away quota < 1.5
+      - A_MediumFav → Away quota 1.5 – 2.0
+      - A_SmallFav → Away quota 2.01 – 3.0
+      - Others → tutto il resto
+    """
+
+    try:
+        h = float(row.get("Odd home", np.nan))
+        a = float(row.get("Odd Away", np.nan))
+    except:
+        return "Others"
+
+    if np.isnan(h) or np.isnan(a):
+        return "Others"
+
+    # SuperCompetitive
+    if h <= 3 and a <= 3:
+        return "SuperCompetitive H<=3 A<=3"
+
+    # Classificazione Home
+    if h < 1.5:
+        return "H_StrongFav <1.5"
+    elif 1.5 <= h <= 2:
+        return "H_MediumFav 1.5-2"
+    elif 2 < h <= 3:
+        return "H_SmallFav 2-3"
+
+    # Classificazione Away
+    if a < 1.5:
+        return "A_StrongFav <1.5"
+    elif 1.5 <= a <= 2:
+        return "A_MediumFav 1.5-2"
+    elif 2 < a <= 3:
+        return "A_SmallFav 2-3"
+
+    return "Others"
+
+# ----------------------------------------------------------
+# label_series
+# ----------------------------------------------------------
+
+def label_series(df):
+    """
+    Versione vettoriale di label_match su tutte le righe di df
+    (stesse regole e stesso ordine di priorità).
+    """
+    h = pd.to_numeric(df["Odd home"], errors="coerce").to_numpy(dtype=float) \
+        if "Odd home" in df.columns else np.full(len(df), np.nan)
+    a = pd.to_numeric(df["Odd Away"], errors="coerce").to_numpy(dtype=float) \
+        if "Odd Away" in df.columns else np.full(len(df), np.nan)
+
+    missing = np.isnan(h) | np.isnan(a)
+
+    conditions = [
+        missing,
+        (h <= 3) & (a <= 3),
+        h < 1.5,
+        (1.5 <= h) & (h <= 2),
+        (2 < h) & (h <= 3),
+        a < 1.5,
+        (1.5 <= a) & (a <= 2),
+        (2 < a) & (a <= 3),
+    ]
+    choices = [
+        "Others",
+        "SuperCompetitive H<=3 A<=3",
+        "H_StrongFav <1.5",
+        "H_MediumFav 1.5-2",
+        "H_SmallFav 2-3",
+        "A_StrongFav <1.5",
+        "A_MediumFav 1.5-2",
+        "A_SmallFav 2-3",
+    ]
+    return pd.Series(np.select(conditions, choices, default="Others"), index=df.index, name="Label")
+
+# ----------------------------------------------------------
+# extract_minutes
+# ----------------------------------------------------------
+
+def extract_minutes(series):
+    """
+    Estrae i minuti di goal da colonne tipo 'mgolh' o 'mgola'
+    anche se NULL, vuote o contenenti solo ';'
+    """
+    all_minutes = []
+
+    # Sostituisci NaN con stringa vuota
+    series = series.fillna("")
+
+    for val in series:
+        val = str(val).strip()
+        if val == "" or val == ";":
+            continue
+        parts = val.replace(",", ";").split(";")
+        for part in parts:
+            part = part.strip()
+            if part.replace(".", "", 1).isdigit():
+                all_minutes.append(int(float(part)))
+    return all_minutes
+
+# Un minuto valido tra due separatori: cifre con al massimo un punto
+_MINUTE_TOKEN = re.compile(r"(?:^|;)\s*(\d+\.?\d*|\.\d+)\s*(?=;|$)")
+
+def extract_minutes_array(series):
+    """
+    Versione vettoriale di extract_minutes: stessi minuti, nello stesso
+    ordine, come array di interi. Tutte le celle vengono unite in una sola
+    stringa e lette con una regex invece di essere divise una per una.
+    """
+    text = ";".join(series.fillna("").astype(str).tolist()).replace(",", ";")
+    tokens = _MINUTE_TOKEN.findall(text)
+    return np.array(tokens, dtype=float).astype(int) if tokens else np.array([], dtype=int)
+
+# ----------------------------------------------------------
+# dataset_version
+# ----------------------------------------------------------
+
+def dataset_version(df, columns=None):
+    """
+    Impronta del contenuto del DataFrame (hash vettoriale delle righe):
+    cambia quando cambiano i dati, utile come chiave di cache.
+    """
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return f"{len(df)}-{int(row_hashes.sum(dtype=np.uint64)):016x}"
+
+# --------------------------------------------------------
+# LABEL FROM ODDS
+# --------------------------------------------------------
+def label_from_odds(home_odd, away_odd):
+    fake_row = {
+        "Odd home": home_odd,
+        "Odd Away": away_odd
+    }
+    return label_match(fake_row)
+
+# --------------------------------------------------------
+# DETERMINA TIPO DI LABEL
+# --------------------------------------------------------
+def get_label_type(label):
+    if label and label.startswith("H_"):
+        return "Home"
+    elif label and label.startswith("A_"):
+        return "Away"
+    else:
+        return "Both"
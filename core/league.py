@@ -0,0 +1,376 @@
+import numpy as np
+import pandas as pd
+from core.labels import label_series, extract_minutes, extract_minutes_array
+from core.pre_match import back_lay_profits
+from core.dataset import add_derived_columns
+
+def calculate_goal_timeframes(sub_df, label):
+    """
+    Calcola la distribuzione % dei goal segnati e concessi per intervallo di minuti.
+    """
+
+    time_bands = ["0-15", "16-30", "31-45", "46-60", "61-75", "76-90"]
+
+    # Leggi minuti goal da colonne corrette (post-rename)
+    minutes_home = []
+    minutes_away = []
+
+    if "minuti goal segnato home" in sub_df.columns:
+        minutes_home = extract_minutes(sub_df["minuti goal segnato home"])
+
+    if "minuti goal segnato away" in sub_df.columns:
+        minutes_away = extract_minutes(sub_df["minuti goal segnato away"])
+
+    # Fallback su colonne singole se i minuti sono vuoti
+    if len(minutes_home) == 0:
+        for col in [
+            "home 1 goal segnato(min)",
+            "home 2 goal segnato(min)",
+            "home 3 goal segnato(min)",
+            "home 4 goal segnato(min)",
+            "home 5 goal segnato(min)",
+            "home 6 goal segnato(min)",
+            "home 7 goal segnato(min)",
+            "home 8 goal segnato(min)",
+            "home 9 goal segnato(min)",
+        ]:
+            if col in sub_df.columns:
+                val = sub_df[col].values[0]
+                if not pd.isna(val) and val != 0:
+                    minutes_home.append(int(val))
+
+    if len(minutes_away) == 0:
+        for col in [
+            "1 goal away (min)",
+            "2 goal away (min)",
+            "3 goal away (min)",
+            "4 goal away (min)",
+            "5 goal away (min)",
+            "6 goal away (min)",
+            "7 goal away (min)",
+            "8 goal away (min)",
+            "9 goal away (min)",
+        ]:
+            if col in sub_df.columns:
+                val = sub_df[col].values[0]
+                if not pd.isna(val) and val != 0:
+                    minutes_away.append(int(val))
+
+    # ✅ FIX: se ancora vuoti, usa goal FT come finti minuti
+    if len(minutes_home) == 0 and "Home Goal FT" in sub_df.columns:
+        for _, row in sub_df.iterrows():
+            n_goals = int(row.get("Home Goal FT", 0))
+            for _ in range(n_goals):
+                minutes_home.append(90)
+
+    if len(minutes_away) == 0 and "Away Goal FT" in sub_df.columns:
+        for _, row in sub_df.iterrows():
+            n_goals = int(row.get("Away Goal FT", 0))
+            for _ in range(n_goals):
+                minutes_away.append(91)
+
+    # Determina se home o away
+    if label.startswith("H_"):
+        minutes_scored = minutes_home
+        minutes_conceded = minutes_away
+    elif label.startswith("A_"):
+        minutes_scored = minutes_away
+        minutes_conceded = minutes_home
+    elif label.startswith("SuperCompetitive"):
+        minutes_scored = minutes_home
+        minutes_conceded = minutes_away
+    else:
+        minutes_scored = minutes_home + minutes_away
+        minutes_conceded = minutes_away + minutes_home
+
+    scored_counts = {band: 0 for band in time_bands}
+    for m in minutes_scored:
+        for band in time_bands:
+            low, high = map(int, band.split("-"))
+            if low <= m <= high:
+                scored_counts[band] += 1
+                break
+
+    conceded_counts = {band: 0 for band in time_bands}
+    for m in minutes_conceded:
+        for band in time_bands:
+            low, high = map(int, band.split("-"))
+            if low <= m <= high:
+                conceded_counts[band] += 1
+                break
+
+    total_scored = sum(scored_counts.values())
+    total_conceded = sum(conceded_counts.values())
+
+    scored_percents = {
+        band: round((scored_counts[band] / total_scored * 100), 2) if total_scored > 0 else 0
+        for band in time_bands
+    }
+
+    conceded_percents = {
+        band: round((conceded_counts[band] / total_conceded * 100), 2) if total_conceded > 0 else 0
+        for band in time_bands
+    }
+
+    return scored_percents, conceded_percents
+
+# --------------------------------------------------------
+# GOAL TIME FRAME (VETTORIALE)
+# --------------------------------------------------------
+TIME_BANDS = ["0-15", "16-30", "31-45", "46-60", "61-75", "76-90"]
+TIME_BAND_ENDS = np.array([15, 30, 45, 60, 75, 90])
+
+HOME_MINUTE_COLS = [f"home {i} goal segnato(min)" for i in range(1, 10)]
+AWAY_MINUTE_COLS = [f"{i} goal away (min)" for i in range(1, 10)]
+
+def _first_row_minutes(sub_df, cols):
+    # Come calculate_goal_timeframes: solo la prima riga delle colonne singole
+    minutes = []
+    for col in cols:
+        if col in sub_df.columns:
+            val = sub_df[col].values[0]
+            if not pd.isna(val) and val != 0:
+                minutes.append(int(val))
+    return np.array(minutes, dtype=int)
+
+def _fake_minutes(sub_df, col, minute):
+    # Un "minuto" fittizio per ogni goal FT; le partite senza goal FT sono saltate
+    goals = sub_df[col].to_numpy(dtype=float)
+    goals = goals[~np.isnan(goals)]
+    return np.full(int(np.clip(np.trunc(goals), 0, None).sum()), minute)
+
+def _band_counts(minutes):
+    minutes = minutes[(minutes >= 0) & (minutes <= 90)]
+    return np.bincount(np.searchsorted(TIME_BAND_ENDS, minutes), minlength=len(TIME_BANDS))
+
+def _band_percents(counts):
+    total = int(counts.sum())
+    return {
+        band: round((int(count) / total * 100), 2) if total > 0 else 0
+        for band, count in zip(TIME_BANDS, counts)
+    }
+
+def calculate_goal_timeframes_vectorized(sub_df, label):
+    """
+    Versione vettoriale di calculate_goal_timeframes: stessi fallback
+    (colonne singole, goal FT come minuto 90/91) e stesse percentuali.
+    Nel fallback sui goal FT le partite senza risultato non contano,
+    invece di mandare in errore la pagina come int(NaN) nell'originale.
+    """
+    minutes_home = np.array([], dtype=int)
+    minutes_away = np.array([], dtype=int)
+
+    if "minuti goal segnato home" in sub_df.columns:
+        minutes_home = extract_minutes_array(sub_df["minuti goal segnato home"])
+
+    if "minuti goal segnato away" in sub_df.columns:
+        minutes_away = extract_minutes_array(sub_df["minuti goal segnato away"])
+
+    if len(minutes_home) == 0:
+        minutes_home = _first_row_minutes(sub_df, HOME_MINUTE_COLS)
+
+    if len(minutes_away) == 0:
+        minutes_away = _first_row_minutes(sub_df, AWAY_MINUTE_COLS)
+
+    if len(minutes_home) == 0 and "Home Goal FT" in sub_df.columns:
+        minutes_home = _fake_minutes(sub_df, "Home Goal FT", 90)
+
+    if len(minutes_away) == 0 and "Away Goal FT" in sub_df.columns:
+        minutes_away = _fake_minutes(sub_df, "Away Goal FT", 91)
+
+    home_counts = _band_counts(minutes_home)
+    away_counts = _band_counts(minutes_away)
+
+    if label.startswith("H_") or label.startswith("SuperCompetitive"):
+        scored_counts, conceded_counts = home_counts, away_counts
+    elif label.startswith("A_"):
+        scored_counts, conceded_counts = away_counts, home_counts
+    else:
+        scored_counts = conceded_counts = home_counts + away_counts
+
+    return _band_percents(scored_counts), _band_percents(conceded_counts)
+
+# --------------------------------------------------------
+# FUNZIONE: Sweep continuo delle soglie di quota
+# --------------------------------------------------------
+
+SWEEP_ODD_COLS = {
+    "HOME": "Odd home",
+    "DRAW": "Odd Draw",
+    "AWAY": "Odd Away",
+}
+
+def calculate_odds_sweep(sub_df, outcome, direction="<="):
+    """
+    Calcola profitto e ROI% back/lay cumulati per ogni possibile soglia
+    di quota dell'esito (HOME, DRAW, AWAY).
+
+    Le partite vengono ordinate per quota una sola volta e i profitti
+    cumulati si ottengono con somme prefisse: O(n log n) in totale
+    invece di richiamare calculate_back_lay per ogni soglia.
+
+    direction "<=" → partite con quota <= soglia
+    direction ">=" → partite con quota >= soglia
+    """
+    columns = ["Soglia", "Matches", "Back Pts", "Back ROI %", "Lay Pts", "Lay ROI %"]
+    odd_col = SWEEP_ODD_COLS[outcome]
+
+    if sub_df.empty or odd_col not in sub_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    # Profitti con le regole di calculate_back_lay; la soglia è la quota numerica
+    _, back, lay = back_lay_profits(sub_df)[outcome]
+    prices = pd.to_numeric(sub_df[odd_col], errors="coerce").to_numpy(dtype=float)
+
+    # Le quote mancanti non hanno una soglia: escluse dallo sweep
+    valid = ~np.isnan(prices) & (prices > 1)
+    prices, back, lay = prices[valid], back[valid], lay[valid]
+
+    if len(prices) == 0:
+        return pd.DataFrame(columns=columns)
+
+    order = np.argsort(prices, kind="mergesort")
+    if direction == ">=":
+        order = order[::-1]
+
+    prices, back, lay = prices[order], back[order], lay[order]
+
+    matches = np.arange(1, len(prices) + 1)
+    back_cum = np.cumsum(back)
+    lay_cum = np.cumsum(lay)
+
+    # Una sola riga per soglia: l'ultima posizione di ogni quota distinta
+    last_of_price = np.r_[prices[1:] != prices[:-1], True]
+
+    sweep = pd.DataFrame({
+        "Soglia": prices[last_of_price],
+        "Matches": matches[last_of_price],
+        "Back Pts": back_cum[last_of_price],
+        "Back ROI %": back_cum[last_of_price] / matches[last_of_price] * 100,
+        "Lay Pts": lay_cum[last_of_price],
+        "Lay ROI %": lay_cum[last_of_price] / matches[last_of_price] * 100,
+    })
+
+    if direction == ">=":
+        sweep = sweep.iloc[::-1].reset_index(drop=True)
+
+    return sweep.round(2)
+
+# --------------------------------------------------------
+# PREPARAZIONE DATI CAMPIONATO
+# --------------------------------------------------------
+
+MACRO_REQUIRED_COLS = [
+    "Home", "Away",
+    "Home Goal FT", "Away Goal FT",
+    "Home Goal 1T", "Away Goal 1T",
+    "country", "Stagione"
+]
+
+def prepare_league_frame(df):
+    """
+    Nuovo DataFrame pronto per le statistiche di campionato:
+    country/Stagione testuali, quote 1X2 numeriche, colonne derivate e Label.
+    """
+    updates = {
+        "country": df["country"].fillna("Unknown").astype(str).replace("", "Unknown"),
+        "Stagione": df["Stagione"].fillna("Unknown").astype(str).replace("", "Unknown"),
+    }
+
+    for col in ["Odd home", "Odd Draw", "Odd Away"]:
+        if col in df.columns and not pd.api.types.is_float_dtype(df[col]):
+            updates[col] = (
+                df[col]
+                .astype(str)
+                .str.replace(",", ".")
+                .replace("nan", np.nan)
+                .astype(float)
+            )
+
+    df = add_derived_columns(df.assign(**updates))
+
+    # Label da ricalcolare solo se le quote sono state appena convertite
+    if "Label" in df.columns and not {"Odd home", "Odd Away"} & set(updates):
+        return df
+    return df.assign(Label=label_series(df))
+
+# --------------------------------------------------------
+# STATISTICHE AGGREGATE PER GRUPPO
+# --------------------------------------------------------
+def group_stats(df, group_cols):
+    """
+    Statistiche di campionato per gruppo (country/Stagione, Label, ...):
+    esiti 1X2, medie goal, Over FH/FT e BTTS in percentuale.
+    df deve contenere le colonne di prepare_league_frame.
+    """
+    fh, ft = df["goals_1st_half"], df["goals_total"]
+
+    flags = pd.DataFrame({
+        "HomeWin_pct": df["match_result"] == "Home Win",
+        "Draw_pct": df["match_result"] == "Draw",
+        "AwayWin_pct": df["match_result"] == "Away Win",
+        "Over05_FH_pct": fh > 0.5,
+        "Over15_FH_pct": fh > 1.5,
+        "Over25_FH_pct": fh > 2.5,
+        "Over05_FT_pct": ft > 0.5,
+        "Over15_FT_pct": ft > 1.5,
+        "Over25_FT_pct": ft > 2.5,
+        "Over35_FT_pct": ft > 3.5,
+        "Over45_FT_pct": ft > 4.5,
+        "BTTS_pct": df["btts"],
+    })
+
+    keys = [df[col] for col in group_cols]
+    results = ["HomeWin_pct", "Draw_pct", "AwayWin_pct"]
+    pct = flags.groupby(keys).mean() * 100
+    avg_goals = df[["goals_1st_half", "goals_2nd_half", "goals_total"]].groupby(keys).mean()
+
+    grouped = pd.concat([
+        df["Home"].groupby(keys).count().rename("Matches"),
+        pct[results],
+        avg_goals.set_axis(["AvgGoals1T", "AvgGoals2T", "AvgGoalsTotal"], axis=1),
+        pct.drop(columns=results),
+    ], axis=1).reset_index()
+
+    new_columns = {
+        col: col.replace("_pct", " %").replace("pct", "%") if "pct" in col else col
+        for col in grouped.columns
+    }
+    grouped = grouped.rename(columns=new_columns)
+
+    cols_numeric = grouped.select_dtypes(include=[np.number]).columns
+    grouped[cols_numeric] = grouped[cols_numeric].round(2)
+    return grouped
+
+def add_total_row(grouped, group_cols):
+    """
+    Aggiunge la riga Total con le medie pesate sul numero di partite.
+    """
+    if grouped.empty:
+        return grouped
+
+    total_row = {group_cols[0]: "Total"}
+    for col in group_cols[1:]:
+        total_row[col] = "-"
+
+    total_row["Matches"] = grouped["Matches"].sum()
+
+    for col in grouped.columns:
+        if col not in group_cols + ["Matches"]:
+            weighted_sum = (grouped[col] * grouped["Matches"]).sum()
+            weighted_avg = weighted_sum / grouped["Matches"].sum() if grouped["Matches"].sum() > 0 else 0
+            total_row[col] = round(weighted_avg, 2)
+
+    return pd.concat([grouped, pd.DataFrame([total_row])], ignore_index=True)
+
+def league_summary(df):
+    """
+    League Stats Summary: statistiche per country/Stagione più riga Total.
+    """
+    return add_total_row(group_stats(df, ["country", "Stagione"]), ["country", "Stagione"])
+
+def label_summary(df):
+    """
+    League Data by Start Price: statistiche per Label.
+    """
+    return group_stats(df, ["Label"])
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------
+# MERCATI GOAL: OVER / UNDER 0.5 – 4.5 E BTTS
+# --------------------------------------------------------
+
+# (nome mercato, colonna quota post-rename, tipo, linea goal)
+MARKETS = [
+    ("Over 0.5", "odd over 0,5", "over", 0.5),
+    ("Over 1.5", "odd over 1,5", "over", 1.5),
+    ("Over 2.5", "odd over 2,5", "over", 2.5),
+    ("Over 3.5", "odd over 3,5", "over", 3.5),
+    ("Over 4.5", "odd over 4,5", "over", 4.5),
+    ("Under 0.5", "odds under 0,5", "under", 0.5),
+    ("Under 1.5", "odd under 1,5", "under", 1.5),
+    ("Under 2.5", "odd under 2,5", "under", 2.5),
+    ("Under 3.5", "odd under 3,5", "under", 3.5),
+    ("Under 4.5", "odd under 4,5", "under", 4.5),
+    ("BTTS Sì", "gg", "btts", None),
+    ("BTTS No", "ng", "no_btts", None),
+]
+
+MARKET_NAMES = [name for name, _, _, _ in MARKETS]
+
+# --------------------------------------------------------
+# MATRICI QUOTE / ESITI
+# --------------------------------------------------------
+def market_matrices(df):
+    """
+    Costruisce in un solo passaggio:
+    - odds: matrice n_partite × n_mercati delle quote (NaN se mancante o <= 1)
+    - won:  matrice booleana degli esiti vincenti
+    """
+    n = len(df)
+    home_goals = pd.to_numeric(df["Home Goal FT"], errors="coerce").to_numpy(dtype=float)
+    away_goals = pd.to_numeric(df["Away Goal FT"], errors="coerce").to_numpy(dtype=float)
+    goals = home_goals + away_goals
+    btts = (home_goals > 0) & (away_goals > 0)
+
+    odds = np.full((n, len(MARKETS)), np.nan)
+    won = np.zeros((n, len(MARKETS)), dtype=bool)
+
+    for j, (_, odd_col, kind, line) in enumerate(MARKETS):
+        if odd_col in df.columns:
+            odds[:, j] = pd.to_numeric(df[odd_col], errors="coerce").to_numpy(dtype=float)
+
+        if kind == "over":
+            won[:, j] = goals > line
+        elif kind == "under":
+            won[:, j] = goals < line
+        elif kind == "btts":
+            won[:, j] = btts
+        else:
+            won[:, j] = ~btts
+
+    # Quote assenti (0, vuote) e partite senza risultato non sono giocabili
+    odds[(odds <= 1) | np.isnan(goals)[:, None]] = np.nan
+
+    return odds, won
+
+# --------------------------------------------------------
+# VALUTAZIONE BACK / LAY
+# --------------------------------------------------------
+def market_values(df):
+    """
+    Matrice n_partite × (4 × n_mercati) con, per ogni mercato, scommesse,
+    vincite, profitto back e profitto lay: basta sommarla per gruppo.
+    """
+    odds, won = market_matrices(df)
+    bets = ~np.isnan(odds)
+
+    values = np.empty((len(df), 4 * len(MARKETS)))
+    m = len(MARKETS)
+    values[:, :m] = bets
+    values[:, m:2 * m] = bets & won
+    values[:, 2 * m:3 * m] = np.where(bets, np.where(won, odds - 1, -1.0), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values[:, 3 * m:] = np.where(bets, np.where(won, -1.0, 1 / (odds - 1)), 0.0)
+    return values
+
+def _summarize_markets(values, keys, group_cols, sort=True):
+    """
+    Somme per gruppo di market_values → tabella long per mercato.
+    """
+    columns = group_cols + ["Mercato", "Bets", "Hit %", "Back Pts", "Back ROI %", "Lay Pts", "Lay ROI %"]
+    m = len(MARKETS)
+
+    if group_cols:
+        sums = pd.DataFrame(values).groupby(keys, sort=sort).sum()
+        index = sums.index
+        sums = sums.to_numpy()
+    else:
+        index = None
+        sums = values.sum(axis=0, keepdims=True)
+
+    bets_sum, hits_sum, back_sum, lay_sum = (sums[:, i * m:(i + 1) * m] for i in range(4))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit_pct = np.where(bets_sum > 0, hits_sum / bets_sum * 100, 0)
+        back_roi = np.where(bets_sum > 0, back_sum / bets_sum * 100, 0)
+        lay_roi = np.where(bets_sum > 0, lay_sum / bets_sum * 100, 0)
+
+    result = pd.DataFrame({
+        "Mercato": np.tile(MARKET_NAMES, len(sums)),
+        "Bets": bets_sum.ravel().astype(int),
+        "Hit %": hit_pct.ravel(),
+        "Back Pts": back_sum.ravel(),
+        "Back ROI %": back_roi.ravel(),
+        "Lay Pts": lay_sum.ravel(),
+        "Lay ROI %": lay_roi.ravel(),
+    })
+
+    if group_cols:
+        group_values = index.to_frame(index=False) if isinstance(index, pd.MultiIndex) \
+            else pd.DataFrame({0: index})
+        group_values.columns = group_cols
+        group_values = group_values.loc[group_values.index.repeat(m)].reset_index(drop=True)
+        result = pd.concat([group_values, result], axis=1)
+
+    return result[columns].round(2)
+
+def evaluate_markets(df, group_cols=None, sort=True):
+    """
+    Calcola profitti e ROI% back/lay (responsabilità lay = 1) per ogni mercato
+    Over/Under e BTTS, raggruppando per group_cols (es. ["country"],
+    ["country", "Label"]). Le partite senza quota per un mercato non
+    vengono contate in quel mercato (colonna Bets).
+
+    Restituisce un DataFrame long: group_cols + Mercato, Bets, Hit %,
+    Back Pts, Back ROI %, Lay Pts, Lay ROI %.
+    """
+    group_cols = list(group_cols or [])
+
+    if df.empty:
+        columns = group_cols + ["Mercato", "Bets", "Hit %", "Back Pts", "Back ROI %", "Lay Pts", "Lay ROI %"]
+        return pd.DataFrame(columns=columns)
+
+    keys = [df[col].to_numpy() for col in group_cols]
+    return _summarize_markets(market_values(df), keys, group_cols, sort=sort)
+
+def evaluate_markets_by_team(df):
+    """
+    Mercati per squadra, separando le partite in casa e in trasferta
+    (colonne Squadra, Venue). I valori per partita si calcolano una volta
+    sola e si sommano due volte (per squadra di casa e per ospite), senza
+    duplicare il DataFrame.
+    """
+    if df.empty:
+        return evaluate_markets(df, ["Squadra", "Venue"])
+
+    values = market_values(df)
+    venues = []
+    for venue in ["Away", "Home"]:
+        result = _summarize_markets(values, [df[venue].to_numpy()], ["Squadra"])
+        result.insert(1, "Venue", venue)
+        venues.append(result)
+
+    result = pd.concat(venues, ignore_index=True)
+    return result.sort_values(["Squadra", "Venue"], kind="mergesort").reset_index(drop=True)
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# --------------------------------------------------------
+# TEMPI E MEMORIA PER FASE
+# --------------------------------------------------------
+# Una "run" è un rerun dell'app (o un comando CLI): ogni fase con nome
+# (load, normalize, label, aggregate/..., render/...) registra durata e,
+# se richiesto, picco di memoria Python (tracemalloc). Le fasi si possono
+# annidare; fuori da una run stage() non fa nulla.
+#
+# Ogni thread (sessione Streamlit) ha la sua run. tracemalloc invece è
+# globale: con più sessioni attive i picchi includono anche le loro
+# allocazioni.
+
+PERF_LOG_PATH = os.environ.get("PERF_LOG_PATH")
+
+_local = threading.local()
+_memory_lock = threading.Lock()
+_memory_runs = 0
+
+MB = 1024 * 1024
+
+def start_run(name, memory=False):
+    """
+    Inizia la raccolta per il thread corrente. memory=True attiva
+    tracemalloc finché la run non termina (rallenta i calcoli).
+    """
+    global _memory_runs
+
+    if getattr(_local, "run", None) is not None:
+        end_run(log=False)
+
+    if memory:
+        with _memory_lock:
+            _memory_runs += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    _local.run = {
+        "run": name,
+        "started_at": time.time(),
+        "memory": memory,
+        "stages": [],
+        "stack": [],
+        "t0": time.perf_counter(),
+    }
+
+@contextmanager
+def stage(name):
+    run = getattr(_local, "run", None)
+    if run is None:
+        yield
+        return
+
+    memory = run["memory"] and tracemalloc.is_tracing()
+    stack = run["stack"]
+
+    entry = {"stage": name, "depth": len(stack), "ms": 0.0, "peak_mb": None, "delta_mb": None}
+    run["stages"].append(entry)
+
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        # Il picco è globale: quello accumulato finora va al padre prima del reset
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        frame = {"entry": entry, "mem0": current, "peak": current}
+    else:
+        frame = {"entry": entry}
+
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        stack.pop()
+
+        if memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(frame["peak"], peak)
+            entry["peak_mb"] = round((peak - frame["mem0"]) / MB, 2)
+            entry["delta_mb"] = round((current - frame["mem0"]) / MB, 2)
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+
+def end_run(log=True):
+    """
+    Chiude la run del thread corrente e restituisce il report
+    (None se non c'è una run aperta). Con PERF_LOG_PATH impostata il
+    report viene anche aggiunto al file come riga JSON.
+    """
+    global _memory_runs
+
+    run = getattr(_local, "run", None)
+    if run is None:
+        return None
+    _local.run = None
+
+    if run["memory"]:
+        with _memory_lock:
+            _memory_runs -= 1
+            if _memory_runs == 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    report = {
+        "run": run["run"],
+        "started_at": run["started_at"],
+        "total_ms": round((time.perf_counter() - run["t0"]) * 1000, 2),
+        "memory": run["memory"],
+        "stages": run["stages"],
+    }
+
+    if log and PERF_LOG_PATH:
+        with open(PERF_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+
+    return report
+
+def summarize_stages(report):
+    """
+    Una riga per fase (stesso nome e livello): chiamate, tempo totale,
+    picco massimo e variazione di memoria totale.
+    """
+    summary = {}
+    for entry in report["stages"]:
+        key = (entry["depth"], entry["stage"])
+        row = summary.setdefault(key, {
+            "Fase": "  " * (entry["depth"] - 1) + "↳ " + entry["stage"] if entry["depth"] else entry["stage"],
+            "Chiamate": 0, "ms": 0.0, "Picco MB": None, "Delta MB": None,
+        })
+        row["Chiamate"] += 1
+        row["ms"] = round(row["ms"] + entry["ms"], 2)
+        if entry["peak_mb"] is not None:
+            row["Picco MB"] = max(row["Picco MB"] or 0.0, entry["peak_mb"])
+            row["Delta MB"] = round((row["Delta MB"] or 0.0) + entry["delta_mb"], 2)
+    return list(summary.values())
+
+def report_json(report):
+    return json.dumps(report, indent=2, ensure_ascii=False)
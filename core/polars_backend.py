@@ -0,0 +1,373 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import polars as pl
+from core.dataset import COL_MAP, GOAL_COLS
+from core.league import add_total_row
+from core.team import macro_stats_from_counts
+
+# --------------------------------------------------------
+# BACKEND POLARS (query lazy, multi-core)
+# --------------------------------------------------------
+# Stesse regole di core.dataset / core.league / core.team espresse come
+# query Polars lazy: Polars ottimizza il piano (proiezioni e filtri spinti
+# fino alla lettura) e lo esegue su tutti i core. I risultati tornano
+# pandas solo alla fine, per le pagine e la CLI. La parità con il percorso
+# pandas è verificata da equivalence.py.
+
+def to_lazy(source):
+    """
+    LazyFrame da un DataFrame pandas, da uno o più file Parquet (letti a
+    blocchi con scan_parquet) o da un LazyFrame già pronto.
+    """
+    if isinstance(source, pl.LazyFrame):
+        return source
+    if isinstance(source, pl.DataFrame):
+        return source.lazy()
+    if isinstance(source, pd.DataFrame):
+        return pl.from_pandas(source).lazy()
+
+    paths = [source] if isinstance(source, (str, os.PathLike)) else list(source)
+    return pl.scan_parquet([os.fspath(path) for path in paths], missing_columns="insert")
+
+def _schema(lf):
+    return lf.collect_schema()
+
+# --------------------------------------------------------
+# NORMALIZZAZIONE DATI GREZZI (come normalize_raw)
+# --------------------------------------------------------
+NUMERIC_SAMPLE_ROWS = 1000
+
+def _numeric_checks(lf, cols):
+    checks = []
+    for col in cols:
+        text = pl.col(col).str.strip_chars()
+        empty = text.is_null() | (text == "")
+        as_float = text.cast(pl.Float64, strict=False)
+        checks += [
+            # pd.to_numeric non accetta "nan" come numero
+            ((as_float.is_null() & ~empty) | as_float.is_nan()).any().alias(f"{col}\0bad"),
+            (text.cast(pl.Int64, strict=False).is_null() & as_float.is_not_null()).any().alias(f"{col}\0float"),
+            empty.any().alias(f"{col}\0empty"),
+        ]
+    return lf.select(checks).collect().row(0, named=True)
+
+def _numeric_casts(lf, text_cols):
+    """
+    Per ogni colonna testuale il cast di pd.to_numeric: Int64 se tutti i
+    valori sono interi, Float64 se sono numeri (o vuoti), nessuno se anche
+    un solo valore non è numerico. Le colonne di testo (squadre, minuti)
+    vengono scartate già sulle prime righe; le altre in un solo collect.
+    """
+    if not text_cols:
+        return {}
+
+    sample = _numeric_checks(lf.head(NUMERIC_SAMPLE_ROWS), text_cols)
+    candidates = [col for col in text_cols if not sample[f"{col}\0bad"]]
+    if not candidates:
+        return {}
+
+    result = _numeric_checks(lf, candidates)
+    casts = {}
+    for col in candidates:
+        if result[f"{col}\0bad"]:
+            continue
+        is_int = not result[f"{col}\0float"] and not result[f"{col}\0empty"]
+        casts[col] = pl.Int64 if is_int else pl.Float64
+    return casts
+
+def normalize_raw_polars(df):
+    """
+    normalize_raw su Polars, per dati grezzi pandas (Supabase o upload):
+    intestazioni minuscole, virgole decimali → punti nelle colonne object,
+    conversione numerica e data partita. Restituisce pandas.
+    """
+    df = df.set_axis(df.columns.str.strip().str.lower(), axis=1)
+    object_cols = [col for col in df.columns if df[col].dtype == object]
+
+    # Come .str.replace di pandas: nelle colonne object solo le stringhe
+    # restano, gli altri valori diventano mancanti
+    frame = pl.from_pandas(df.drop(columns=object_cols)) if len(object_cols) < len(df.columns) else pl.DataFrame()
+    frame = frame.with_columns([
+        pl.Series(col, [v if isinstance(v, str) else None for v in df[col]], dtype=pl.String)
+        for col in object_cols
+    ]).select(list(df.columns))
+
+    lf = frame.lazy().with_columns([
+        pl.col(col).str.replace_all(",", ".", literal=True) for col in object_cols
+    ])
+
+    text_cols = [col for col, dtype in _schema(lf).items() if dtype == pl.String]
+    casts = _numeric_casts(lf, text_cols)
+    lf = lf.with_columns([
+        pl.col(col).str.strip_chars().replace("", None).cast(dtype, strict=False)
+        for col, dtype in casts.items()
+    ])
+
+    # Colonne object tutte vuote: pd.to_numeric le rende float NaN
+    lf = lf.with_columns([pl.col(col).cast(pl.Float64) for col, dtype in _schema(lf).items() if dtype == pl.Null])
+
+    if "datameci" in _schema(lf):
+        dtype = _schema(lf)["datameci"]
+        lf = lf.with_columns(_to_datetime(pl.col("datameci"), dtype, _date_format(lf, "datameci", dtype)))
+
+    return lf.collect().to_pandas()
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _date_format(lf, col, dtype):
+    """
+    "%Y-%m-%d" se la prima data è in quel formato (come l'inferenza di
+    pd.to_datetime sul primo valore), altrimenti None (formato dedotto).
+    """
+    if dtype != pl.String:
+        return None
+    first = lf.select(pl.col(col).drop_nulls().first()).collect().item()
+    return "%Y-%m-%d" if first is not None and ISO_DATE.fullmatch(first.strip()) else None
+
+def _to_datetime(expr, dtype, fmt=None):
+    if dtype == pl.String:
+        return expr.str.to_datetime(fmt, strict=False)
+    if dtype == pl.Date:
+        return expr.cast(pl.Datetime)
+    return expr
+
+# --------------------------------------------------------
+# DATASET PRONTO PER LE PAGINE (come prepare_matches)
+# --------------------------------------------------------
+def _clean_name(name):
+    # Come rename_columns: COL_MAP, poi spazi, tab e a capo
+    name = re.sub(r"[\n\r\t]", "", str(COL_MAP.get(name, name)).strip())
+    return re.sub(r"\s+", " ", name)
+
+def derived_exprs(schema):
+    """
+    Colonne di add_derived_columns non ancora presenti in schema.
+    """
+    hg, ag = pl.col("Home Goal FT"), pl.col("Away Goal FT")
+    goals_total = hg + ag
+    goals_1st_half = pl.col("Home Goal 1T") + pl.col("Away Goal 1T")
+    exprs = {
+        "goals_total": goals_total,
+        "goals_1st_half": goals_1st_half,
+        "goals_2nd_half": (
+            (pl.col("goals_total") if "goals_total" in schema else goals_total)
+            - (pl.col("goals_1st_half") if "goals_1st_half" in schema else goals_1st_half)
+        ),
+        "btts": ((hg > 0) & (ag > 0)).fill_null(False).cast(pl.Int64),
+        "match_result": (
+            pl.when(hg > ag).then(pl.lit("Home Win"))
+            .when(hg < ag).then(pl.lit("Away Win"))
+            .otherwise(pl.lit("Draw"))
+        ),
+    }
+    return [expr.alias(name) for name, expr in exprs.items() if name not in schema]
+
+def _odd(col, schema):
+    if col not in schema:
+        return pl.lit(None, dtype=pl.Float64)
+    expr = pl.col(col).cast(pl.Float64, strict=False)
+    return expr.fill_nan(None)
+
+def label_expr(schema):
+    """
+    Label con le regole (e la priorità) di label_series.
+    """
+    h, a = _odd("Odd home", schema), _odd("Odd Away", schema)
+    return (
+        pl.when(h.is_null() | a.is_null()).then(pl.lit("Others"))
+        .when((h <= 3) & (a <= 3)).then(pl.lit("SuperCompetitive H<=3 A<=3"))
+        .when(h < 1.5).then(pl.lit("H_StrongFav <1.5"))
+        .when(h <= 2).then(pl.lit("H_MediumFav 1.5-2"))
+        .when(h <= 3).then(pl.lit("H_SmallFav 2-3"))
+        .when(a < 1.5).then(pl.lit("A_StrongFav <1.5"))
+        .when(a <= 2).then(pl.lit("A_MediumFav 1.5-2"))
+        .when(a <= 3).then(pl.lit("A_SmallFav 2-3"))
+        .otherwise(pl.lit("Others"))
+        .alias("Label")
+    )
+
+def prepare_matches_lazy(source):
+    """
+    Piano lazy di prepare_matches: nomi colonna di analisi, Data come
+    datetime, nomi squadra senza spazi, colonne derivate e Label.
+    """
+    lf = to_lazy(source)
+    lf = lf.rename({col: _clean_name(col) for col in _schema(lf).names()})
+    schema = _schema(lf)
+
+    updates = []
+    if "Data" in schema:
+        updates.append(_to_datetime(pl.col("Data"), schema["Data"], "%Y-%m-%d"))
+    for col in ["Home", "Away"]:
+        if col in schema and schema[col] == pl.String:
+            updates.append(pl.col(col).str.strip_chars())
+    if updates:
+        lf = lf.with_columns(updates)
+
+    if set(GOAL_COLS) <= set(schema.names()):
+        lf = lf.with_columns(derived_exprs(schema))
+
+    if "Label" not in schema and {"Odd home", "Odd Away"} <= set(schema.names()):
+        lf = lf.with_columns(label_expr(schema))
+
+    return lf
+
+def prepare_matches_polars(df):
+    """
+    prepare_matches eseguita da Polars; restituisce pandas.
+    """
+    return prepare_matches_lazy(df).collect().to_pandas()
+
+# --------------------------------------------------------
+# FILTRI (campionato, stagione, partite future)
+# --------------------------------------------------------
+def _text(col):
+    return pl.col(col).cast(pl.String)
+
+def _filtered(lf, countries=None, seasons=None, until=None):
+    if countries:
+        lf = lf.filter(_text("country").str.strip_chars().str.to_uppercase().is_in(
+            [str(c).strip().upper() for c in countries]
+        ))
+    if seasons:
+        lf = lf.filter(_text("Stagione").is_in([str(s) for s in seasons]))
+    if until is not None and "Data" in _schema(lf):
+        lf = lf.filter(pl.col("Data").is_null() | (pl.col("Data").cast(pl.Date) <= pd.Timestamp(until).date()))
+    return lf
+
+# --------------------------------------------------------
+# STATISTICHE AGGREGATE PER GRUPPO (come group_stats)
+# --------------------------------------------------------
+def _group_key(col, schema):
+    if col in ("country", "Stagione"):
+        # Come prepare_league_frame: vuoti e mancanti → "Unknown"
+        return _text(col).fill_null("Unknown").replace("", "Unknown").alias(col)
+    if col == "Label" and "Label" not in schema:
+        return label_expr(schema)
+    return pl.col(col)
+
+def _pct(condition, name):
+    return (condition.fill_null(False).cast(pl.Float64).mean() * 100).alias(name)
+
+def group_stats_polars(source, group_cols, countries=None, seasons=None, until=None):
+    """
+    group_stats come query Polars: stesse colonne, ordinamento per gruppo
+    e arrotondamento a 2 decimali (fatto in pandas, come group_stats).
+    """
+    lf = _filtered(to_lazy(source), countries, seasons, until)
+    schema = _schema(lf)
+
+    hg, ag = pl.col("Home Goal FT"), pl.col("Away Goal FT")
+    fh = pl.col("Home Goal 1T") + pl.col("Away Goal 1T")
+    ft = hg + ag
+
+    grouped = (
+        lf.group_by([_group_key(col, schema) for col in group_cols])
+        .agg(
+            pl.col("Home").count().alias("Matches"),
+            _pct(hg > ag, "HomeWin %"),
+            _pct(~(hg > ag).fill_null(False) & ~(hg < ag).fill_null(False), "Draw %"),
+            _pct(hg < ag, "AwayWin %"),
+            fh.mean().alias("AvgGoals1T"),
+            (ft - fh).mean().alias("AvgGoals2T"),
+            ft.mean().alias("AvgGoalsTotal"),
+            _pct(fh > 0.5, "Over05_FH %"),
+            _pct(fh > 1.5, "Over15_FH %"),
+            _pct(fh > 2.5, "Over25_FH %"),
+            _pct(ft > 0.5, "Over05_FT %"),
+            _pct(ft > 1.5, "Over15_FT %"),
+            _pct(ft > 2.5, "Over25_FT %"),
+            _pct(ft > 3.5, "Over35_FT %"),
+            _pct(ft > 4.5, "Over45_FT %"),
+            _pct((hg > 0) & (ag > 0), "BTTS %"),
+        )
+        .drop_nulls(group_cols)
+        .sort(group_cols)
+        .collect()
+        .to_pandas()
+    )
+
+    cols_numeric = grouped.select_dtypes(include=[np.number]).columns
+    grouped[cols_numeric] = grouped[cols_numeric].round(2)
+    return grouped
+
+def league_summary_polars(source, countries=None, seasons=None, until=None):
+    """
+    League Stats Summary da Polars (per country/Stagione più riga Total).
+    """
+    grouped = group_stats_polars(source, ["country", "Stagione"], countries, seasons, until)
+    return add_total_row(grouped, ["country", "Stagione"])
+
+def label_summary_polars(source, countries=None, seasons=None, until=None):
+    return group_stats_polars(source, ["Label"], countries, seasons, until)
+
+# --------------------------------------------------------
+# STATISTICHE MACRO PER SQUADRA (come compute_team_macro_stats)
+# --------------------------------------------------------
+def _played(schema):
+    # Stessa logica di played_mask
+    played = pl.lit(False)
+    for col in ["minuti goal segnato home", "minuti goal segnato away"]:
+        if col in schema:
+            played = played | (_text(col).str.strip_chars() != "").fill_null(False)
+    if "Home Goal FT" in schema and "Away Goal FT" in schema:
+        played = played | (pl.col("Home Goal FT").is_not_null() & pl.col("Away Goal FT").is_not_null())
+    return played
+
+def team_macro_stats_polars(source, teams=None, countries=None, seasons=None, until=None, by_country=False):
+    """
+    Una riga per squadra e venue (Home prima di Away) con le colonne di
+    compute_team_macro_stats; by_country=True separa i campionati.
+    """
+    lf = _filtered(to_lazy(source), countries, seasons, until)
+    schema = _schema(lf)
+    lf = lf.filter(_played(schema))
+
+    keys = ["country"] if by_country else []
+    country = [_group_key("country", schema)] if by_country else []
+    hg, ag = pl.col("Home Goal FT"), pl.col("Away Goal FT")
+
+    sides = pl.concat([
+        lf.select(*country, pl.col("Home").alias("Squadra"), pl.lit("Home").alias("Venue"),
+                  hg.cast(pl.Float64).alias("gf"), ag.cast(pl.Float64).alias("ga")),
+        lf.select(*country, pl.col("Away").alias("Squadra"), pl.lit("Away").alias("Venue"),
+                  ag.cast(pl.Float64).alias("gf"), hg.cast(pl.Float64).alias("ga")),
+    ])
+    if teams:
+        sides = sides.filter(pl.col("Squadra").is_in(list(teams)))
+
+    gf, ga = pl.col("gf"), pl.col("ga")
+    raw = (
+        sides.drop_nulls("Squadra")
+        .group_by(keys + ["Squadra", "Venue"])
+        .agg(
+            pl.len().alias("n"),
+            (gf > ga).sum().alias("wins"),
+            (gf == ga).sum().alias("draws"),
+            (gf < ga).sum().alias("losses"),
+            gf.mean().alias("gf_avg"),
+            ga.mean().alias("ga_avg"),
+            ((gf > 0) & (ga > 0)).sum().alias("btts"),
+        )
+        .sort(keys + ["Squadra", "Venue"], descending=[False] * (len(keys) + 1) + [True])
+        .collect()
+    )
+
+    rows = [
+        {
+            **{key: r[key] for key in keys},
+            "Squadra": r["Squadra"],
+            "Venue": r["Venue"],
+            **macro_stats_from_counts(
+                r["n"], r["wins"], r["draws"], r["losses"], r["gf_avg"], r["ga_avg"], r["btts"]
+            ),
+        }
+        for r in raw.iter_rows(named=True)
+    ]
+    return pd.DataFrame(rows, columns=keys + [
+        "Squadra", "Venue", "Matches Played", "Win %", "Draw %", "Loss %",
+        "Avg Goals Scored", "Avg Goals Conceded", "BTTS %",
+    ])
@@ -0,0 +1,290 @@
+import numpy as np
+import pandas as pd
+from core.labels import label_series
+
+# --------------------------------------------------------
+# FUNZIONE PER OTTENERE LEAGUE DATA BY LABEL
+# --------------------------------------------------------
+def get_league_data_by_label(df, label):
+    """
+    Esiti 1X2 % delle partite del Label, senza modificare df.
+    Le partite senza risultato contano come pareggio (come match_result).
+    """
+    labels = df["Label"] if "Label" in df.columns else label_series(df)
+    sub = df[labels == label]
+
+    if sub.empty:
+        return None
+
+    h_goals = sub["Home Goal FT"]
+    a_goals = sub["Away Goal FT"]
+    home_win = h_goals > a_goals
+    away_win = h_goals < a_goals
+
+    return {
+        "Label": label,
+        "Matches": sub["Home"].count(),
+        "HomeWin_pct": home_win.mean() * 100,
+        "Draw_pct": (~home_win & ~away_win).mean() * 100,
+        "AwayWin_pct": away_win.mean() * 100,
+    }
+
+# --------------------------------------------------------
+# CALCOLO BACK / LAY STATS (versione corretta)
+# --------------------------------------------------------
+def calculate_back_lay(filtered_df):
+    """
+    Calcola:
+    - profitti back e lay
+    - ROI% back e lay
+    per HOME, DRAW, AWAY su tutte le righe di filtered_df.
+
+    Per il LAY, la responsabilità è fissa a 1 unità.
+    """
+    profits_back = {"HOME": 0, "DRAW": 0, "AWAY": 0}
+    profits_lay = {"HOME": 0, "DRAW": 0, "AWAY": 0}
+    matches = len(filtered_df)
+
+    for _, row in filtered_df.iterrows():
+        h_goals = row["Home Goal FT"]
+        a_goals = row["Away Goal FT"]
+
+        result = (
+            "HOME" if h_goals > a_goals else
+            "AWAY" if h_goals < a_goals else
+            "DRAW"
+        )
+
+        for outcome in ["HOME", "DRAW", "AWAY"]:
+            # Leggi la quota corretta
+            if outcome == "HOME":
+                price = row.get("Odd home", None)
+            elif outcome == "DRAW":
+                price = row.get("Odd Draw", None)
+            elif outcome == "AWAY":
+                price = row.get("Odd Away", None)
+
+            try:
+                price = float(price)
+            except:
+                price = 2.00
+
+            if price <= 1:
+                price = 2.00
+
+            # BACK
+            if result == outcome:
+                profits_back[outcome] += (price - 1)
+            else:
+                profits_back[outcome] -= 1
+
+            # LAY corretto → responsabilità = 1
+            stake = 1 / (price - 1)
+            if result != outcome:
+                profits_lay[outcome] += stake
+            else:
+                profits_lay[outcome] -= 1
+
+    rois_back = {}
+    rois_lay = {}
+    for outcome in ["HOME", "DRAW", "AWAY"]:
+        if matches > 0:
+            rois_back[outcome] = round((profits_back[outcome] / matches) * 100, 2)
+            rois_lay[outcome] = round((profits_lay[outcome] / matches) * 100, 2)
+        else:
+            rois_back[outcome] = 0
+            rois_lay[outcome] = 0
+
+    return profits_back, rois_back, profits_lay, rois_lay, matches
+
+# --------------------------------------------------------
+# CALCOLO BACK / LAY STATS (VETTORIALE)
+# --------------------------------------------------------
+BACK_LAY_ODD_COLS = {"HOME": "Odd home", "DRAW": "Odd Draw", "AWAY": "Odd Away"}
+
+def _to_float_or_default(value):
+    try:
+        return float(value)
+    except:
+        return 2.00
+
+def _back_lay_prices(filtered_df, col):
+    """
+    Quote lette come in calculate_back_lay: 2.00 se non convertibili
+    o <= 1; le quote NaN restano NaN.
+    """
+    if col not in filtered_df.columns:
+        return np.full(len(filtered_df), 2.00)
+
+    values = filtered_df[col]
+    if values.dtype.kind in "biuf":
+        prices = values.to_numpy(dtype=float)
+    else:
+        prices = np.array([_to_float_or_default(v) for v in values], dtype=float)
+
+    return np.where(prices <= 1, 2.00, prices)
+
+def match_outcomes(filtered_df):
+    """
+    Esito di ogni partita come in calculate_back_lay: le partite senza
+    goal FT contano come DRAW.
+    """
+    h_goals = filtered_df["Home Goal FT"].to_numpy()
+    a_goals = filtered_df["Away Goal FT"].to_numpy()
+    won_home = h_goals > a_goals
+    won_away = h_goals < a_goals
+    return {
+        "HOME": won_home,
+        "DRAW": ~(won_home | won_away),
+        "AWAY": won_away,
+    }
+
+def back_lay_profits(filtered_df):
+    """
+    Profitti back e lay (responsabilità 1) riga per riga con le regole di
+    calculate_back_lay: {esito: (vinta, back, lay)} per HOME, DRAW, AWAY.
+
+    È l'unico kernel back/lay: lo usano calculate_back_lay_vectorized, lo
+    sweep delle quote, il bootstrap e il batch pre-match.
+    """
+    results = match_outcomes(filtered_df)
+
+    rows = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for outcome, col in BACK_LAY_ODD_COLS.items():
+            prices = _back_lay_prices(filtered_df, col)
+            won = results[outcome]
+            rows[outcome] = (
+                won,
+                np.where(won, prices - 1, -1.0),
+                np.where(won, -1.0, 1 / (prices - 1)),
+            )
+    return rows
+
+def calculate_back_lay_vectorized(filtered_df):
+    """
+    Versione vettoriale di calculate_back_lay (stessi risultati).
+    Le somme cumulative sono sequenziali come il ciclo originale, quindi
+    anche gli arrotondamenti coincidono.
+    """
+    matches = len(filtered_df)
+    if matches == 0:
+        zeros = {"HOME": 0, "DRAW": 0, "AWAY": 0}
+        return dict(zeros), dict(zeros), dict(zeros), dict(zeros), matches
+
+    profits_back = {}
+    profits_lay = {}
+    rois_back = {}
+    rois_lay = {}
+    for outcome, (_, back, lay) in back_lay_profits(filtered_df).items():
+        profits_back[outcome] = float(np.cumsum(back)[-1])
+        profits_lay[outcome] = float(np.cumsum(lay)[-1])
+        rois_back[outcome] = round((profits_back[outcome] / matches) * 100, 2)
+        rois_lay[outcome] = round((profits_lay[outcome] / matches) * 100, 2)
+
+    return profits_back, rois_back, profits_lay, rois_lay, matches
+
+# --------------------------------------------------------
+# INDICE QUOTE SIMILI
+# --------------------------------------------------------
+def build_odds_index(df):
+    """
+    Indice sulle quote (home, draw, away) per la ricerca di partite simili.
+
+    Le partite con quote valide vengono ordinate per quota home una sola
+    volta; le query usano searchsorted sulla quota home e controllano le
+    altre due quote solo sulla finestra candidata, senza scansione completa.
+    """
+    odds = np.column_stack([
+        pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        if col in df.columns else np.full(len(df), np.nan)
+        for col in ["Odd home", "Odd Draw", "Odd Away"]
+    ]) if len(df) else np.empty((0, 3))
+
+    valid = np.isfinite(odds).all(axis=1) & (odds > 1).all(axis=1)
+    positions = np.flatnonzero(valid)
+    order = np.argsort(odds[valid, 0], kind="mergesort")
+
+    return {
+        "odds": odds[valid][order],
+        "positions": positions[order],
+    }
+
+def query_similar_odds(index, odd_home, odd_draw, odd_away, k=None, tol=None):
+    """
+    Restituisce le posizioni (iloc) delle partite storiche con quote simili:
+    - tol → tutte le partite con ogni quota entro ±tol
+    - k   → le k partite più vicine (distanza euclidea sulle quote)
+    """
+    odds = index["odds"]
+    positions = index["positions"]
+    target = np.array([odd_home, odd_draw, odd_away], dtype=float)
+    n = len(odds)
+
+    if n == 0:
+        return positions[:0]
+
+    home = odds[:, 0]
+
+    if tol is not None:
+        lo = np.searchsorted(home, odd_home - tol, side="left")
+        hi = np.searchsorted(home, odd_home + tol, side="right")
+        window = odds[lo:hi]
+        inside = (np.abs(window - target) <= tol).all(axis=1)
+        return positions[lo:hi][inside]
+
+    k = min(int(k), n)
+    centre = np.searchsorted(home, odd_home)
+    radius = max(abs(home[min(centre, n - 1)] - odd_home), 0.05)
+
+    # Allarga la finestra sulla quota home finché contiene k partite e
+    # copre la distanza della k-esima: da lì il risultato è esatto.
+    while True:
+        lo = np.searchsorted(home, odd_home - radius, side="left")
+        hi = np.searchsorted(home, odd_home + radius, side="right")
+
+        if hi - lo >= k:
+            dist = np.sqrt(((odds[lo:hi] - target) ** 2).sum(axis=1))
+            nearest = np.argpartition(dist, k - 1)[:k]
+            kth = dist[nearest].max()
+            if kth <= radius or (lo == 0 and hi == n):
+                nearest = nearest[np.argsort(dist[nearest], kind="mergesort")]
+                return positions[lo:hi][nearest]
+            radius = kth
+        else:
+            radius *= 2
+
+# --------------------------------------------------------
+# CAMPIONI PER LABEL (League / Casa / Ospite)
+# --------------------------------------------------------
+def get_label_samples(df, label, label_type, squadra_casa, squadra_ospite):
+    """
+    Partite delle righe League, squadra di casa (in casa) e squadra ospite
+    (in trasferta) nel Label indicato, con le regole della tabella 1X2:
+    - League solo se c'è un Label (None → nessun campione)
+    - casa solo per Label di tipo Home o Both, ospite solo per Away o Both
+    - se il Label non contiene partite della squadra, tutte le sue partite
+
+    Restituisce (campioni, squadre in fallback): i campioni non applicabili
+    non sono nel dizionario, come le righe "N/A" della tabella.
+    """
+    samples = {}
+    fallback = []
+    if not label:
+        return samples, fallback
+
+    in_label = df[df["Label"] == label]
+    samples["League"] = in_label
+
+    teams = [(squadra_casa, "Home", ["Home", "Both"]), (squadra_ospite, "Away", ["Away", "Both"])]
+    for team, venue, label_types in teams:
+        if label_type not in label_types:
+            continue
+
+        sample = in_label[in_label[venue] == team]
+        if sample.empty:
+            sample = df[df[venue] == team]
+            fallback.append(team)
+        samples[team] = sample
+
+    return samples, fallback
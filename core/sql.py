@@ -0,0 +1,267 @@
+import os
+import threading
+
+import pandas as pd
+from core.league import add_total_row
+from core.team import macro_stats_from_counts
+
+# --------------------------------------------------------
+# MOTORE SQL IN-PROCESS (DuckDB) SU SNAPSHOT PARQUET
+# --------------------------------------------------------
+# Alternativa opzionale a pandas per le tabelle aggregate: lo snapshot
+# della tabella partite (colonne di analisi, come dopo prepare_matches) è
+# un file Parquet che DuckDB legge a blocchi, in parallelo e, oltre
+# memory_limit, appoggiandosi a temp_directory. In Python arrivano solo
+# le righe aggregate, mai tutte le partite.
+#
+# Le tabelle restituite hanno le stesse colonne e gli stessi valori di
+# league_summary, label_summary e compute_team_macro_stats (verificato da
+# equivalence.py). duckdb va installato a parte (pip install duckdb).
+
+SNAPSHOT_TABLE = "partite"
+
+def write_snapshot(df, path):
+    """
+    Scrive df (partite già passate per prepare_matches) come snapshot
+    Parquet. La scrittura avviene su un file temporaneo poi rinominato:
+    chi legge lo snapshot precedente non vede mai un file a metà.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+def _sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def connect(source, threads=None, memory_limit=None, temp_directory=None):
+    """
+    Connessione DuckDB in memoria con la vista partite su source:
+    un percorso (o lista di percorsi) Parquet, oppure un DataFrame già in
+    memoria (letto senza copia). threads/memory_limit ("2GB")/
+    temp_directory limitano le risorse; oltre il limite DuckDB scrive su
+    disco invece di fallire.
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = {_sql_literal(memory_limit)}")
+    if temp_directory:
+        con.execute(f"SET temp_directory = {_sql_literal(temp_directory)}")
+
+    if isinstance(source, pd.DataFrame):
+        con.register(SNAPSHOT_TABLE, source)
+    else:
+        paths = [source] if isinstance(source, (str, os.PathLike)) else list(source)
+        files = ", ".join(_sql_literal(os.fspath(path)) for path in paths)
+        con.execute(f"CREATE VIEW {SNAPSHOT_TABLE} AS SELECT * FROM read_parquet([{files}], union_by_name = true)")
+
+    return con
+
+def _columns(con):
+    return [row[0] for row in con.execute(f"DESCRIBE {SNAPSHOT_TABLE}").fetchall()]
+
+# --------------------------------------------------------
+# FILTRI (campionato, stagione, partite future)
+# --------------------------------------------------------
+def _text(col):
+    return f'CAST("{col}" AS VARCHAR)'
+
+def _where(con, countries=None, seasons=None, until=None):
+    """
+    Clausola WHERE e parametri: campionati case-insensitive (come le
+    pagine), stagioni come testo, partite con Data <= until (o senza data).
+    """
+    clauses, params = [], []
+
+    if countries:
+        clauses.append(f"upper(trim({_text('country')})) IN ({', '.join('?' * len(countries))})")
+        params += [str(c).strip().upper() for c in countries]
+
+    if seasons:
+        clauses.append(f"{_text('Stagione')} IN ({', '.join('?' * len(seasons))})")
+        params += [str(s) for s in seasons]
+
+    if until is not None and "Data" in _columns(con):
+        clauses.append('("Data" IS NULL OR CAST("Data" AS DATE) <= CAST(? AS DATE))')
+        params.append(pd.Timestamp(until).date())
+
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+# --------------------------------------------------------
+# LABEL (stesse regole di label_series)
+# --------------------------------------------------------
+def _odd(col):
+    return f"TRY_CAST(replace({_text(col)}, ',', '.') AS DOUBLE)"
+
+def _label_expr(columns):
+    # La Label calcolata da prepare_matches è già nello snapshot
+    if "Label" in columns:
+        return '"Label"'
+
+    h, a = _odd("Odd home"), _odd("Odd Away")
+    return f"""
+        CASE
+            WHEN {h} IS NULL OR {a} IS NULL OR isnan({h}) OR isnan({a}) THEN 'Others'
+            WHEN {h} <= 3 AND {a} <= 3 THEN 'SuperCompetitive H<=3 A<=3'
+            WHEN {h} < 1.5 THEN 'H_StrongFav <1.5'
+            WHEN {h} <= 2 THEN 'H_MediumFav 1.5-2'
+            WHEN {h} <= 3 THEN 'H_SmallFav 2-3'
+            WHEN {a} < 1.5 THEN 'A_StrongFav <1.5'
+            WHEN {a} <= 2 THEN 'A_MediumFav 1.5-2'
+            WHEN {a} <= 3 THEN 'A_SmallFav 2-3'
+            ELSE 'Others'
+        END"""
+
+# --------------------------------------------------------
+# STATISTICHE AGGREGATE PER GRUPPO (come group_stats)
+# --------------------------------------------------------
+GROUP_KEY_SQL = {
+    "country": f"coalesce(nullif({_text('country')}, ''), 'Unknown')",
+    "Stagione": f"coalesce(nullif({_text('Stagione')}, ''), 'Unknown')",
+}
+
+def _key_expr(col, columns):
+    if col == "Label":
+        return _label_expr(columns)
+    return GROUP_KEY_SQL.get(col, f'"{col}"')
+
+def _pct(condition):
+    return f"avg(CASE WHEN {condition} THEN 1.0 ELSE 0.0 END) * 100"
+
+def group_stats_sql(con, group_cols, countries=None, seasons=None, until=None):
+    """
+    group_stats calcolata da DuckDB: stesse colonne, stesso ordinamento
+    per gruppo e stesso arrotondamento a 2 decimali.
+    """
+    columns = _columns(con)
+    where, params = _where(con, countries, seasons, until)
+
+    select_keys = ",\n            ".join(f'{_key_expr(col, columns)} AS "{col}"' for col in group_cols)
+    key_names = ", ".join(f'"{col}"' for col in group_cols)
+
+    query = f"""
+        WITH m AS (
+            SELECT
+                {select_keys},
+                "Home",
+                "Home Goal FT" AS hg,
+                "Away Goal FT" AS ag,
+                "Home Goal 1T" + "Away Goal 1T" AS fh,
+                "Home Goal FT" + "Away Goal FT" AS ft
+            FROM {SNAPSHOT_TABLE}{where}
+        )
+        SELECT
+            {key_names},
+            count("Home") AS "Matches",
+            {_pct("hg > ag")} AS "HomeWin %",
+            {_pct("NOT coalesce(hg > ag OR hg < ag, false)")} AS "Draw %",
+            {_pct("hg < ag")} AS "AwayWin %",
+            avg(fh) AS "AvgGoals1T",
+            avg(ft - fh) AS "AvgGoals2T",
+            avg(ft) AS "AvgGoalsTotal",
+            {_pct("fh > 0.5")} AS "Over05_FH %",
+            {_pct("fh > 1.5")} AS "Over15_FH %",
+            {_pct("fh > 2.5")} AS "Over25_FH %",
+            {_pct("ft > 0.5")} AS "Over05_FT %",
+            {_pct("ft > 1.5")} AS "Over15_FT %",
+            {_pct("ft > 2.5")} AS "Over25_FT %",
+            {_pct("ft > 3.5")} AS "Over35_FT %",
+            {_pct("ft > 4.5")} AS "Over45_FT %",
+            {_pct("hg > 0 AND ag > 0")} AS "BTTS %"
+        FROM m
+        WHERE {" AND ".join(f'"{col}" IS NOT NULL' for col in group_cols)}
+        GROUP BY {key_names}
+        ORDER BY {key_names}
+    """
+    grouped = con.execute(query, params).df()
+
+    # Arrotondamento in pandas: DuckDB arrotonda gli .5 diversamente da numpy
+    cols_numeric = grouped.select_dtypes(include="number").columns
+    grouped[cols_numeric] = grouped[cols_numeric].round(2)
+    return grouped
+
+def league_summary_sql(con, countries=None, seasons=None, until=None):
+    """
+    League Stats Summary da DuckDB (per country/Stagione più riga Total).
+    """
+    grouped = group_stats_sql(con, ["country", "Stagione"], countries, seasons, until)
+    return add_total_row(grouped, ["country", "Stagione"])
+
+def label_summary_sql(con, countries=None, seasons=None, until=None):
+    return group_stats_sql(con, ["Label"], countries, seasons, until)
+
+# --------------------------------------------------------
+# STATISTICHE MACRO PER SQUADRA (come compute_team_macro_stats)
+# --------------------------------------------------------
+def _played_sql(columns):
+    # Stessa logica di played_mask
+    conditions = [
+        f"NOT regexp_full_match(coalesce({_text(col)}, ''), '\\s*')"
+        for col in ["minuti goal segnato home", "minuti goal segnato away"]
+        if col in columns
+    ]
+    if {"Home Goal FT", "Away Goal FT"} <= set(columns):
+        conditions.append('("Home Goal FT" IS NOT NULL AND "Away Goal FT" IS NOT NULL)')
+    return " OR ".join(conditions) if conditions else "false"
+
+def team_macro_stats_sql(con, teams=None, countries=None, seasons=None, until=None, by_country=False):
+    """
+    Una riga per squadra e venue (Home prima di Away) con le colonne di
+    compute_team_macro_stats, in una sola query su tutte le squadre.
+    Le coppie senza partite giocate non compaiono. by_country=True
+    calcola le statistiche separatamente per campionato (colonna country).
+    """
+    columns = _columns(con)
+    where, params = _where(con, countries, seasons, until)
+    played = f"({_played_sql(columns)})"
+    where = f"{where} AND {played}" if where else f" WHERE {played}"
+
+    team_filter = ""
+    if teams:
+        team_filter = f" AND \"Squadra\" IN ({', '.join('?' * len(teams))})"
+        params = params + list(teams)
+
+    country = '"country", ' if by_country else ""
+    query = f"""
+        WITH p AS (
+            SELECT {GROUP_KEY_SQL["country"]} AS "country", "Home", "Away", "Home Goal FT" AS hg, "Away Goal FT" AS ag
+            FROM {SNAPSHOT_TABLE}{where}
+        ),
+        sides AS (
+            SELECT "country", "Home" AS "Squadra", 'Home' AS "Venue", hg AS gf, ag AS ga FROM p
+            UNION ALL
+            SELECT "country", "Away" AS "Squadra", 'Away' AS "Venue", ag AS gf, hg AS ga FROM p
+        )
+        SELECT
+            {country}"Squadra", "Venue",
+            count(*) AS n,
+            count_if(gf > ga) AS wins,
+            count_if(gf = ga) AS draws,
+            count_if(gf < ga) AS losses,
+            avg(gf) AS gf_avg,
+            avg(ga) AS ga_avg,
+            count_if(gf > 0 AND ga > 0) AS btts
+        FROM sides
+        WHERE "Squadra" IS NOT NULL{team_filter}
+        GROUP BY {country}"Squadra", "Venue"
+        ORDER BY {country}"Squadra", "Venue" DESC
+    """
+    raw = con.execute(query, params).df()
+
+    rows = [
+        {
+            **({"country": r.country} if by_country else {}),
+            "Squadra": r.Squadra,
+            "Venue": r.Venue,
+            **macro_stats_from_counts(r.n, r.wins, r.draws, r.losses, r.gf_avg, r.ga_avg, r.btts),
+        }
+        for r in raw.itertuples(index=False)
+    ]
+    return pd.DataFrame(rows, columns=["country"] * by_country + [
+        "Squadra", "Venue", "Matches Played", "Win %", "Draw %", "Loss %",
+        "Avg Goals Scored", "Avg Goals Conceded", "BTTS %",
+    ])
@@ -0,0 +1,601 @@
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------
+# LOGICA PER MATCH GIOCATO
+# --------------------------------------------------------
+def is_match_played(row):
+    if pd.notna(row["minuti goal segnato home"]) and row["minuti goal segnato home"].strip() != "":
+        return True
+    if pd.notna(row["minuti goal segnato away"]) and row["minuti goal segnato away"].strip() != "":
+        return True
+
+    goals_home = row.get("Home Goal FT", None)
+    goals_away = row.get("Away Goal FT", None)
+
+    if pd.notna(goals_home) and pd.notna(goals_away):
+        return True
+
+    return False
+
+# --------------------------------------------------------
+# MATCH GIOCATO (VETTORIALE)
+# --------------------------------------------------------
+def played_mask(df):
+    """
+    Versione vettoriale di is_match_played su tutte le righe di df.
+    """
+    mask = pd.Series(False, index=df.index)
+    for col in ["minuti goal segnato home", "minuti goal segnato away"]:
+        if col in df.columns:
+            mask |= df[col].notna() & (df[col].astype(str).str.strip() != "")
+
+    if "Home Goal FT" in df.columns and "Away Goal FT" in df.columns:
+        mask |= df["Home Goal FT"].notna() & df["Away Goal FT"].notna()
+
+    return mask
+
+# --------------------------------------------------------
+# TIMELINE
+# --------------------------------------------------------
+def build_timeline(row, venue):
+    try:
+        h_goals = parse_goal_times(row.get("minuti goal segnato home", ""))
+        a_goals = parse_goal_times(row.get("minuti goal segnato away", ""))
+
+        timeline = []
+
+        for m in h_goals:
+            timeline.append(("H", m))
+        for m in a_goals:
+            timeline.append(("A", m))
+
+        if timeline:
+            timeline.sort(key=lambda x: x[1])
+            return timeline
+
+        # timeline vuota → costruisco timeline fake
+        h_ft = int(row.get("Home Goal FT", 0))
+        a_ft = int(row.get("Away Goal FT", 0))
+        fake_timeline = []
+        for _ in range(h_ft):
+            fake_timeline.append(("H", 90))
+        for _ in range(a_ft):
+            fake_timeline.append(("A", 91))
+        return fake_timeline if fake_timeline else []
+
+    except:
+        return []
+
+# --------------------------------------------------------
+# PARSE GOAL TIMES
+# --------------------------------------------------------
+def parse_goal_times(val):
+    if pd.isna(val) or val == "":
+        return []
+    times = []
+    for part in str(val).strip().split(";"):
+        if part.strip().isdigit():
+            times.append(int(part.strip()))
+    return times
+
+# --------------------------------------------------------
+# TIMEFRAMES
+# --------------------------------------------------------
+def timeframes():
+    return [
+        (0, 15),
+        (16, 30),
+        (31, 45),
+        (46, 60),
+        (61, 75),
+        (76, 120)
+    ]
+
+# --------------------------------------------------------
+# COMPUTE GOAL PATTERNS
+# --------------------------------------------------------
+def compute_goal_patterns(df_team, venue, total_matches):
+    if total_matches == 0:
+        return {key: 0 for key in goal_pattern_keys()}, {}, {}
+
+    def pct(count):
+        return round((count / total_matches) * 100, 2) if total_matches > 0 else 0
+
+    def pct_sub(count, base):
+        return round((count / base) * 100, 2) if base > 0 else 0
+
+    if venue == "Home":
+        wins = sum(df_team["Home Goal FT"] > df_team["Away Goal FT"])
+        draws = sum(df_team["Home Goal FT"] == df_team["Away Goal FT"])
+        losses = sum(df_team["Home Goal FT"] < df_team["Away Goal FT"])
+
+        zero_zero_count = sum(
+            (row["Home Goal FT"] == 0) and (row["Away Goal FT"] == 0)
+            for _, row in df_team.iterrows()
+        )
+    else:
+        wins = sum(df_team["Away Goal FT"] > df_team["Home Goal FT"])
+        draws = sum(df_team["Away Goal FT"] == df_team["Home Goal FT"])
+        losses = sum(df_team["Away Goal FT"] < df_team["Home Goal FT"])
+
+        zero_zero_count = sum(
+            (row["Away Goal FT"] == 0) and (row["Home Goal FT"] == 0)
+            for _, row in df_team.iterrows()
+        )
+
+    zero_zero_pct = round((zero_zero_count / total_matches) * 100, 2) if total_matches > 0 else 0
+
+    tf_scored = {f"{a}-{b}": 0 for a, b in timeframes()}
+    tf_conceded = {f"{a}-{b}": 0 for a, b in timeframes()}
+
+    first_goal = 0
+    last_goal = 0
+    one_zero = one_one_after_one_zero = 0
+    two_zero_after_one_zero = zero_one = one_one_after_zero_one = zero_two_after_zero_one = 0
+
+    for _, row in df_team.iterrows():
+        timeline = build_timeline(row, venue)
+        if not timeline:
+            continue
+
+        # FIRST GOAL
+        first = timeline[0][0] if len(timeline) > 0 else None
+
+        if venue == "Home":
+            if first == "H":
+                first_goal += 1
+        else:
+            if first == "A":
+                first_goal += 1
+
+        # LAST GOAL
+        last = timeline[-1][0] if len(timeline) > 0 else None
+
+        if venue == "Home":
+            if last == "H":
+                last_goal += 1
+        else:
+            if last == "A":
+                last_goal += 1
+
+        # Calcolo TF goals
+        score_home = 0
+        score_away = 0
+
+        for team_char, minute in timeline:
+            if team_char == "H":
+                score_home += 1
+            else:
+                score_away += 1
+
+            for start, end in timeframes():
+                if start < minute <= end:
+                    if venue == "Home":
+                        if team_char == "H":
+                            tf_scored[f"{start}-{end}"] += 1
+                        else:
+                            tf_conceded[f"{start}-{end}"] += 1
+                    else:
+                        if team_char == "A":
+                            tf_scored[f"{start}-{end}"] += 1
+                        else:
+                            tf_conceded[f"{start}-{end}"] += 1
+
+        # -------------------------------
+        # PATTERNS ANALYSIS
+        # -------------------------------
+        if venue == "Home":
+            if first == "H":
+                one_zero += 1
+                score_home = 1
+                score_away = 0
+                for team_char, _ in timeline[1:]:
+                    if team_char == "H":
+                        score_home += 1
+                    else:
+                        score_away += 1
+
+                    if score_home == 2 and score_away == 0:
+                        two_zero_after_one_zero += 1
+                        break
+                    if score_home == 1 and score_away == 1:
+                        one_one_after_one_zero += 1
+                        break
+
+            elif first == "A":
+                zero_one += 1
+                score_home = 0
+                score_away = 1
+                for team_char, _ in timeline[1:]:
+                    if team_char == "H":
+                        score_home += 1
+                    else:
+                        score_away += 1
+
+                    if score_home == 1 and score_away == 1:
+                        one_one_after_zero_one += 1
+                        break
+                    if score_home == 0 and score_away == 2:
+                        zero_two_after_zero_one += 1
+                        break
+
+        elif venue == "Away":
+            if first == "H":
+                one_zero += 1
+                score_home = 1
+                score_away = 0
+                for team_char, _ in timeline[1:]:
+                    if team_char == "H":
+                        score_home += 1
+                    else:
+                        score_away += 1
+
+                    if score_home == 2 and score_away == 0:
+                        two_zero_after_one_zero += 1
+                        break
+                    if score_home == 1 and score_away == 1:
+                        one_one_after_one_zero += 1
+                        break
+
+            elif first == "A":
+                zero_one += 1
+                score_home = 0
+                score_away = 1
+                for team_char, _ in timeline[1:]:
+                    if team_char == "H":
+                        score_home += 1
+                    else:
+                        score_away += 1
+
+                    if score_home == 1 and score_away == 1:
+                        one_one_after_zero_one += 1
+                        break
+                    if score_home == 0 and score_away == 2:
+                        zero_two_after_zero_one += 1
+                        break
+
+    two_up = sum(
+        abs(row["Home Goal FT"] - row["Away Goal FT"]) >= 2
+        for _, row in df_team.iterrows()
+    )
+
+    # -------------------------------
+    # CALCOLO H/D/A 1st HALF
+    # -------------------------------
+    ht_home_win = sum(
+        row["Home Goal 1T"] > row["Away Goal 1T"]
+        for _, row in df_team.iterrows()
+    )
+    ht_draw = sum(
+        row["Home Goal 1T"] == row["Away Goal 1T"]
+        for _, row in df_team.iterrows()
+    )
+    ht_away_win = sum(
+        row["Home Goal 1T"] < row["Away Goal 1T"]
+        for _, row in df_team.iterrows()
+    )
+
+    # -------------------------------
+    # CALCOLO H/D/A 2nd HALF
+    # -------------------------------
+    sh_home_win = sum(
+        (row["Home Goal FT"] - row["Home Goal 1T"]) >
+        (row["Away Goal FT"] - row["Away Goal 1T"])
+        for _, row in df_team.iterrows()
+    )
+    sh_draw = sum(
+        (row["Home Goal FT"] - row["Home Goal 1T"]) ==
+        (row["Away Goal FT"] - row["Away Goal 1T"])
+        for _, row in df_team.iterrows()
+    )
+    sh_away_win = sum(
+        (row["Home Goal FT"] - row["Home Goal 1T"]) <
+        (row["Away Goal FT"] - row["Away Goal 1T"])
+        for _, row in df_team.iterrows()
+    )
+
+    tf_scored_pct = {
+        k: round((v / sum(tf_scored.values())) * 100, 2) if sum(tf_scored.values()) > 0 else 0
+        for k, v in tf_scored.items()
+    }
+    tf_conceded_pct = {
+        k: round((v / sum(tf_conceded.values())) * 100, 2) if sum(tf_conceded.values()) > 0 else 0
+        for k, v in tf_conceded.items()
+    }
+
+    patterns = {
+        "P": total_matches,
+        "Win %": pct(wins),
+        "Draw %": pct(draws),
+        "Loss %": pct(losses),
+        "First Goal %": pct(first_goal),
+        "Last Goal %": pct(last_goal),
+        "1-0 %": pct(one_zero),
+        "1-1 after 1-0 %": pct_sub(one_one_after_one_zero, one_zero),
+        "2-0 after 1-0 %": pct_sub(two_zero_after_one_zero, one_zero),
+        "0-1 %": pct(zero_one),
+        "1-1 after 0-1 %": pct_sub(one_one_after_zero_one, zero_one),
+        "0-2 after 0-1 %": pct_sub(zero_two_after_zero_one, zero_one),
+        "2+ Goals %": pct(two_up),
+        "H 1st %": pct(ht_home_win),
+        "D 1st %": pct(ht_draw),
+        "A 1st %": pct(ht_away_win),
+        "H 2nd %": pct(sh_home_win),
+        "D 2nd %": pct(sh_draw),
+        "A 2nd %": pct(sh_away_win),
+        "0-0 %": zero_zero_pct,
+    }
+
+    return patterns, tf_scored, tf_conceded
+
+# --------------------------------------------------------
+# COMPUTE GOAL PATTERNS (VETTORIALE)
+# --------------------------------------------------------
+def _goal_times_long(df, col, team_code):
+    """
+    Minuti goal di col in formato long, con le regole di parse_goal_times:
+    (posizione riga, squadra 0=H / 1=A, ordine nella stringa, minuto).
+    """
+    empty = np.array([], dtype=int)
+    if col not in df.columns:
+        return empty, empty, empty, empty
+
+    values = df[col].reset_index(drop=True)
+    values = values[values.notna() & (values != "")]
+    parts = values.astype(str).str.strip().str.split(";").explode().str.strip()
+
+    order = parts.groupby(level=0).cumcount().to_numpy()
+    keep = parts.str.isdigit().fillna(False).to_numpy(dtype=bool)
+    rows = parts.index.to_numpy()[keep]
+    minutes = parts[keep].astype(int).to_numpy() if keep.any() else empty
+
+    return rows, np.full(len(rows), team_code), order[keep], minutes
+
+def _goal_counts(df, col):
+    # row.get(col, 0) → 0 se la colonna manca
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return df[col].to_numpy(dtype=float)
+
+def compute_goal_patterns_vectorized(df_team, venue, total_matches):
+    """
+    Versione vettoriale di compute_goal_patterns (stessi risultati): la
+    timeline di ogni partita è costruita ordinando in blocco tutti i
+    minuti goal invece di ciclare riga per riga.
+    """
+    if total_matches == 0:
+        return {key: 0 for key in goal_pattern_keys()}, {}, {}
+
+    def pct(count):
+        return round((int(count) / total_matches) * 100, 2) if total_matches > 0 else 0
+
+    def pct_sub(count, base):
+        return round((int(count) / int(base)) * 100, 2) if base > 0 else 0
+
+    n = len(df_team)
+    h_ft, a_ft = df_team["Home Goal FT"], df_team["Away Goal FT"]
+    h_1t, a_1t = df_team["Home Goal 1T"], df_team["Away Goal 1T"]
+
+    if venue == "Home":
+        goals_for, goals_against = h_ft, a_ft
+    else:
+        goals_for, goals_against = a_ft, h_ft
+
+    wins = (goals_for > goals_against).sum()
+    draws = (goals_for == goals_against).sum()
+    losses = (goals_for < goals_against).sum()
+    zero_zero_count = ((h_ft == 0) & (a_ft == 0)).sum()
+
+    # -------------------------------
+    # TIMELINE: minuti reali ordinati per (riga, minuto, H prima di A, ordine)
+    # -------------------------------
+    long_h = _goal_times_long(df_team, "minuti goal segnato home", 0)
+    long_a = _goal_times_long(df_team, "minuti goal segnato away", 1)
+    rows, team, order, minute = (np.concatenate([h, a]) for h, a in zip(long_h, long_a))
+
+    sort = np.lexsort((order, team, minute, rows))
+    rows, team, minute = rows[sort], team[sort], minute[sort]
+    real_rows, first_idx, counts = np.unique(rows, return_index=True, return_counts=True)
+
+    first = np.full(n, -1)
+    second = np.full(n, -1)
+    last = np.full(n, -1)
+    first[real_rows] = team[first_idx]
+    last[real_rows] = team[first_idx + counts - 1]
+    has_second = counts >= 2
+    second[real_rows[has_second]] = team[first_idx[has_second] + 1]
+
+    # Timeline fittizia dai goal FT (H al 90', A al 91') se non ci sono minuti;
+    # int(NaN) nell'originale fa scartare la partita
+    fake = np.ones(n, dtype=bool)
+    fake[real_rows] = False
+    fake_h = _goal_counts(df_team, "Home Goal FT")
+    fake_a = _goal_counts(df_team, "Away Goal FT")
+    fake &= np.isfinite(fake_h) & np.isfinite(fake_a)
+    fake_h = np.where(fake, np.clip(np.trunc(np.nan_to_num(fake_h)), 0, None), 0).astype(int)
+    fake_a = np.where(fake, np.clip(np.trunc(np.nan_to_num(fake_a)), 0, None), 0).astype(int)
+
+    fake_rows = fake & (fake_h + fake_a > 0)
+    first[fake_rows] = np.where(fake_h[fake_rows] > 0, 0, 1)
+    last[fake_rows] = np.where(fake_a[fake_rows] > 0, 1, 0)
+    fake_second = fake_rows & (fake_h + fake_a >= 2)
+    second[fake_second] = np.where(fake_h[fake_second] >= 2, 0, 1)
+
+    # -------------------------------
+    # GOAL PER TIME FRAME
+    # -------------------------------
+    scored_code = 0 if venue == "Home" else 1
+    tf_scored = {}
+    tf_conceded = {}
+    for start, end in timeframes():
+        in_band = (minute > start) & (minute <= end)
+        fake_h_band = fake_h.sum() if start < 90 <= end else 0
+        fake_a_band = fake_a.sum() if start < 91 <= end else 0
+        h_band = int((in_band & (team == 0)).sum() + fake_h_band)
+        a_band = int((in_band & (team == 1)).sum() + fake_a_band)
+        tf_scored[f"{start}-{end}"] = h_band if scored_code == 0 else a_band
+        tf_conceded[f"{start}-{end}"] = a_band if scored_code == 0 else h_band
+
+    # -------------------------------
+    # PATTERNS ANALYSIS (conta solo il secondo goal dopo il primo)
+    # -------------------------------
+    scoring = 0 if venue == "Home" else 1
+    first_goal = (first == scoring).sum()
+    last_goal = (last == scoring).sum()
+
+    if venue in ["Home", "Away"]:
+        one_zero = (first == 0).sum()
+        two_zero_after_one_zero = ((first == 0) & (second == 0)).sum()
+        one_one_after_one_zero = ((first == 0) & (second == 1)).sum()
+        zero_one = (first == 1).sum()
+        one_one_after_zero_one = ((first == 1) & (second == 0)).sum()
+        zero_two_after_zero_one = ((first == 1) & (second == 1)).sum()
+    else:
+        one_zero = one_one_after_one_zero = two_zero_after_one_zero = 0
+        zero_one = one_one_after_zero_one = zero_two_after_zero_one = 0
+
+    two_up = ((h_ft - a_ft).abs() >= 2).sum()
+
+    ht_home_win = (h_1t > a_1t).sum()
+    ht_draw = (h_1t == a_1t).sum()
+    ht_away_win = (h_1t < a_1t).sum()
+
+    h_2t, a_2t = h_ft - h_1t, a_ft - a_1t
+    sh_home_win = (h_2t > a_2t).sum()
+    sh_draw = (h_2t == a_2t).sum()
+    sh_away_win = (h_2t < a_2t).sum()
+
+    patterns = {
+        "P": total_matches,
+        "Win %": pct(wins),
+        "Draw %": pct(draws),
+        "Loss %": pct(losses),
+        "First Goal %": pct(first_goal),
+        "Last Goal %": pct(last_goal),
+        "1-0 %": pct(one_zero),
+        "1-1 after 1-0 %": pct_sub(one_one_after_one_zero, one_zero),
+        "2-0 after 1-0 %": pct_sub(two_zero_after_one_zero, one_zero),
+        "0-1 %": pct(zero_one),
+        "1-1 after 0-1 %": pct_sub(one_one_after_zero_one, zero_one),
+        "0-2 after 0-1 %": pct_sub(zero_two_after_zero_one, zero_one),
+        "2+ Goals %": pct(two_up),
+        "H 1st %": pct(ht_home_win),
+        "D 1st %": pct(ht_draw),
+        "A 1st %": pct(ht_away_win),
+        "H 2nd %": pct(sh_home_win),
+        "D 2nd %": pct(sh_draw),
+        "A 2nd %": pct(sh_away_win),
+        "0-0 %": pct(zero_zero_count),
+    }
+
+    return patterns, tf_scored, tf_conceded
+
+# --------------------------------------------------------
+# COMPUTE GOAL PATTERNS TOTAL
+# --------------------------------------------------------
+def compute_goal_patterns_total(patterns_home, patterns_away, total_home_matches, total_away_matches):
+    total_matches = total_home_matches + total_away_matches
+    total_patterns = {}
+
+    for key in goal_pattern_keys():
+        if key == "P":
+            total_patterns["P"] = total_matches
+        elif key in ["Win %", "Draw %", "Loss %"]:
+            # Media delle due squadre per Win, Draw, Loss
+            if key == "Win %":
+                val = (patterns_home["Win %"] + patterns_away["Loss %"]) / 2
+            elif key == "Draw %":
+                val = (patterns_home["Draw %"] + patterns_away["Draw %"]) / 2
+            elif key == "Loss %":
+                val = (patterns_home["Loss %"] + patterns_away["Win %"]) / 2
+            total_patterns[key] = round(val, 2)
+        elif key in ["First Goal %", "Last Goal %"]:
+            # non calcoliamo questi valori nel totale
+            continue
+        else:
+            home_val = patterns_home.get(key, 0)
+            away_val = patterns_away.get(key, 0)
+            val = (
+                (home_val * total_home_matches) + (away_val * total_away_matches)
+            ) / total_matches if total_matches > 0 else 0
+            total_patterns[key] = round(val, 2)
+
+    return total_patterns
+
+# --------------------------------------------------------
+# GOAL PATTERN KEYS
+# --------------------------------------------------------
+def goal_pattern_keys():
+    keys = [
+        "P", "Win %", "Draw %", "Loss %", "First Goal %", "Last Goal %",
+        "1-0 %", "1-1 after 1-0 %", "2-0 after 1-0 %",
+        "0-1 %", "1-1 after 0-1 %", "0-2 after 0-1 %",
+        "2+ Goals %", "H 1st %", "D 1st %", "A 1st %",
+        "H 2nd %", "D 2nd %", "A 2nd %", "0-0 %"
+    ]
+    for start, end in timeframes():
+        keys.append(f"{start}-{end} Goals %")
+    return keys
+
+def goal_pattern_keys_without_tf():
+    keys = [
+        "P", "Win %", "Draw %", "Loss %", "0-0 %",
+        "1-0 %", "1-1 after 1-0 %", "2-0 after 1-0 %",
+        "0-1 %", "1-1 after 0-1 %", "0-2 after 0-1 %",
+        "2+ Goals %", "H 1st %", "D 1st %", "A 1st %",
+        "H 2nd %", "D 2nd %", "A 2nd %"
+    ]
+    return keys
+
+# --------------------------------------------------------
+# COMPUTE TEAM MACRO STATS
+# --------------------------------------------------------
+def compute_team_macro_stats(df, team, venue):
+    if venue == "Home":
+        data = df[df["Home"] == team]
+        goals_for_col = "Home Goal FT"
+        goals_against_col = "Away Goal FT"
+    else:
+        data = df[df["Away"] == team]
+        goals_for_col = "Away Goal FT"
+        goals_against_col = "Home Goal FT"
+
+    data = data[played_mask(data)]
+
+    total_matches = len(data)
+    if total_matches == 0:
+        return {}
+
+    goals_for = data[goals_for_col]
+    goals_against = data[goals_against_col]
+
+    wins = int((goals_for > goals_against).sum())
+    draws = int((goals_for == goals_against).sum())
+    losses = int((goals_for < goals_against).sum())
+
+    btts_count = int(((data["Home Goal FT"] > 0) & (data["Away Goal FT"] > 0)).sum())
+
+    return macro_stats_from_counts(
+        total_matches, wins, draws, losses,
+        goals_for.mean(), goals_against.mean(), btts_count
+    )
+
+def macro_stats_from_counts(total_matches, wins, draws, losses, goals_for_avg, goals_against_avg, btts_count):
+    """
+    Dizionario di compute_team_macro_stats dai conteggi (anche calcolati
+    da SQL o Polars): percentuali con gli stessi tipi e arrotondamenti.
+    """
+    total_matches, wins, draws, losses = int(total_matches), int(wins), int(draws), int(losses)
+    btts = (int(btts_count) / total_matches) * 100
+
+    stats = {
+        "Matches Played": total_matches,
+        "Win %": round((wins / total_matches) * 100, 2),
+        "Draw %": round((draws / total_matches) * 100, 2),
+        "Loss %": round((losses / total_matches) * 100, 2),
+        "Avg Goals Scored": round(np.float64(np.nan if goals_for_avg is None else goals_for_avg), 2),
+        "Avg Goals Conceded": round(np.float64(np.nan if goals_against_avg is None else goals_against_avg), 2),
+        "BTTS %": round(btts, 2)
+    }
+    return stats
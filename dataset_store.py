@@ -0,0 +1,190 @@
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+# --------------------------------------------------------
+# STORE CONDIVISO DEI DATASET (un solo store per processo)
+# --------------------------------------------------------
+# Ogni dataset è scritto una volta come file Arrow/Feather non compresso e
+# riletto in memory-map: le colonne numeriche del DataFrame sono viste
+# read-only sul file, quindi tutte le sessioni (e gli altri processi sulla
+# stessa cartella) condividono le stesse pagine di memoria.
+
+DATASET_STORE_MAX_MB = 2048
+DATASET_STORE_DIR = os.environ.get(
+    "DATASET_STORE_DIR",
+    os.path.join(tempfile.gettempdir(), "trading_dashboard_store")
+)
+
+def new_store(max_mb=DATASET_STORE_MAX_MB, directory=DATASET_STORE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    return {
+        "dir": directory,
+        "max_bytes": max_mb * 1024 * 1024,
+        "entries": OrderedDict(),   # hash → {"frame", "path", "nbytes", "refs"}
+        "keys": {},                 # chiave origine/filtri → hash
+        "lock": threading.RLock(),
+    }
+
+# --------------------------------------------------------
+# SCRITTURA / LETTURA ARROW
+# --------------------------------------------------------
+def _write_arrow(df, path):
+    """
+    Scrive df come Feather non compresso e lo rilegge in memory-map.
+    Restituisce (DataFrame, byte) oppure None se i tipi non sono
+    convertibili in Arrow (es. colonne object miste).
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    try:
+        if not os.path.exists(path):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    except (pa.ArrowException, ValueError, TypeError):
+        return None
+
+    return table.to_pandas(split_blocks=True), table.nbytes
+
+def _content_hash(df):
+    """
+    Impronta esatta del DataFrame come viene salvato: nomi e tipi delle
+    colonne e hash di ogni riga nella sua posizione. A differenza di
+    dataset_version (somma degli hash di riga) cambia anche con colonne
+    rinominate o righe in un altro ordine.
+    """
+    digest = hashlib.sha1()
+    for name, dtype in df.dtypes.items():
+        digest.update(f"{name!r}:{dtype};".encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return f"{len(df)}-{digest.hexdigest()}"
+
+def _put(store, df):
+    """
+    Inserisce df nello store (se non già presente con lo stesso contenuto),
+    incrementa il riferimento e restituisce l'hash del contenuto.
+    """
+    content_hash = _content_hash(df)
+
+    with store["lock"]:
+        if content_hash in store["entries"]:
+            store["entries"][content_hash]["refs"] += 1
+            return content_hash
+
+    path = os.path.join(store["dir"], f"{content_hash}.arrow")
+    stored = _write_arrow(df, path)
+    if stored is None:
+        # Fallback in memoria: condiviso e deduplicato, ma non mappato
+        frame, nbytes, path = df, int(df.memory_usage(index=True, deep=True).sum()), None
+    else:
+        frame, nbytes = stored
+
+    with store["lock"]:
+        if content_hash in store["entries"]:
+            store["entries"][content_hash]["refs"] += 1
+        else:
+            store["entries"][content_hash] = {"frame": frame, "path": path, "nbytes": nbytes, "refs": 1}
+            _evict(store)
+
+    return content_hash
+
+def _evict(store):
+    """
+    LRU sotto il budget: vengono rimossi solo i dataset senza sessioni
+    che li usano (refs == 0).
+    """
+    entries = store["entries"]
+    total = sum(entry["nbytes"] for entry in entries.values())
+
+    for content_hash, entry in list(entries.items()):
+        if total <= store["max_bytes"]:
+            break
+        if entry["refs"] > 0:
+            continue
+
+        del entries[content_hash]
+        total -= entry["nbytes"]
+        if entry["path"] is not None:
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
+
+    store["keys"] = {key: h for key, h in store["keys"].items() if h in entries}
+
+def release(store, content_hash):
+    with store["lock"]:
+        entry = store["entries"].get(content_hash)
+        if entry is not None and entry["refs"] > 0:
+            entry["refs"] -= 1
+
+# --------------------------------------------------------
+# API
+# --------------------------------------------------------
+def acquire(store, key, build):
+    """
+    DataFrame condiviso per key: costruito con build() solo se nessuna
+    sessione lo ha già caricato (o se un contenuto identico non è già nello
+    store). Ogni chiamata restituisce una copia shallow che condivide i
+    dati: quando la sessione la rilascia (garbage collection) il
+    riferimento viene decrementato e il dataset diventa evictable.
+
+    Il DataFrame è in sola lettura: le pagine non devono modificarlo
+    in-place (le colonne mappate sono read-only).
+    """
+    with store["lock"]:
+        content_hash = store["keys"].get(key)
+        entry = store["entries"].get(content_hash)
+        if entry is not None:
+            entry["refs"] += 1
+
+    if entry is None:
+        content_hash = _put(store, build())
+
+    with store["lock"]:
+        store["keys"][key] = content_hash
+        store["entries"].move_to_end(content_hash)
+        view = store["entries"][content_hash]["frame"].copy(deep=False)
+
+    weakref.finalize(view, release, store, content_hash)
+    return view
+
+def contains(store, key):
+    """
+    True se key è già nello store (acquire non chiamerebbe build).
+    """
+    with store["lock"]:
+        return store["keys"].get(key) in store["entries"]
+
+def invalidate(store, key_prefix):
+    """
+    Dimentica le chiavi che iniziano con key_prefix (es. ("supabase",)):
+    la prossima acquire ricostruisce il dataset. I contenuti non più usati
+    vengono poi rimossi dall'LRU.
+    """
+    with store["lock"]:
+        store["keys"] = {
+            key: h for key, h in store["keys"].items()
+            if key[:len(key_prefix)] != tuple(key_prefix)
+        }
+
+def store_info(store):
+    with store["lock"]:
+        entries = list(store["entries"].values())
+    return {
+        "datasets": len(entries),
+        "mb": sum(entry["nbytes"] for entry in entries) / (1024 * 1024),
+        "max_mb": store["max_bytes"] / (1024 * 1024),
+        "refs": sum(entry["refs"] for entry in entries),
+        "mapped": sum(entry["path"] is not None for entry in entries),
+    }
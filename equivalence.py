@@ -0,0 +1,424 @@
+"""
+Confronto differenziale tra le implementazioni di riferimento (riga per
+riga) e quelle ottimizzate, senza Streamlit.
+
+Esempi:
+    python equivalence.py
+    python equivalence.py --rows 50000 --only compute_goal_patterns
+    python equivalence.py --no-workbooks --tol 0 --json equivalence.json
+
+Ogni kernel viene eseguito su serie a 20-25.xlsx, korea 1.xlsx e su dati
+sintetici (benchmarks.generate_matches, anche in versione "sporca" con
+stringhe minuti irregolari, quote testuali e goal mancanti). Le uscite
+vengono confrontate cella per cella entro --tol; per ogni kernel si
+riportano i tempi e lo speedup. Esce con 1 se una cella differisce.
+
+Se duckdb / polars sono installati vengono confrontate anche le tabelle
+calcolate da core.sql e core.polars_backend con quelle pandas
+(league_summary, label_summary, compute_team_macro_stats) e, per Polars,
+l'ingest completo (normalize_raw + prepare_matches) sui dati grezzi.
+"""
+import argparse
+import importlib.util
+import json
+import math
+import numbers
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from benchmarks import prepared_matches
+from core.dataset import COL_MAP, read_matches_file, normalize_raw, prepare_matches, add_derived_columns
+from core.labels import label_match, label_series, extract_minutes, extract_minutes_array
+from core.league import (
+    calculate_goal_timeframes,
+    calculate_goal_timeframes_vectorized,
+    prepare_league_frame,
+    league_summary,
+    label_summary,
+)
+from core.pre_match import calculate_back_lay, calculate_back_lay_vectorized
+from core.bootstrap import OUTCOMES, profit_matrices
+from core.batch import history_frame
+from core.team import played_mask, compute_goal_patterns, compute_goal_patterns_vectorized, compute_team_macro_stats
+
+WORKBOOKS = ["serie a 20-25.xlsx", "korea 1.xlsx"]
+
+DERIVED_COLS = ["goals_total", "goals_1st_half", "goals_2nd_half", "btts", "match_result"]
+
+# --------------------------------------------------------
+# DATASET
+# --------------------------------------------------------
+def noisy_matches(df, seed=0, share=0.05):
+    """
+    Copia di df con una parte delle righe sporcate come i dati reali:
+    minuti con spazi, virgole, decimali e testo, quote come stringhe
+    (anche non numeriche) e goal FT mancanti.
+    """
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    n = len(df)
+
+    for col in ["minuti goal segnato home", "minuti goal segnato away"]:
+        values = df[col].astype(object).to_numpy(copy=True)
+        noisy = rng.random(n) < share
+        variants = np.array([" 12; 45 ;", "3,40;", "12.5;", "x;7;", ";", "", " ", "90+2;"], dtype=object)
+        values[noisy] = variants[rng.integers(0, len(variants), noisy.sum())]
+        df[col] = values
+
+    for col in ["Odd home", "Odd Draw", "Odd Away"]:
+        values = df[col].astype(object).to_numpy(copy=True)
+        noisy = rng.random(n) < share
+        variants = np.array(["2.5", "abc", None, "1", "0.9", np.nan], dtype=object)
+        values[noisy] = variants[rng.integers(0, len(variants), noisy.sum())]
+        df[col] = values
+
+    missing = rng.random(n) < share / 5
+    df.loc[missing, ["Home Goal FT", "Away Goal FT"]] = np.nan
+
+    # Colonne derivate ricalcolate sui goal mancanti, come farebbe prepare_matches
+    return add_derived_columns(df.drop(columns=DERIVED_COLS, errors="ignore"))
+
+def load_datasets(workbooks=True, rows=20_000, seed=0):
+    datasets = {}
+    if workbooks:
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in WORKBOOKS:
+            path = os.path.join(base, name)
+            if os.path.exists(path):
+                datasets[name] = prepare_matches(read_matches_file(path))
+
+    if rows:
+        synthetic = prepared_matches(rows, seed=seed)
+        datasets[f"sintetico {rows}"] = synthetic
+        datasets[f"sintetico {rows} sporco"] = noisy_matches(synthetic, seed=seed)
+
+    return datasets
+
+# --------------------------------------------------------
+# CASI PER KERNEL (come li chiamano le pagine)
+# --------------------------------------------------------
+def _teams(df):
+    return sorted(set(df["Home"].dropna()) | set(df["Away"].dropna()))
+
+def label_cases(df):
+    return [("tutte le righe", (df,))]
+
+def minutes_cases(df):
+    return [
+        (col, (df[col],))
+        for col in ["minuti goal segnato home", "minuti goal segnato away"]
+        if col in df.columns
+    ]
+
+def goal_timeframe_cases(df):
+    # Pagina Macro Stats: una chiamata per Label; team_stats: label vuoto
+    cases = [(f"Label {label}", (df[df["Label"] == label], label)) for label in df["Label"].dropna().unique()]
+    cases.append(("tutte (label vuoto)", (df, "")))
+
+    # Fallback sui goal FT (nessuna colonna minuti) con partite senza risultato
+    fallback = df.drop(columns=[col for col in df.columns if "goal segnato" in col]).head(500).copy()
+    fallback.loc[fallback.index[::9], ["Home Goal FT", "Away Goal FT"]] = np.nan
+    cases.append(("fallback goal FT mancanti", (fallback, "")))
+    return cases
+
+def goal_timeframes_skip_missing(sub_df, label):
+    # Differenza voluta: nel fallback sui goal FT la versione vettoriale
+    # salta le partite senza risultato, l'originale va in errore su int(NaN).
+    # Goal FT mancanti = 0 goal danno lo stesso conteggio.
+    return calculate_goal_timeframes(sub_df.fillna({"Home Goal FT": 0, "Away Goal FT": 0}), label)
+
+def goal_pattern_cases(df):
+    # Pagina Squadre: partite giocate della squadra in casa / in trasferta
+    played = df[played_mask(df)]
+    cases = []
+    for team in _teams(df):
+        for venue in ["Home", "Away"]:
+            df_team = played[played[venue] == team]
+            cases.append((f"{team} {venue}", (df_team, venue, len(df_team))))
+    cases.append(("tutte Home", (played, "Home", len(played))))
+    return cases
+
+def back_lay_cases(df):
+    # Pagina Pre Match: League per Label, squadra casa / ospite
+    cases = [("tutte le righe", (df,))]
+    for label in df["Label"].dropna().unique():
+        cases.append((f"Label {label}", (df[df["Label"] == label],)))
+    for team in _teams(df):
+        cases.append((f"{team} Home", (df[df["Home"] == team],)))
+        cases.append((f"{team} Away", (df[df["Away"] == team],)))
+
+    # Quote NaN e goal FT mancanti (DRAW) anche sui dataset puliti
+    missing = df.head(500).copy()
+    missing.loc[missing.index[::7], ["Odd home", "Odd Draw", "Odd Away"]] = np.nan
+    missing.loc[missing.index[::11], ["Home Goal FT", "Away Goal FT"]] = np.nan
+    cases.append(("quote NaN e goal mancanti", (missing,)))
+    return cases
+
+def _back_lay_totals(back, lay):
+    # Profitti per riga (n × HOME, DRAW, AWAY) → uscita di calculate_back_lay
+    matches = len(back)
+    if matches == 0:
+        zeros = {outcome: 0 for outcome in OUTCOMES}
+        return dict(zeros), dict(zeros), dict(zeros), dict(zeros), matches
+
+    back_sum = np.cumsum(back, axis=0)[-1]
+    lay_sum = np.cumsum(lay, axis=0)[-1]
+    profits_back = {o: float(back_sum[j]) for j, o in enumerate(OUTCOMES)}
+    profits_lay = {o: float(lay_sum[j]) for j, o in enumerate(OUTCOMES)}
+    rois_back = {o: round(profits_back[o] / matches * 100, 2) for o in OUTCOMES}
+    rois_lay = {o: round(profits_lay[o] / matches * 100, 2) for o in OUTCOMES}
+    return profits_back, rois_back, profits_lay, rois_lay, matches
+
+def bootstrap_back_lay(df):
+    # Profitti ricampionati dal bootstrap (core.bootstrap.profit_matrices)
+    return _back_lay_totals(*profit_matrices(df))
+
+def batch_back_lay(df):
+    # Profitti sommati dal batch pre-match (core.batch.history_frame)
+    hist = history_frame(df)
+    return _back_lay_totals(
+        hist[[f"back_{o}" for o in OUTCOMES]].to_numpy(dtype=float),
+        hist[[f"lay_{o}" for o in OUTCOMES]].to_numpy(dtype=float),
+    )
+
+def table_cases(df):
+    # Le tabelle usano la Label già calcolata: senza le quote (testuali nel
+    # dataset sporco) prepare_league_frame non deve riconvertirle
+    return [("tutte le righe", (df.drop(columns=["Odd home", "Odd Draw", "Odd Away"], errors="ignore"),))]
+
+def raw_cases(df):
+    # Dati come arrivano da Supabase: nomi originali, data testuale,
+    # senza colonne derivate né Label
+    raw_names = {name: raw for raw, name in COL_MAP.items()}
+    raw = df.drop(columns=DERIVED_COLS + ["Label"], errors="ignore").rename(columns=raw_names)
+    if "datameci" in raw.columns:
+        raw["datameci"] = raw["datameci"].dt.strftime("%Y-%m-%d")
+    return [("dati grezzi", (raw,))]
+
+def team_macro_table(df):
+    # Come il report team della CLI: squadre in ordine, Home poi Away
+    rows = []
+    for team in _teams(df):
+        for venue in ["Home", "Away"]:
+            stats = compute_team_macro_stats(df, team, venue)
+            if stats:
+                rows.append({"Squadra": team, "Venue": venue, **stats})
+    return pd.DataFrame(rows)
+
+def _sql_kernels():
+    from core.sql import connect, league_summary_sql, label_summary_sql, team_macro_stats_sql
+
+    return {
+        "league_summary_sql": (
+            lambda df: league_summary(prepare_league_frame(df)),
+            lambda df: league_summary_sql(connect(df)),
+            table_cases,
+        ),
+        "label_summary_sql": (
+            lambda df: label_summary(prepare_league_frame(df)),
+            lambda df: label_summary_sql(connect(df)),
+            table_cases,
+        ),
+        "team_macro_stats_sql": (
+            team_macro_table,
+            lambda df: team_macro_stats_sql(connect(df)),
+            table_cases,
+        ),
+    }
+
+def _polars_kernels():
+    from core.polars_backend import (
+        normalize_raw_polars,
+        prepare_matches_polars,
+        league_summary_polars,
+        label_summary_polars,
+        team_macro_stats_polars,
+    )
+
+    return {
+        "ingest_polars": (
+            lambda raw: prepare_matches(normalize_raw(raw)),
+            lambda raw: prepare_matches_polars(normalize_raw_polars(raw)),
+            raw_cases,
+        ),
+        "league_summary_polars": (
+            lambda df: league_summary(prepare_league_frame(df)), league_summary_polars, table_cases,
+        ),
+        "label_summary_polars": (
+            lambda df: label_summary(prepare_league_frame(df)), label_summary_polars, table_cases,
+        ),
+        "team_macro_stats_polars": (team_macro_table, team_macro_stats_polars, table_cases),
+    }
+
+# nome → (riferimento, ottimizzata, casi)
+KERNELS = {
+    "label_match": (lambda df: df.apply(label_match, axis=1), label_series, label_cases),
+    "extract_minutes": (extract_minutes, extract_minutes_array, minutes_cases),
+    "calculate_goal_timeframes": (goal_timeframes_skip_missing, calculate_goal_timeframes_vectorized, goal_timeframe_cases),
+    "compute_goal_patterns": (compute_goal_patterns, compute_goal_patterns_vectorized, goal_pattern_cases),
+    "calculate_back_lay": (calculate_back_lay, calculate_back_lay_vectorized, back_lay_cases),
+    "bootstrap_profit_matrices": (calculate_back_lay, bootstrap_back_lay, back_lay_cases),
+    "batch_history_frame": (calculate_back_lay, batch_back_lay, back_lay_cases),
+}
+
+if importlib.util.find_spec("duckdb") is not None:
+    KERNELS.update(_sql_kernels())
+
+if importlib.util.find_spec("polars") is not None:
+    KERNELS.update(_polars_kernels())
+
+# --------------------------------------------------------
+# CONFRONTO CELLA PER CELLA
+# --------------------------------------------------------
+def flatten(value, prefix=""):
+    """
+    Uscita di un kernel → {percorso: valore scalare}.
+    """
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, pd.DataFrame):
+        items = value.to_dict("list").items()
+    elif isinstance(value, (list, tuple)):
+        items = enumerate(value)
+    elif isinstance(value, pd.Series):
+        items = enumerate(value.tolist())
+    elif isinstance(value, np.ndarray):
+        items = enumerate(value.tolist())
+    else:
+        return {prefix: value}
+
+    cells = {}
+    for key, item in items:
+        cells.update(flatten(item, f"{prefix}[{key}]"))
+    return cells
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+def _is_missing(value):
+    return value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and math.isnan(value))
+
+def cells_equal(a, b, tol):
+    # None, NaN e NaT sono lo stesso valore mancante (pandas / Polars / SQL)
+    if _is_missing(a) or _is_missing(b):
+        return _is_missing(a) and _is_missing(b)
+    if _is_number(a) and _is_number(b):
+        a, b = float(a), float(b)
+        if math.isnan(a) or math.isnan(b):
+            return math.isnan(a) and math.isnan(b)
+        return abs(a - b) <= tol * max(1.0, abs(a), abs(b))
+    return a == b
+
+def diff_outputs(reference, optimized, tol):
+    """
+    Celle confrontate e lista delle differenze (percorso, riferimento, ottimizzata).
+    """
+    ref_cells = flatten(reference)
+    opt_cells = flatten(optimized)
+    mismatches = []
+    for path in ref_cells.keys() | opt_cells.keys():
+        if path not in ref_cells or path not in opt_cells:
+            mismatches.append((path, ref_cells.get(path, "<assente>"), opt_cells.get(path, "<assente>")))
+        elif not cells_equal(ref_cells[path], opt_cells[path], tol):
+            mismatches.append((path, ref_cells[path], opt_cells[path]))
+    return len(ref_cells), sorted(mismatches, key=lambda m: m[0])
+
+def _call(fn, args):
+    """
+    (uscita, secondi); un'eccezione fa parte dell'uscita da confrontare.
+    """
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+    except Exception as e:
+        result = f"<{type(e).__name__}>"
+    return result, time.perf_counter() - start
+
+# --------------------------------------------------------
+# ESECUZIONE
+# --------------------------------------------------------
+def run_kernel(name, df, tol):
+    reference, optimized, cases = KERNELS[name]
+    report = {"cases": 0, "cells": 0, "mismatches": [], "reference_s": 0.0, "optimized_s": 0.0}
+
+    for case, args in cases(df):
+        ref_out, ref_s = _call(reference, args)
+        opt_out, opt_s = _call(optimized, args)
+        cells, mismatches = diff_outputs(ref_out, opt_out, tol)
+
+        report["cases"] += 1
+        report["cells"] += cells
+        report["reference_s"] += ref_s
+        report["optimized_s"] += opt_s
+        report["mismatches"].extend((case, *m) for m in mismatches)
+
+    return report
+
+def run_equivalence(datasets, names=None, tol=1e-9, show=5):
+    results = []
+    failed = 0
+    for dataset_name, df in datasets.items():
+        print(f"\n=== {dataset_name} ({len(df)} righe) ===")
+        for name in KERNELS:
+            if names and name not in names:
+                continue
+
+            report = run_kernel(name, df, tol)
+            speedup = report["reference_s"] / report["optimized_s"] if report["optimized_s"] > 0 else None
+            n_diff = len(report["mismatches"])
+            failed += n_diff > 0
+
+            print(
+                f"{name:<28} {report['cases']:>5} casi {report['cells']:>8} celle  "
+                f"{n_diff:>5} differenze  {report['reference_s'] * 1000:10.1f} → "
+                f"{report['optimized_s'] * 1000:8.1f} ms  speedup {speedup or 0:8.1f}x"
+            )
+            for case, path, ref_value, opt_value in report["mismatches"][:show]:
+                print(f"    {case} {path}: riferimento {ref_value!r} ≠ ottimizzata {opt_value!r}")
+
+            results.append({
+                "kernel": name,
+                "dataset": dataset_name,
+                "rows": len(df),
+                "cases": report["cases"],
+                "cells": report["cells"],
+                "mismatches": n_diff,
+                "reference_s": round(report["reference_s"], 4),
+                "optimized_s": round(report["optimized_s"], 4),
+                "speedup": round(speedup, 2) if speedup else None,
+            })
+
+    return results, failed
+
+# --------------------------------------------------------
+# ENTRY POINT
+# --------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Equivalenza kernel di riferimento / ottimizzati.")
+    parser.add_argument("--rows", type=int, default=20_000, help="Righe sintetiche (0 = solo workbook)")
+    parser.add_argument("--no-workbooks", action="store_true", help="Salta i file Excel inclusi nel repository")
+    parser.add_argument("--only", nargs="*", choices=list(KERNELS), help="Kernel da confrontare (default: tutti)")
+    parser.add_argument("--tol", type=float, default=1e-9, help="Tolleranza relativa per le celle numeriche")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=5, help="Differenze mostrate per kernel")
+    parser.add_argument("--json", help="Salva il report in JSON")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    datasets = load_datasets(not args.no_workbooks, args.rows, args.seed)
+    results, failed = run_equivalence(datasets, args.only, args.tol, args.show)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"tol": args.tol, "results": results}, f, indent=2)
+        print(args.json)
+
+    print("\nOK: stessi risultati" if not failed else f"\nDIFFERENZE in {failed} confronti")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+# --------------------------------------------------------
+# MIRROR LOCALE DELLA TABELLA PARTITE (SQLite)
+# --------------------------------------------------------
+# Copia della tabella partite in un file SQLite (solo libreria standard),
+# aggiornata da Supabase o dagli upload: l'app e la CLI possono lavorare
+# senza rete e leggere un solo campionato con una query indicizzata
+# invece di scaricare tutta la tabella.
+#
+# Le righe sono salvate come dopo normalize_raw (nomi colonna grezzi
+# minuscoli, numeri già convertiti, date in testo ISO), oppure come sono
+# per i file già con i nomi di analisi: chi legge passa dalla stessa
+# normalize / prepare delle altre origini dati.
+
+MIRROR_PATH = os.environ.get(
+    "LOCAL_MIRROR_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "partite_mirror.sqlite")
+)
+MIRROR_TABLE = "partite"
+INFO_TABLE = "mirror_info"
+
+# Indici: campionato + stagione insieme (le letture filtrano sempre per
+# campionato), squadre e data. Per ogni indice le colonne grezze di
+# Supabase (vedi COL_MAP) o, per i file già esportati, i nomi di analisi:
+# viene usata la prima alternativa presente (SQLite ignora le maiuscole
+# nei nomi colonna).
+MIRROR_INDEXES = {
+    "idx_partite_country_stagione": [["country", "sezonul"], ["country", "stagione"]],
+    "idx_partite_home": [["txtechipa1"], ["home"]],
+    "idx_partite_away": [["txtechipa2"], ["away"]],
+    "idx_partite_data": [["datameci"], ["data"]],
+}
+SEASON_COLUMNS = ["sezonul", "stagione"]
+DATE_COLUMNS = ["datameci", "data"]
+
+def connect_mirror(path=MIRROR_PATH):
+    return sqlite3.connect(path, timeout=30)
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _columns(con, table=MIRROR_TABLE):
+    return [row[1] for row in con.execute(f"PRAGMA table_info({_quote(table)})")]
+
+def _lower_columns(con):
+    return {col.lower() for col in _columns(con)}
+
+def _rows(df):
+    """
+    Tuple pronte per sqlite3: tipi Python, None per i mancanti e date
+    come testo ISO (ordinabile, quindi utilizzabile dall'indice).
+    """
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%Y-%m-%d")
+    df = df.astype(object).where(df.notna(), None)
+    return df.itertuples(index=False, name=None)
+
+def _insert(con, df, table=MIRROR_TABLE):
+    cols = ", ".join(_quote(col) for col in df.columns)
+    marks = ", ".join("?" * len(df.columns))
+    con.executemany(f"INSERT INTO {_quote(table)} ({cols}) VALUES ({marks})", _rows(df))
+
+def _create_indexes(con):
+    columns = _lower_columns(con)
+    for name, alternatives in MIRROR_INDEXES.items():
+        cols = next((cols for cols in alternatives if set(cols) <= columns), None)
+        if cols:
+            con.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {MIRROR_TABLE} ({', '.join(_quote(c) for c in cols)})"
+            )
+
+def _write_info(con, source):
+    rows = con.execute(f"SELECT count(*) FROM {MIRROR_TABLE}").fetchone()[0]
+    con.execute(f"CREATE TABLE IF NOT EXISTS {INFO_TABLE} (source TEXT, synced_at TEXT, rows INTEGER)")
+    con.execute(f"DELETE FROM {INFO_TABLE}")
+    con.execute(
+        f"INSERT INTO {INFO_TABLE} VALUES (?, ?, ?)",
+        (source, datetime.now().isoformat(timespec="seconds"), rows)
+    )
+
+# --------------------------------------------------------
+# SINCRONIZZAZIONE (da Supabase o da upload)
+# --------------------------------------------------------
+def sync_mirror(df, path=MIRROR_PATH, source="supabase", replace_countries=False):
+    """
+    Scrive df (dati passati per normalize_raw) nel mirror.
+
+    replace_countries=False: la tabella viene ricostruita da zero in un
+    file temporaneo poi rinominato (sync completo da Supabase; chi legge
+    il file precedente non vede mai un mirror a metà).
+    replace_countries=True: le righe dei campionati presenti in df
+    sostituiscono quelle già nel mirror, gli altri restano (upload di un
+    singolo campionato); le colonne nuove vengono aggiunte.
+    """
+    if df.empty:
+        raise ValueError("Nessuna riga da salvare nel mirror")
+
+    if replace_countries and "country" not in df.columns:
+        raise ValueError("Colonna 'country' mancante: impossibile aggiornare per campionato")
+
+    if not replace_countries or not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        con = connect_mirror(tmp_path)
+        try:
+            with con:
+                con.execute(pd.io.sql.get_schema(df, MIRROR_TABLE))
+                _insert(con, df)
+                _create_indexes(con)
+                _write_info(con, source)
+        finally:
+            con.close()
+
+        os.replace(tmp_path, path)
+        return mirror_info(path)
+
+    con = connect_mirror(path)
+    try:
+        # Una sola transazione: delete + insert sono visibili insieme
+        with con:
+            existing = _lower_columns(con)
+            for col in df.columns:
+                if str(col).lower() not in existing:
+                    con.execute(f"ALTER TABLE {MIRROR_TABLE} ADD COLUMN {_quote(col)}")
+
+            countries = df["country"].dropna().unique().tolist()
+            con.execute(
+                f"DELETE FROM {MIRROR_TABLE} WHERE country IN ({', '.join('?' * len(countries))})",
+                countries
+            )
+            _insert(con, df)
+            _create_indexes(con)
+            _write_info(con, source)
+    finally:
+        con.close()
+
+    return mirror_info(path)
+
+# --------------------------------------------------------
+# LETTURA
+# --------------------------------------------------------
+def mirror_info(path=MIRROR_PATH):
+    """
+    {"path", "source", "synced_at", "rows"} dell'ultimo aggiornamento,
+    None se il mirror non esiste ancora.
+    """
+    if not os.path.exists(path):
+        return None
+
+    con = connect_mirror(path)
+    try:
+        row = con.execute(f"SELECT source, synced_at, rows FROM {INFO_TABLE}").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        con.close()
+
+    if row is None:
+        return None
+    return {"path": path, "source": row[0], "synced_at": row[1], "rows": row[2]}
+
+def mirror_countries(path=MIRROR_PATH):
+    """
+    Campionati presenti nel mirror (letti dall'indice, senza le partite).
+    """
+    con = connect_mirror(path)
+    try:
+        rows = con.execute(f"SELECT DISTINCT country FROM {MIRROR_TABLE} WHERE country IS NOT NULL").fetchall()
+    finally:
+        con.close()
+    return sorted(row[0] for row in rows)
+
+def _first_column(columns, candidates):
+    lower = {c.lower() for c in columns}
+    return next((col for col in candidates if col in lower), None)
+
+def _exact_countries(path, countries):
+    # I campionati sono confrontati senza maiuscole e spazi (come le pagine)
+    # ma le query usano i nomi esatti, così SQLite legge dall'indice
+    wanted = {str(c).strip().upper() for c in countries}
+    return [c for c in mirror_countries(path) if str(c).strip().upper() in wanted]
+
+def mirror_seasons(path=MIRROR_PATH, countries=None):
+    """
+    Stagioni presenti nel mirror, eventualmente solo di alcuni campionati
+    (lette dall'indice campionato + stagione).
+    """
+    con = connect_mirror(path)
+    try:
+        season_col = _first_column(_columns(con), SEASON_COLUMNS)
+        if season_col is None:
+            return []
+
+        where, params = f" WHERE {season_col} IS NOT NULL", []
+        if countries:
+            exact = _exact_countries(path, countries)
+            if not exact:
+                return []
+            where += f" AND country IN ({', '.join('?' * len(exact))})"
+            params += exact
+
+        rows = con.execute(f"SELECT DISTINCT {season_col} FROM {MIRROR_TABLE}{where}", params).fetchall()
+    finally:
+        con.close()
+    return sorted(row[0] for row in rows)
+
+def read_mirror(path=MIRROR_PATH, countries=None, seasons=None, until=None):
+    """
+    Partite del mirror, eventualmente solo di alcuni campionati/stagioni
+    e fino alla data until (le partite senza data restano): i filtri di
+    core.filters applicati direttamente nella query.
+    """
+    con = connect_mirror(path)
+    try:
+        columns = _columns(con)
+        clauses, params = [], []
+
+        if countries:
+            exact = _exact_countries(path, countries)
+            if not exact:
+                return pd.DataFrame(columns=columns)
+            clauses.append(f"country IN ({', '.join('?' * len(exact))})")
+            params += exact
+
+        season_col = _first_column(columns, SEASON_COLUMNS)
+        if seasons and season_col:
+            clauses.append(f"CAST({season_col} AS TEXT) IN ({', '.join('?' * len(seasons))})")
+            params += [str(s) for s in seasons]
+
+        # Date salvate come testo ISO: il confronto tra stringhe è quello tra date
+        date_col = _first_column(columns, DATE_COLUMNS)
+        if until is not None and date_col:
+            clauses.append(f"({date_col} IS NULL OR {date_col} = '' OR {date_col} <= ?)")
+            params.append(pd.Timestamp(until).strftime("%Y-%m-%d"))
+
+        # ORDER BY rowid: stesso ordine delle righe sincronizzate, non quello dell'indice
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return pd.read_sql_query(f"SELECT * FROM {MIRROR_TABLE}{where} ORDER BY rowid", con, params=params)
+    finally:
+        con.close()
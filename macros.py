@@ -1,122 +1,151 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
-from utils import label_match, extract_minutes
+from core.league import (
+    MACRO_REQUIRED_COLS,
+    SWEEP_ODD_COLS,
+    calculate_goal_timeframes_vectorized,
+    calculate_odds_sweep,
+    prepare_league_frame,
+)
+from core.backend import league_tables
+from core.cross_league import ALL_LEAGUES
+from core.markets import MARKET_NAMES, evaluate_markets, evaluate_markets_by_team
+from core.perf import stage
+from utils import cross_league_tables
 
 # --------------------------------------------------------
-# FUNZIONE: Calcolo Goal Timeframes
+# FUNZIONE: Sweep continuo delle soglie di quota
 # --------------------------------------------------------
 
-def calculate_goal_timeframes(sub_df, label):
+def show_odds_sweep(df, db_selected):
     """
-    Calcola la distribuzione % dei goal segnati e concessi per intervallo di minuti.
+    Curve ROI vs soglia di quota per campionato.
     """
+    st.subheader(f"✅ Sweep soglie quote (ROI vs soglia) - {db_selected}")
 
-    time_bands = ["0-15", "16-30", "31-45", "46-60", "61-75", "76-90"]
-
-    # Leggi minuti goal da colonne corrette (post-rename)
-    minutes_home = []
-    minutes_away = []
-
-    if "minuti goal segnato home" in sub_df.columns:
-        minutes_home = extract_minutes(sub_df["minuti goal segnato home"])
-
-    if "minuti goal segnato away" in sub_df.columns:
-        minutes_away = extract_minutes(sub_df["minuti goal segnato away"])
-
-    # Fallback su colonne singole se i minuti sono vuoti
-    if len(minutes_home) == 0:
-        for col in [
-            "home 1 goal segnato(min)",
-            "home 2 goal segnato(min)",
-            "home 3 goal segnato(min)",
-            "home 4 goal segnato(min)",
-            "home 5 goal segnato(min)",
-            "home 6 goal segnato(min)",
-            "home 7 goal segnato(min)",
-            "home 8 goal segnato(min)",
-            "home 9 goal segnato(min)",
-        ]:
-            if col in sub_df.columns:
-                val = sub_df[col].values[0]
-                if not pd.isna(val) and val != 0:
-                    minutes_home.append(int(val))
-
-    if len(minutes_away) == 0:
-        for col in [
-            "1 goal away (min)",
-            "2 goal away (min)",
-            "3 goal away (min)",
-            "4 goal away (min)",
-            "5 goal away (min)",
-            "6 goal away (min)",
-            "7 goal away (min)",
-            "8 goal away (min)",
-            "9 goal away (min)",
-        ]:
-            if col in sub_df.columns:
-                val = sub_df[col].values[0]
-                if not pd.isna(val) and val != 0:
-                    minutes_away.append(int(val))
-
-    # ✅ FIX: se ancora vuoti, usa goal FT come finti minuti
-    if len(minutes_home) == 0 and "Home Goal FT" in sub_df.columns:
-        for _, row in sub_df.iterrows():
-            n_goals = int(row.get("Home Goal FT", 0))
-            for _ in range(n_goals):
-                minutes_home.append(90)
-
-    if len(minutes_away) == 0 and "Away Goal FT" in sub_df.columns:
-        for _, row in sub_df.iterrows():
-            n_goals = int(row.get("Away Goal FT", 0))
-            for _ in range(n_goals):
-                minutes_away.append(91)
-
-    # Determina se home o away
-    if label.startswith("H_"):
-        minutes_scored = minutes_home
-        minutes_conceded = minutes_away
-    elif label.startswith("A_"):
-        minutes_scored = minutes_away
-        minutes_conceded = minutes_home
-    elif label.startswith("SuperCompetitive"):
-        minutes_scored = minutes_home
-        minutes_conceded = minutes_away
-    else:
-        minutes_scored = minutes_home + minutes_away
-        minutes_conceded = minutes_away + minutes_home
-
-    scored_counts = {band: 0 for band in time_bands}
-    for m in minutes_scored:
-        for band in time_bands:
-            low, high = map(int, band.split("-"))
-            if low <= m <= high:
-                scored_counts[band] += 1
-                break
-
-    conceded_counts = {band: 0 for band in time_bands}
-    for m in minutes_conceded:
-        for band in time_bands:
-            low, high = map(int, band.split("-"))
-            if low <= m <= high:
-                conceded_counts[band] += 1
-                break
-
-    total_scored = sum(scored_counts.values())
-    total_conceded = sum(conceded_counts.values())
-
-    scored_percents = {
-        band: round((scored_counts[band] / total_scored * 100), 2) if total_scored > 0 else 0
-        for band in time_bands
-    }
-
-    conceded_percents = {
-        band: round((conceded_counts[band] / total_conceded * 100), 2) if total_conceded > 0 else 0
-        for band in time_bands
-    }
-
-    return scored_percents, conceded_percents
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        outcome = st.selectbox("Esito", list(SWEEP_ODD_COLS.keys()), key="sweep_outcome")
+
+    with col2:
+        direction = st.radio(
+            "Partite con quota",
+            ["<=", ">="],
+            horizontal=True,
+            key="sweep_direction"
+        )
+
+    with col3:
+        min_matches = st.number_input(
+            "Minimo partite per soglia",
+            min_value=1,
+            value=30,
+            step=1,
+            key="sweep_min_matches"
+        )
+
+    fig = go.Figure()
+    sweeps = []
+
+    for country, sub_df in df.groupby("country"):
+        with stage("aggregate/odds_sweep"):
+            sweep = calculate_odds_sweep(sub_df, outcome, direction)
+        sweep = sweep[sweep["Matches"] >= min_matches]
+
+        if sweep.empty:
+            continue
+
+        fig.add_trace(go.Scatter(
+            x=sweep["Soglia"],
+            y=sweep["Back ROI %"],
+            mode="lines",
+            name=f"{country} - Back"
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=sweep["Soglia"],
+            y=sweep["Lay ROI %"],
+            mode="lines",
+            line=dict(dash="dot"),
+            name=f"{country} - Lay"
+        ))
+
+        sweep.insert(0, "country", country)
+        sweeps.append(sweep)
+
+    if not sweeps:
+        st.info("⚠️ Nessuna soglia con abbastanza partite per costruire lo sweep.")
+        return
+
+    fig.add_hline(y=0, line_color="grey")
+    fig.update_layout(
+        title=f"ROI % {outcome} - partite con quota {direction} soglia",
+        height=450,
+        xaxis=dict(title="Soglia quota"),
+        yaxis=dict(title="ROI (%)")
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("🔎 Tabella sweep"):
+        st.dataframe(pd.concat(sweeps, ignore_index=True), use_container_width=True, hide_index=True)
+
+# --------------------------------------------------------
+# CONFRONTO TRA CAMPIONATI (modalità Tutti i campionati)
+# --------------------------------------------------------
+
+def show_cross_league(df):
+    """
+    Tabelle calcolate per campionato nel pool di processi e unite:
+    confronto tra campionati e dettaglio del campionato scelto.
+    """
+    with stage("aggregate/cross_league"):
+        tables = cross_league_tables("league", df)
+
+    if not tables:
+        st.warning("⚠️ Nessun campionato nei dati selezionati.")
+        st.stop()
+
+    overview = tables["overview"]
+    leagues = overview[overview["country"] != "Total"]
+
+    st.subheader("✅ Confronto tra campionati")
+    with stage("render/cross_league"):
+        st.dataframe(overview, use_container_width=True, hide_index=True)
+
+    metrics = [col for col in overview.columns if col not in ("country", "Matches")]
+    metric = st.selectbox(
+        "Metrica da confrontare:",
+        metrics,
+        index=metrics.index("Over25_FT %"),
+        key="cross_league_metric"
+    )
+
+    ranked = leagues.sort_values(metric, ascending=False)
+    fig = go.Figure(go.Bar(x=ranked["country"], y=ranked[metric], name=metric))
+    fig.add_hline(
+        y=float(overview.loc[overview["country"] == "Total", metric].iloc[0]),
+        line_dash="dot", line_color="grey", annotation_text="Media pesata"
+    )
+    fig.update_layout(title=f"{metric} per campionato", height=400, yaxis=dict(title=metric))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # ----------------------------------------------------------
+    # Dettaglio per campionato (tabelle già calcolate)
+    # ----------------------------------------------------------
+
+    st.subheader("🔎 Dettaglio campionato")
+    campionato = st.selectbox("Campionato:", list(leagues["country"]), key="cross_league_drilldown")
+
+    for title, name in [
+        ("League Stats Summary", "summary"),
+        ("League Data by Start Price", "labels"),
+        ("Mercati Over/Under e BTTS per Label", "markets"),
+    ]:
+        st.markdown(f"**{title} - {campionato}**")
+        table = tables[name]
+        st.dataframe(table[table["country"] == campionato], use_container_width=True, hide_index=True)
 
 # --------------------------------------------------------
 # MAIN FUNCTION
@@ -129,152 +158,74 @@ def run_macro_stats(df, db_selected):
         st.warning("⚠️ Il file caricato è vuoto o non contiene righe.")
         st.stop()
 
-    required_cols = [
-        "Home", "Away",
-        "Home Goal FT", "Away Goal FT",
-        "Home Goal 1T", "Away Goal 1T",
-        "country", "Stagione"
-    ]
-
-    missing_cols = [col for col in required_cols if col not in df.columns]
+    missing_cols = [col for col in MACRO_REQUIRED_COLS if col not in df.columns]
     if missing_cols:
         st.error(f"⚠️ Mancano colonne essenziali nel database: {missing_cols}")
         st.write("Colonne presenti nel file:", list(df.columns))
         st.stop()
 
-    df["country"] = df["country"].fillna("Unknown").astype(str).replace("", "Unknown")
-    df["Stagione"] = df["Stagione"].fillna("Unknown").astype(str).replace("", "Unknown")
-
-    # ----------------------------------------------------------
-    # CONVERSIONE QUOTE
-    # ----------------------------------------------------------
-
-    for col in ["Odd home", "Odd Draw", "Odd Away"]:
-        if col in df.columns:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace(",", ".")
-                .replace("nan", np.nan)
-                .astype(float)
-            )
-
-    # ----------------------------------------------------------
-
-    if "goals_total" not in df.columns:
-        df["goals_total"] = df["Home Goal FT"] + df["Away Goal FT"]
-
-    if "goals_1st_half" not in df.columns:
-        df["goals_1st_half"] = df["Home Goal 1T"] + df["Away Goal 1T"]
-
-    if "goals_2nd_half" not in df.columns:
-        df["goals_2nd_half"] = df["goals_total"] - df["goals_1st_half"]
+    if db_selected == ALL_LEAGUES:
+        show_cross_league(df)
+        return
 
-    if "btts" not in df.columns:
-        df["btts"] = ((df["Home Goal FT"] > 0) & (df["Away Goal FT"] > 0)).astype(int)
+    # Quote numeriche, colonne derivate e Label
+    with stage("aggregate/league_frame"):
+        df = prepare_league_frame(df)
 
-    if "match_result" not in df.columns:
-        df["match_result"] = df.apply(
-            lambda row: (
-                "Home Win" if row["Home Goal FT"] > row["Away Goal FT"]
-                else "Away Win" if row["Home Goal FT"] < row["Away Goal FT"]
-                else "Draw"
-            ),
-            axis=1
-        )
+    # League Stats Summary e League Data by Start Price con il backend
+    # scelto da STATS_BACKEND (pandas, polars o duckdb)
+    with stage("aggregate/league_tables"):
+        summary, by_label = league_tables(df)
 
-    home_col = "Home"
-
-    group_cols = ["country", "Stagione"]
-    grouped = df.groupby(group_cols).agg(
-        Matches=(home_col, "count"),
-        HomeWin_pct=("match_result", lambda x: (x == "Home Win").mean() * 100),
-        Draw_pct=("match_result", lambda x: (x == "Draw").mean() * 100),
-        AwayWin_pct=("match_result", lambda x: (x == "Away Win").mean() * 100),
-        AvgGoals1T=("goals_1st_half", "mean"),
-        AvgGoals2T=("goals_2nd_half", "mean"),
-        AvgGoalsTotal=("goals_total", "mean"),
-        Over05_FH_pct=("goals_1st_half", lambda x: (x > 0.5).mean() * 100),
-        Over15_FH_pct=("goals_1st_half", lambda x: (x > 1.5).mean() * 100),
-        Over25_FH_pct=("goals_1st_half", lambda x: (x > 2.5).mean() * 100),
-        Over05_FT_pct=("goals_total", lambda x: (x > 0.5).mean() * 100),
-        Over15_FT_pct=("goals_total", lambda x: (x > 1.5).mean() * 100),
-        Over25_FT_pct=("goals_total", lambda x: (x > 2.5).mean() * 100),
-        Over35_FT_pct=("goals_total", lambda x: (x > 3.5).mean() * 100),
-        Over45_FT_pct=("goals_total", lambda x: (x > 4.5).mean() * 100),
-        BTTS_pct=("btts", lambda x: x.mean() * 100),
-    ).reset_index()
-
-    new_columns = {}
-    for col in grouped.columns:
-        if "pct" in col:
-            new_col = col.replace("_pct", " %").replace("pct", "%")
-        else:
-            new_col = col
-        new_columns[col] = new_col
-
-    grouped.rename(columns=new_columns, inplace=True)
-    cols_numeric = grouped.select_dtypes(include=[np.number]).columns
-    grouped[cols_numeric] = grouped[cols_numeric].round(2)
+    st.subheader(f"✅ League Stats Summary - {db_selected}")
+    with stage("render/league_summary"):
+        st.dataframe(summary, use_container_width=True, hide_index=True)
 
     # ----------------------------------------------------------
-    # AGGIUNGI RIGA TOTALE
+    # League Data by Start Price
     # ----------------------------------------------------------
 
-    if not grouped.empty:
-        total_row = {}
-
-        total_row["country"] = "Total"
-        total_row["Stagione"] = "-"
-
-        total_row["Matches"] = grouped["Matches"].sum()
+    st.subheader(f"✅ League Data by Start Price - {db_selected}")
+    with stage("render/label_summary"):
+        st.dataframe(by_label, use_container_width=True, hide_index=True)
 
-        for col in grouped.columns:
-            if col not in ["country", "Stagione", "Matches"]:
-                weighted_sum = (grouped[col] * grouped["Matches"]).sum()
-                weighted_avg = weighted_sum / grouped["Matches"].sum() if grouped["Matches"].sum() > 0 else 0
-                total_row[col] = round(weighted_avg, 2)
+    # ----------------------------------------------------------
+    # Mercati Over/Under e BTTS (back / lay)
+    # ----------------------------------------------------------
 
-        total_df = pd.DataFrame([total_row])
+    st.subheader(f"✅ Mercati Over/Under e BTTS - Back/Lay - {db_selected}")
 
-        grouped_final = pd.concat([grouped, total_df], ignore_index=True)
+    mercati_scelti = st.multiselect(
+        "Mercati da mostrare:",
+        options=MARKET_NAMES,
+        default=MARKET_NAMES,
+        key="macro_mercati"
+    )
 
-        st.subheader(f"✅ League Stats Summary - {db_selected}")
-        st.dataframe(grouped_final, use_container_width=True, hide_index=True)
-    else:
-        st.subheader(f"✅ League Stats Summary - {db_selected}")
-        st.dataframe(grouped, use_container_width=True, hide_index=True)
+    with stage("aggregate/markets"):
+        markets_league = evaluate_markets(df, ["country"])
+        markets_label = evaluate_markets(df, ["Label"])
 
-    # ----------------------------------------------------------
-    # League Data by Start Price
-    # ----------------------------------------------------------
+    with stage("render/markets"):
+        st.markdown("**Per campionato**")
+        st.dataframe(
+            markets_league[markets_league["Mercato"].isin(mercati_scelti)],
+            use_container_width=True, hide_index=True
+        )
 
-    df["Label"] = df.apply(label_match, axis=1)
-
-    group_label = df.groupby("Label").agg(
-        Matches=(home_col, "count"),
-        HomeWin_pct=("match_result", lambda x: (x == "Home Win").mean() * 100),
-        Draw_pct=("match_result", lambda x: (x == "Draw").mean() * 100),
-        AwayWin_pct=("match_result", lambda x: (x == "Away Win").mean() * 100),
-        AvgGoals1T=("goals_1st_half", "mean"),
-        AvgGoals2T=("goals_2nd_half", "mean"),
-        AvgGoalsTotal=("goals_total", "mean"),
-        Over05_FH_pct=("goals_1st_half", lambda x: (x > 0.5).mean() * 100),
-        Over15_FH_pct=("goals_1st_half", lambda x: (x > 1.5).mean() * 100),
-        Over25_FH_pct=("goals_1st_half", lambda x: (x > 2.5).mean() * 100),
-        Over05_FT_pct=("goals_total", lambda x: (x > 0.5).mean() * 100),
-        Over15_FT_pct=("goals_total", lambda x: (x > 1.5).mean() * 100),
-        Over25_FT_pct=("goals_total", lambda x: (x > 2.5).mean() * 100),
-        Over35_FT_pct=("goals_total", lambda x: (x > 3.5).mean() * 100),
-        Over45_FT_pct=("goals_total", lambda x: (x > 4.5).mean() * 100),
-        BTTS_pct=("btts", lambda x: x.mean() * 100),
-    ).reset_index()
-
-    group_label.rename(columns=new_columns, inplace=True)
-    group_label[cols_numeric] = group_label[cols_numeric].round(2)
+        st.markdown("**Per Label**")
+        st.dataframe(
+            markets_label[markets_label["Mercato"].isin(mercati_scelti)],
+            use_container_width=True, hide_index=True
+        )
 
-    st.subheader(f"✅ League Data by Start Price - {db_selected}")
-    st.dataframe(group_label, use_container_width=True, hide_index=True)
+    with st.expander("🔎 Mercati per squadra"):
+        with stage("aggregate/markets_by_team"):
+            markets_team = evaluate_markets_by_team(df)
+        st.dataframe(
+            markets_team[markets_team["Mercato"].isin(mercati_scelti)],
+            use_container_width=True, hide_index=True
+        )
 
     # ----------------------------------------------------------
     # Goal Time Frame plots per Label
@@ -290,32 +241,40 @@ def run_macro_stats(df, db_selected):
             if i + j < len(labels):
                 label = labels[i + j]
                 sub_df = df[df["Label"] == label]
-                scored_percents, conceded_percents = calculate_goal_timeframes(sub_df, label)
-
-                time_bands = list(scored_percents.keys())
-
-                fig = go.Figure()
-
-                fig.add_trace(go.Bar(
-                    x=time_bands,
-                    y=[scored_percents[b] for b in time_bands],
-                    name='Goals Scored (%)',
-                    marker_color='green'
-                ))
-
-                fig.add_trace(go.Bar(
-                    x=time_bands,
-                    y=[conceded_percents[b] for b in time_bands],
-                    name='Goals Conceded (%)',
-                    marker_color='red'
-                ))
-
-                fig.update_layout(
-                    title=f"Goal Time Frame % - {label}",
-                    barmode='group',
-                    height=400,
-                    yaxis=dict(title='Percentage (%)')
-                )
-
-                with cols[j]:
-                    st.plotly_chart(fig, use_container_width=True)
+                with stage("aggregate/goal_timeframes"):
+                    scored_percents, conceded_percents = calculate_goal_timeframes_vectorized(sub_df, label)
+
+                with stage("render/goal_timeframes"):
+                    time_bands = list(scored_percents.keys())
+
+                    fig = go.Figure()
+
+                    fig.add_trace(go.Bar(
+                        x=time_bands,
+                        y=[scored_percents[b] for b in time_bands],
+                        name='Goals Scored (%)',
+                        marker_color='green'
+                    ))
+
+                    fig.add_trace(go.Bar(
+                        x=time_bands,
+                        y=[conceded_percents[b] for b in time_bands],
+                        name='Goals Conceded (%)',
+                        marker_color='red'
+                    ))
+
+                    fig.update_layout(
+                        title=f"Goal Time Frame % - {label}",
+                        barmode='group',
+                        height=400,
+                        yaxis=dict(title='Percentage (%)')
+                    )
+
+                    with cols[j]:
+                        st.plotly_chart(fig, use_container_width=True)
+
+    # ----------------------------------------------------------
+    # Sweep continuo soglie quote
+    # ----------------------------------------------------------
+
+    show_odds_sweep(df, db_selected)
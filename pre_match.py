@@ -1,58 +1,23 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from utils import label_match
-from squadre import compute_team_macro_stats
-from macros import run_macro_stats
-
-
-# --------------------------------------------------------
-# FUNZIONE PER OTTENERE LEAGUE DATA BY LABEL
-# --------------------------------------------------------
-def get_league_data_by_label(df, label):
-    if "Label" not in df.columns:
-        df = df.copy()
-        df["Label"] = df.apply(label_match, axis=1)
-
-    df["match_result"] = df.apply(
-        lambda row: "Home Win" if row["Home Goal FT"] > row["Away Goal FT"]
-        else "Away Win" if row["Home Goal FT"] < row["Away Goal FT"]
-        else "Draw",
-        axis=1
-    )
-
-    group_label = df.groupby("Label").agg(
-        Matches=("Home", "count"),
-        HomeWin_pct=("match_result", lambda x: (x == "Home Win").mean() * 100),
-        Draw_pct=("match_result", lambda x: (x == "Draw").mean() * 100),
-        AwayWin_pct=("match_result", lambda x: (x == "Away Win").mean() * 100)
-    ).reset_index()
-
-    row = group_label[group_label["Label"] == label]
-    if not row.empty:
-        return row.iloc[0].to_dict()
-    else:
-        return None
-
-# --------------------------------------------------------
-# LABEL FROM ODDS
-# --------------------------------------------------------
-def label_from_odds(home_odd, away_odd):
-    fake_row = {
-        "Odd home": home_odd,
-        "Odd Away": away_odd
-    }
-    return label_match(fake_row)
-
-# --------------------------------------------------------
-# DETERMINA TIPO DI LABEL
-# --------------------------------------------------------
-def get_label_type(label):
-    if label and label.startswith("H_"):
-        return "Home"
-    elif label and label.startswith("A_"):
-        return "Away"
-    else:
-        return "Both"
+from concurrent.futures.process import BrokenProcessPool
+from utils import get_session_elo, paged_grid, inplay_tables, cached_dataset, get_process_pool
+from core.labels import label_series, label_from_odds, get_label_type
+from core.team import compute_team_macro_stats
+from core.pre_match import (
+    calculate_back_lay_vectorized,
+    build_odds_index,
+    query_similar_odds,
+    get_label_samples,
+)
+from core.markets import evaluate_markets
+from core.bootstrap import PARALLEL_THRESHOLD, bootstrap_roi_ci
+from core.goal_model import fit_goal_model, predict_fixture
+from core.elo import team_rating, expected_score
+from core.inplay import MAX_MINUTE, ALL_GROUPS, inplay_probabilities, inplay_curve
+from core.perf import stage
+from core.cross_league import ALL_LEAGUES
 
 # --------------------------------------------------------
 # FORMATTING COLORE
@@ -67,92 +32,337 @@ def format_value(val, is_roi=False):
         return f"🔴 {val:.2f}{suffix}"
     else:
         return f"0.00{suffix}"
+
 # --------------------------------------------------------
-# CALCOLO BACK / LAY STATS (versione corretta)
+# INDICE QUOTE SIMILI (cache per dataset e squadra)
 # --------------------------------------------------------
-def calculate_back_lay(filtered_df):
+def cached_odds_index(df, dataset_key, venue=None, team=None):
+    """
+    Indice quote del campionato (team None) o delle partite di team in
+    casa / in trasferta, in cache sotto dataset_key: le posizioni sono
+    righe di df, quindi i rerun non rifanno né la scansione della squadra
+    né l'ordinamento.
     """
-    Calcola:
-    - profitti back e lay
-    - ROI% back e lay
-    per HOME, DRAW, AWAY su tutte le righe di filtered_df.
+    def build():
+        if team is None:
+            return build_odds_index(df)
+        rows = np.flatnonzero((df[venue] == team).to_numpy())
+        index = build_odds_index(df.iloc[rows])
+        return {"odds": index["odds"], "positions": rows[index["positions"]]}
 
-    Per il LAY, la responsabilità è fissa a 1 unità.
+    return cached_dataset(dataset_key + ("odds_index", venue, team), build)
+
+# --------------------------------------------------------
+# RIGA BACK / LAY PER UN CAMPIONE DI PARTITE
+# --------------------------------------------------------
+def build_back_lay_row(name, filtered_df):
     """
-    profits_back = {"HOME": 0, "DRAW": 0, "AWAY": 0}
-    profits_lay = {"HOME": 0, "DRAW": 0, "AWAY": 0}
-    matches = len(filtered_df)
-
-    for _, row in filtered_df.iterrows():
-        h_goals = row["Home Goal FT"]
-        a_goals = row["Away Goal FT"]
-
-        result = (
-            "HOME" if h_goals > a_goals else
-            "AWAY" if h_goals < a_goals else
-            "DRAW"
+    Costruisce una riga della tabella back/lay (Win % sugli esiti 1X2)
+    per il campione filtered_df.
+    """
+    with stage("aggregate/back_lay"):
+        profits_back, rois_back, profits_lay, rois_lay, matches = calculate_back_lay_vectorized(filtered_df)
+
+    row = {"LABEL": name, "MATCHES": matches}
+
+    if matches > 0:
+        h_goals = filtered_df["Home Goal FT"]
+        a_goals = filtered_df["Away Goal FT"]
+        pct_home = round((h_goals > a_goals).mean() * 100, 2)
+        pct_draw = round((h_goals == a_goals).mean() * 100, 2)
+        pct_away = round((h_goals < a_goals).mean() * 100, 2)
+    else:
+        pct_home = pct_draw = pct_away = 0
+
+    row["BACK WIN% HOME"] = pct_home
+    row["BACK WIN% DRAW"] = pct_draw
+    row["BACK WIN% AWAY"] = pct_away
+
+    for outcome in ["HOME", "DRAW", "AWAY"]:
+        row[f"BACK PTS {outcome}"] = format_value(profits_back[outcome])
+        row[f"BACK ROI% {outcome}"] = format_value(rois_back[outcome], is_roi=True)
+        row[f"Lay pts {outcome}"] = format_value(profits_lay[outcome])
+        row[f"lay ROI% {outcome}"] = format_value(rois_lay[outcome], is_roi=True)
+
+    return row
+
+def build_na_row(name):
+    """
+    Riga "N/A" della tabella back/lay per una squadra non applicabile
+    al tipo di Label.
+    """
+    row = {"LABEL": name, "MATCHES": "N/A"}
+    for outcome in ["HOME", "DRAW", "AWAY"]:
+        row[f"BACK WIN% {outcome}"] = 0
+        row[f"BACK PTS {outcome}"] = format_value(0)
+        row[f"BACK ROI% {outcome}"] = format_value(0, is_roi=True)
+        row[f"Lay pts {outcome}"] = format_value(0)
+        row[f"lay ROI% {outcome}"] = format_value(0, is_roi=True)
+    return row
+
+def build_similar_odds_rows(df, dataset_key, squadra_casa, squadra_ospite, odd_home, odd_draw, odd_away, k=None, tol=None):
+    """
+    Righe League / Casa / Ospite calcolate sulle partite con quote simili
+    a quelle inserite invece che sul Label.
+    """
+    samples = [
+        ("League", None, None),
+        (squadra_casa, "Home", squadra_casa),
+        (squadra_ospite, "Away", squadra_ospite),
+    ]
+
+    rows = []
+    similar_samples = {}
+    for name, venue, team in samples:
+        index = cached_odds_index(df, dataset_key, venue, team)
+        positions = query_similar_odds(index, odd_home, odd_draw, odd_away, k=k, tol=tol)
+        similar_df = df.iloc[positions]
+
+        paged_grid(
+            f"DEBUG - Partite con quote simili per {name}",
+            lambda similar_df=similar_df: similar_df,
+            key=f"debug_similar_{venue or 'League'}"
         )
 
+        rows.append(build_back_lay_row(name, similar_df))
+        similar_samples[name] = similar_df
+
+    return rows, similar_samples
+
+# --------------------------------------------------------
+# INTERVALLI DI CONFIDENZA ROI (BOOTSTRAP)
+# --------------------------------------------------------
+@st.cache_data(show_spinner=False)
+def cached_roi_ci(filtered_df, n_boot):
+    # Campioni grandi nel pool spawn dell'app (mai un fork del server);
+    # se un worker muore il pool viene ricreato e il calcolo rifatto in serie
+    if n_boot * len(filtered_df) <= PARALLEL_THRESHOLD:
+        return bootstrap_roi_ci(filtered_df, n_boot=n_boot, max_workers=1)
+    try:
+        return bootstrap_roi_ci(filtered_df, n_boot=n_boot, executor=get_process_pool())
+    except BrokenProcessPool:
+        get_process_pool.clear()
+        return bootstrap_roi_ci(filtered_df, n_boot=n_boot, max_workers=1)
+
+def add_roi_intervals(rows, samples, n_boot=2000):
+    """
+    Aggiunge a ogni cella ROI% l'intervallo bootstrap 95% calcolato sullo
+    stesso campione di partite della riga.
+    """
+    for row in rows:
+        sample_df = samples.get(row["LABEL"])
+        if sample_df is None or row["MATCHES"] == "N/A":
+            continue
+
+        ci = cached_roi_ci(sample_df, n_boot)
+        if ci is None:
+            continue
+
         for outcome in ["HOME", "DRAW", "AWAY"]:
-            # Leggi la quota corretta
-            if outcome == "HOME":
-                price = row.get("Odd home", None)
-            elif outcome == "DRAW":
-                price = row.get("Odd Draw", None)
-            elif outcome == "AWAY":
-                price = row.get("Odd Away", None)
-
-            try:
-                price = float(price)
-            except:
-                price = 2.00
-
-            if price <= 1:
-                price = 2.00
-
-            # BACK
-            if result == outcome:
-                profits_back[outcome] += (price - 1)
-            else:
-                profits_back[outcome] -= 1
+            low, high = ci["back"][outcome]
+            row[f"BACK ROI% {outcome}"] += f" [{low:+.1f}, {high:+.1f}]"
+            low, high = ci["lay"][outcome]
+            row[f"lay ROI% {outcome}"] += f" [{low:+.1f}, {high:+.1f}]"
 
-            # LAY corretto → responsabilità = 1
-            stake = 1 / (price - 1)
-            if result != outcome:
-                profits_lay[outcome] += stake
-            else:
-                profits_lay[outcome] -= 1
+# --------------------------------------------------------
+# TABELLA MERCATI OVER / UNDER E BTTS
+# --------------------------------------------------------
+def show_markets_table(samples):
+    """
+    Back/Lay e ROI% dei mercati Over/Under e BTTS per ogni campione,
+    calcolati in un solo passaggio sulle matrici quote/goal.
+    """
+    if not samples:
+        return
 
-    rois_back = {}
-    rois_lay = {}
-    for outcome in ["HOME", "DRAW", "AWAY"]:
-        if matches > 0:
-            rois_back[outcome] = round((profits_back[outcome] / matches) * 100, 2)
-            rois_lay[outcome] = round((profits_lay[outcome] / matches) * 100, 2)
-        else:
-            rois_back[outcome] = 0
-            rois_lay[outcome] = 0
+    combined = pd.concat(
+        [sample_df.assign(Campione=name) for name, sample_df in samples.items()],
+        ignore_index=True
+    )
+    with stage("aggregate/markets"):
+        markets = evaluate_markets(combined, ["Campione"], sort=False)
+
+    for col in ["Back Pts", "Lay Pts"]:
+        markets[col] = markets[col].apply(format_value)
+    for col in ["Back ROI %", "Lay ROI %"]:
+        markets[col] = markets[col].apply(lambda v: format_value(v, is_roi=True))
 
-    return profits_back, rois_back, profits_lay, rois_lay, matches
+    markets.loc[markets.duplicated(subset=["Campione"]), "Campione"] = ""
 
+    st.markdown("#### Mercati Over/Under e BTTS")
+    st.dataframe(markets, use_container_width=True, hide_index=True)
+
+# --------------------------------------------------------
+# MODELLO POISSON / DIXON-COLES
+# --------------------------------------------------------
+def show_goal_model(df, db_selected, squadra_casa, squadra_ospite, odd_home, odd_draw, odd_away):
+    st.markdown("---")
+    st.markdown("## 🧮 Modello Poisson / Dixon-Coles")
+
+    stagioni = sorted(df["Stagione"].dropna().unique(), reverse=True) if "Stagione" in df.columns else []
+    stagione_modello = st.selectbox(
+        "Stagioni usate per il modello",
+        ["Tutte"] + stagioni,
+        key="pre_match_stagione_modello"
+    )
+    seasons = None if stagione_modello == "Tutte" else [stagione_modello]
+
+    with stage("aggregate/goal_model"):
+        model = fit_goal_model(df, db_selected, seasons)
+        prediction = predict_fixture(model, squadra_casa, squadra_ospite) if model else None
+
+    if prediction is None:
+        st.info("⚠️ Dati insufficienti per stimare il modello su queste squadre.")
+        return
+
+    xg_home, xg_away = prediction["xG"]
+    st.markdown(
+        f"**Goal attesi:** {squadra_casa} {xg_home:.2f} - {xg_away:.2f} {squadra_ospite} "
+        f"· vantaggio casa {model['home_adv']:.2f} · ρ {model['rho']:.3f} · {model['matches']} partite"
+    )
+
+    odds = {"HOME": odd_home, "DRAW": odd_draw, "AWAY": odd_away}
+    df_1x2 = pd.DataFrame([
+        {
+            "SEGNO": outcome,
+            "Prob. Modello %": round(prob * 100, 2),
+            "Quota Equa": round(1 / prob, 2) if prob > 0 else None,
+            "Prob. Implicita %": round(100 / odds[outcome], 2),
+            "Value %": format_value((prob * odds[outcome] - 1) * 100, is_roi=True),
+        }
+        for outcome, prob in prediction["1X2"].items()
+    ])
+
+    df_ou = pd.DataFrame([
+        {
+            "Linea": line,
+            "Over %": round(probs["Over"] * 100, 2),
+            "Under %": round(probs["Under"] * 100, 2),
+        }
+        for line, probs in prediction["Over/Under"].items()
+    ] + [{
+        "Linea": "BTTS",
+        "Over %": round(prediction["BTTS"] * 100, 2),
+        "Under %": round((1 - prediction["BTTS"]) * 100, 2),
+    }])
+
+    df_cs = pd.DataFrame(prediction["Correct Score"], columns=["Risultato", "Prob."])
+    df_cs["Prob."] = (df_cs["Prob."] * 100).round(2)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("#### 1X2")
+        st.dataframe(df_1x2, use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("#### Over/Under · BTTS")
+        st.dataframe(df_ou, use_container_width=True, hide_index=True)
+    with col3:
+        st.markdown("#### Risultati esatti")
+        st.dataframe(df_cs, use_container_width=True, hide_index=True)
+
+# --------------------------------------------------------
+# RATING ELO PRE-PARTITA
+# --------------------------------------------------------
+def show_elo_ratings(df, db_selected, squadra_casa, squadra_ospite):
+    with st.expander("⚙️ Parametri Elo"):
+        col1, col2 = st.columns(2)
+        with col1:
+            k = st.number_input("K-factor", min_value=1.0, value=20.0, step=1.0, key="elo_k")
+        with col2:
+            home_adv = st.number_input("Vantaggio casa (punti)", min_value=0.0, value=60.0, step=5.0, key="elo_home_adv")
+
+    with stage("aggregate/elo"):
+        state = get_session_elo(df, db_selected, k, home_adv)
+
+    elo_home = team_rating(state, squadra_casa)
+    elo_away = team_rating(state, squadra_ospite)
+    expected_home = expected_score(elo_home, elo_away, home_adv)
+
+    st.markdown(
+        f"**📈 Elo ricalcolato:** {squadra_casa} {elo_home:.0f} · {squadra_ospite} {elo_away:.0f} "
+        f"· punteggio atteso casa {expected_home * 100:.1f}%"
+    )
+
+# --------------------------------------------------------
+# PROBABILITÀ IN-PLAY (minuto × punteggio)
+# --------------------------------------------------------
+def show_inplay(df, squadra_casa, squadra_ospite, label):
+    st.markdown("---")
+    st.markdown("## ⏱️ Probabilità in-play")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        minuto = st.slider("Minuto", min_value=0, max_value=MAX_MINUTE, value=60, key="inplay_minuto")
+    with col2:
+        goal_casa = st.number_input(f"Goal {squadra_casa}", min_value=0, value=0, step=1, key="inplay_goal_casa")
+    with col3:
+        goal_ospite = st.number_input(f"Goal {squadra_ospite}", min_value=0, value=0, step=1, key="inplay_goal_ospite")
+
+    # Tabelle costruite una volta per dataset: ogni domanda legge pochi conteggi
+    with stage("aggregate/inplay"):
+        by_label = inplay_tables(df, "Label")
+        by_home = inplay_tables(df, "Home")
+        by_away = inplay_tables(df, "Away")
+
+    window = by_label["window"]
+    samples = [
+        ("League", by_label, ALL_GROUPS),
+        (f"Label {label}", by_label, label),
+        (f"{squadra_casa} (casa)", by_home, squadra_casa),
+        (f"{squadra_ospite} (ospite)", by_away, squadra_ospite),
+    ]
+
+    rows = []
+    for name, tables, group in samples:
+        result = inplay_probabilities(tables, minuto, goal_casa, goal_ospite, group)
+        if result is None:
+            continue
+
+        row = {"Campione": name, "Matches": result["matches"]}
+        if result["matches"]:
+            row.update({
+                "P altro goal %": round(result["p_goal"] * 100, 2),
+                "P prossimo goal casa %": round(result["p_next_home"] * 100, 2),
+                "P prossimo goal ospite %": round(result["p_next_away"] * 100, 2),
+                f"P goal entro {window}' %": round(result["p_goal_window"] * 100, 2),
+                "Goal attesi": round(result["expected_goals"], 2),
+            })
+        rows.append(row)
+
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    st.caption(
+        f"Partite nello stesso stato al minuto {minuto} (goal fino al minuto compreso) · "
+        f"punteggi da {by_label['max_goals']} goal in su raggruppati · "
+        f"{by_label['skipped']} partite escluse per minuti goal non coerenti con il risultato"
+    )
+
+    # Andamento per minuto sul punteggio scelto (Label della partita se presente)
+    group = label if label in by_label["group_index"] else ALL_GROUPS
+    curve = inplay_curve(by_label, goal_casa, goal_ospite, group)
+    if not curve.empty:
+        st.markdown(f"**Andamento sul punteggio {goal_casa}-{goal_ospite} ({group})**")
+        st.line_chart(curve.set_index("Minuto")[["P goal", f"P goal entro {window}'"]])
 
 # --------------------------------------------------------
 # RUN PRE MATCH PAGE
 # --------------------------------------------------------
-def run_pre_match(df, db_selected):
+def run_pre_match(df, db_selected, dataset_key):
     st.title("⚔️ Confronto Pre Match")
 
-    if "Label" not in df.columns:
-        df = df.copy()
-        df["Label"] = df.apply(label_match, axis=1)
+    # Campioni, Elo e modello goal sono per campionato
+    if db_selected == ALL_LEAGUES:
+        st.info("ℹ️ Il confronto pre-match lavora su un solo campionato: selezionalo nella barra laterale.")
+        st.stop()
 
-    # Rimuovi eventuali spazi extra nei nomi squadre
-    df["Home"] = df["Home"].str.strip()
-    df["Away"] = df["Away"].str.strip()
+    # Label e nomi squadra senza spazi arrivano da core.dataset.prepare_matches;
+    # per un DataFrame non preparato la Label si aggiunge su una vista
+    if "Label" not in df.columns:
+        df = df.assign(Label=label_series(df))
 
+    # df contiene già solo il campionato scelto (filtri della barra laterale)
     teams_available = sorted(
-        set(df[df["country"] == db_selected]["Home"].dropna().unique()) |
-        set(df[df["country"] == db_selected]["Away"].dropna().unique())
+        set(df["Home"].dropna().unique()) |
+        set(df["Away"].dropna().unique())
     )
 
     col1, col2 = st.columns(2)
@@ -180,6 +390,35 @@ def run_pre_match(df, db_selected):
         implied_away = round(100 / odd_away, 2)
         st.markdown(f"**Probabilità Ospite ({squadra_ospite}):** {implied_away}%")
 
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        modalita = st.radio(
+            "Campione partite",
+            ["Label", "Quote simili"],
+            horizontal=True,
+            key="pre_match_modalita"
+        )
+
+    k_simili = tol_simili = None
+    if modalita == "Quote simili":
+        with col2:
+            criterio = st.radio(
+                "Criterio",
+                ["k più vicine", "Tolleranza ±x"],
+                horizontal=True,
+                key="pre_match_criterio"
+            )
+        with col3:
+            if criterio == "k più vicine":
+                k_simili = st.number_input("k partite", min_value=1, value=30, step=1)
+            else:
+                tol_simili = st.number_input("Tolleranza quote ±", min_value=0.01, value=0.20, step=0.05)
+
+    mostra_ci = st.checkbox(
+        "Mostra intervalli di confidenza 95% sul ROI (bootstrap)",
+        key="pre_match_bootstrap"
+    )
 
     if squadra_casa and squadra_ospite and squadra_casa != squadra_ospite:
         implied_home = round(100 / odd_home, 2)
@@ -192,130 +431,36 @@ def run_pre_match(df, db_selected):
 
         st.markdown(f"### 🎯 Range di quota identificato (Label): `{label}`")
 
-        if label == "Others":
-            st.info("⚠️ Le quote inserite non rientrano in nessun range di quota. Verranno calcolate statistiche su tutto il campionato.")
-            label = None
-        elif label not in df["Label"].unique() or df[df["Label"] == label].empty:
-            st.info(f"⚠️ Nessuna partita trovata per il Label `{label}`. Verranno calcolate statistiche su tutto il campionato.")
-            label = None
-
-        rows = []
-
-        # ---------------------------
-        # League
-        # ---------------------------
-        if label:
-            filtered_league = df[df["Label"] == label]
-            profits_back, rois_back, profits_lay, rois_lay, matches_league = calculate_back_lay(filtered_league)
-
-            league_stats = get_league_data_by_label(df, label)
-            row_league = {
-                "LABEL": "League",
-                "MATCHES": matches_league,
-                "BACK WIN% HOME": round(league_stats["HomeWin_pct"], 2) if league_stats else 0,
-                "BACK WIN% DRAW": round(league_stats["Draw_pct"], 2) if league_stats else 0,
-                "BACK WIN% AWAY": round(league_stats["AwayWin_pct"], 2) if league_stats else 0
-            }
-            for outcome in ["HOME", "DRAW", "AWAY"]:
-                row_league[f"BACK PTS {outcome}"] = format_value(profits_back[outcome])
-                row_league[f"BACK ROI% {outcome}"] = format_value(rois_back[outcome], is_roi=True)
-                row_league[f"Lay pts {outcome}"] = format_value(profits_lay[outcome])
-                row_league[f"lay ROI% {outcome}"] = format_value(rois_lay[outcome], is_roi=True)
-            rows.append(row_league)
-
-        # ---------------------------
-        # Squadra Casa
-        # ---------------------------
-        row_home = {"LABEL": squadra_casa}
-        if label and label_type in ["Home", "Both"]:
-            filtered_home = df[(df["Label"] == label) & (df["Home"] == squadra_casa)]
-
-            if filtered_home.empty:
-                filtered_home = df[df["Home"] == squadra_casa]
-                st.info(f"⚠️ Nessuna partita trovata per questo label. Calcolo eseguito su TUTTO il database per {squadra_casa}.")
-
-            with st.expander(f"DEBUG - Partite Home per {squadra_casa}"):
-                st.write(filtered_home)
-
-            profits_back, rois_back, profits_lay, rois_lay, matches_home = calculate_back_lay(filtered_home)
-
-            if matches_home > 0:
-                wins_home = sum(filtered_home["Home Goal FT"] > filtered_home["Away Goal FT"])
-                draws_home = sum(filtered_home["Home Goal FT"] == filtered_home["Away Goal FT"])
-                losses_home = sum(filtered_home["Home Goal FT"] < filtered_home["Away Goal FT"])
-
-                pct_win_home = round((wins_home / matches_home) * 100, 2)
-                pct_draw = round((draws_home / matches_home) * 100, 2)
-                pct_loss = round((losses_home / matches_home) * 100, 2)
-            else:
-                pct_win_home = pct_draw = pct_loss = 0
-
-            row_home["MATCHES"] = matches_home
-            row_home["BACK WIN% HOME"] = pct_win_home
-            row_home["BACK WIN% DRAW"] = pct_draw
-            row_home["BACK WIN% AWAY"] = pct_loss
+        show_elo_ratings(df, db_selected, squadra_casa, squadra_ospite)
 
-            for outcome in ["HOME", "DRAW", "AWAY"]:
-                row_home[f"BACK PTS {outcome}"] = format_value(profits_back[outcome])
-                row_home[f"BACK ROI% {outcome}"] = format_value(rois_back[outcome], is_roi=True)
-                row_home[f"Lay pts {outcome}"] = format_value(profits_lay[outcome])
-                row_home[f"lay ROI% {outcome}"] = format_value(rois_lay[outcome], is_roi=True)
+        if modalita == "Quote simili":
+            rows, samples = build_similar_odds_rows(
+                df, dataset_key, squadra_casa, squadra_ospite,
+                odd_home, odd_draw, odd_away,
+                k=k_simili, tol=tol_simili
+            )
+            label = "Quote simili"
         else:
-            row_home["MATCHES"] = "N/A"
-            for outcome in ["HOME", "DRAW", "AWAY"]:
-                row_home[f"BACK WIN% {outcome}"] = 0
-                row_home[f"BACK PTS {outcome}"] = format_value(0)
-                row_home[f"BACK ROI% {outcome}"] = format_value(0, is_roi=True)
-                row_home[f"Lay pts {outcome}"] = format_value(0)
-                row_home[f"lay ROI% {outcome}"] = format_value(0, is_roi=True)
-        rows.append(row_home)
-
-        # ---------------------------
-        # Squadra Ospite
-        # ---------------------------
-        row_away = {"LABEL": squadra_ospite}
-        if label and label_type in ["Away", "Both"]:
-            filtered_away = df[(df["Label"] == label) & (df["Away"] == squadra_ospite)]
-
-            if filtered_away.empty:
-                filtered_away = df[df["Away"] == squadra_ospite]
-                st.info(f"⚠️ Nessuna partita trovata per questo label. Calcolo eseguito su TUTTO il database per {squadra_ospite}.")
-
-            with st.expander(f"DEBUG - Partite Away per {squadra_ospite}"):
-                st.write(filtered_away)
-
-            profits_back, rois_back, profits_lay, rois_lay, matches_away = calculate_back_lay(filtered_away)
-
-            if matches_away > 0:
-                wins_away = sum(filtered_away["Away Goal FT"] > filtered_away["Home Goal FT"])
-                draws_away = sum(filtered_away["Away Goal FT"] == filtered_away["Home Goal FT"])
-                losses_away = sum(filtered_away["Away Goal FT"] < filtered_away["Home Goal FT"])
-
-                pct_win_away = round((wins_away / matches_away) * 100, 2)
-                pct_draw = round((draws_away / matches_away) * 100, 2)
-                pct_loss = round((losses_away / matches_away) * 100, 2)
-            else:
-                pct_win_away = pct_draw = pct_loss = 0
-
-            row_away["MATCHES"] = matches_away
-            row_away["BACK WIN% HOME"] = pct_loss
-            row_away["BACK WIN% DRAW"] = pct_draw
-            row_away["BACK WIN% AWAY"] = pct_win_away
-
-            for outcome in ["HOME", "DRAW", "AWAY"]:
-                row_away[f"BACK PTS {outcome}"] = format_value(profits_back[outcome])
-                row_away[f"BACK ROI% {outcome}"] = format_value(rois_back[outcome], is_roi=True)
-                row_away[f"Lay pts {outcome}"] = format_value(profits_lay[outcome])
-                row_away[f"lay ROI% {outcome}"] = format_value(rois_lay[outcome], is_roi=True)
-        else:
-            row_away["MATCHES"] = "N/A"
-            for outcome in ["HOME", "DRAW", "AWAY"]:
-                row_away[f"BACK WIN% {outcome}"] = 0
-                row_away[f"BACK PTS {outcome}"] = format_value(0)
-                row_away[f"BACK ROI% {outcome}"] = format_value(0, is_roi=True)
-                row_away[f"Lay pts {outcome}"] = format_value(0)
-                row_away[f"lay ROI% {outcome}"] = format_value(0, is_roi=True)
-        rows.append(row_away)
+            if label == "Others":
+                st.info("⚠️ Le quote inserite non rientrano in nessun range di quota. Verranno calcolate statistiche su tutto il campionato.")
+                label = None
+            elif label not in df["Label"].unique() or df[df["Label"] == label].empty:
+                st.info(f"⚠️ Nessuna partita trovata per il Label `{label}`. Verranno calcolate statistiche su tutto il campionato.")
+                label = None
+
+            # Stessi campioni per 1X2, intervalli bootstrap e mercati
+            samples, fallback = get_label_samples(df, label, label_type, squadra_casa, squadra_ospite)
+            for team in fallback:
+                st.info(f"⚠️ Nessuna partita trovata per questo label. Calcolo eseguito su TUTTO il database per {team}.")
+
+            # League solo con un Label, squadre non applicabili come "N/A"
+            rows = [build_back_lay_row("League", samples["League"])] if "League" in samples else []
+            for team in [squadra_casa, squadra_ospite]:
+                rows.append(build_back_lay_row(team, samples[team]) if team in samples else build_na_row(team))
+
+        if mostra_ci:
+            with stage("aggregate/bootstrap"):
+                add_roi_intervals(rows, samples)
 
         # ------------------------------------------
         # CONVERSIONE TABELLA IN LONG FORMAT
@@ -338,7 +483,14 @@ def run_pre_match(df, db_selected):
         df_long.loc[df_long.duplicated(subset=["LABEL"]), "LABEL"] = ""
 
         st.markdown(f"#### Range di quota identificato (Label): `{label}`")
-        st.dataframe(df_long, use_container_width=True)
+        with stage("render/back_lay"):
+            st.dataframe(df_long, use_container_width=True)
+
+        show_markets_table(samples)
+
+        show_goal_model(df, db_selected, squadra_casa, squadra_ospite, odd_home, odd_draw, odd_away)
+
+        show_inplay(df, squadra_casa, squadra_ospite, label_from_odds(odd_home, odd_away))
 
         # -------------------------------------------------------
         # CONFRONTO MACRO STATS
@@ -346,8 +498,9 @@ def run_pre_match(df, db_selected):
         st.markdown("---")
         st.markdown("## 📊 Confronto Statistiche Pre-Match")
 
-        stats_home = compute_team_macro_stats(df, squadra_casa, "Home")
-        stats_away = compute_team_macro_stats(df, squadra_ospite, "Away")
+        with stage("aggregate/team_macro"):
+            stats_home = compute_team_macro_stats(df, squadra_casa, "Home")
+            stats_away = compute_team_macro_stats(df, squadra_ospite, "Away")
 
         if not stats_home or not stats_away:
             st.info("⚠️ Una delle due squadre non ha partite disponibili per il confronto.")
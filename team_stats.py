@@ -1,4 +1,4 @@
-from macros import calculate_goal_timeframes
+from core.league import calculate_goal_timeframes
 import streamlit as st
 import pandas as pd
 import plotly.express as px